@@ -49,7 +49,6 @@ To do list:
 * Remove references to 2spring model.
 * Tidy up code to follow style conventions.
 * Pare down graph options.
-* Move all imports to the top of the functions file
 
 * NB:
     * The x direction is anteroposterior, positive anteriorly
@@ -61,16 +60,84 @@ To do list:
 import math
 import datetime
 import csv
-from scipy.interpolate import interp1d
 import os
 import pandas as pd
 import shutil
+import argparse
 
 import PyEL_Functions as ELF
+import PyEL_Checkpoint as CP
+import PyEL_Engines as EN
+import PyEL_JobList as JL
+import PyEL_Mesh as ME
+import PyEL_Planner as PL
+import PyEL_Plots as PT
+import PyEL_ResultStore as RS
+import PyEL_Timing as TM
+import PyEL_Writer as WR
+
+
+def rotate_cup(MasterCupData, LipAngle, CupIncAngle, CupAVersionAngle,
+               CupOVersionAngle):
+    """
+    Rotate the cup to its final orientation.
+
+    Parameters
+    ----------
+    MasterCupData : list
+        Unrotated cup data.
+    LipAngle : float
+        Lip angle (radians).
+    CupIncAngle : float
+        Inclination angle (radians).
+    CupAVersionAngle : float
+        Anteversion angle (radians).
+    CupOVersionAngle : float
+        Operative version angle (radians).
+
+    Returns
+    -------
+    CupData : list
+        list[0] = rotated cup geometry, list[1] = rotated edge points only.
+
+    """
+    sin_Lip = math.sin(LipAngle)
+    cos_Lip = math.cos(LipAngle)
+    sin_Inc = math.sin(CupIncAngle)
+    cos_Inc = math.cos(CupIncAngle)
+    cos_Ver = math.cos((-1) * CupAVersionAngle)
+    sin_Ver = math.sin((-1) * CupAVersionAngle)
+    cos_Tilt = math.cos(CupOVersionAngle)
+    sin_Tilt = math.sin(CupOVersionAngle)
+    CupData = ELF \
+        .CupRotation_IVTseq_AxisymPointCloud(sin_Lip, cos_Lip, sin_Inc,
+                                             cos_Inc, sin_Ver, cos_Ver,
+                                             sin_Tilt, cos_Tilt,
+                                             MasterCupData,
+                                             math.degrees(LipAngle),
+                                             math.degrees(CupIncAngle),
+                                             math.degrees(CupAVersionAngle),
+                                             math.degrees(CupOVersionAngle))
+    if CupData == MasterCupData:
+        SystemError('Please check the liner has been rotated. If this is '
+                    'correct, MasterCupData has been changed erroneously.'
+                    ' Please ensure MasterCupData = CupData[0], else '
+                    'following cases will be incorrect. \n(Excepting all '
+                    'angles being 0 degrees)')
+    else:
+        pass
+
+    TM.progress('Done creating an edge list')
+    return CupData
 
 
 def run_analysis_2D(CaseName, JobFile, CupGeomFile, CupMeshSize, ContactIts,
-                    linerPath, first_geom):
+                    linerPath, first_geom, resume=False, interactive=True,
+                    cache_memory=PL.DEFAULT_MEMORY_MB, timing=False,
+                    counters=False, memory=False,
+                    engine=EN.DEFAULT_ENGINE, store=None,
+                    write_queue=WR.DEFAULT_QUEUE_SIZE, plots=True,
+                    plot_workers=PT.DEFAULT_PLOT_WORKERS, shared_plots=True):
     """
     Run the analysis with the given inputs.
 
@@ -83,7 +150,9 @@ def run_analysis_2D(CaseName, JobFile, CupGeomFile, CupMeshSize, ContactIts,
     CaseName : str
         Name of the case being run, used for organisation and naming files.
     JobFile : str
-        Location of file containing all of the cases for the analysis to run.
+        Location of file containing all of the cases for the analysis to run,
+        either a csv job list or a json job spec. Cases are read from it one
+        at a time as they are run.
     CupGeomFile : str
         Location of liner geometry file for analysis.
     CupMeshSize : TYPE
@@ -99,6 +168,54 @@ def run_analysis_2D(CaseName, JobFile, CupGeomFile, CupMeshSize, ContactIts,
     first_geom : str
         Identifies if this is the first geometry. If it is, the Graph
         Interface will be displayed.
+    resume : bool, optional
+        If True, cases recorded as complete in the run manifest by a previous
+        run with the same inputs are not re-run. Their raw data is reused for
+        the plots and summary. The default is False.
+    interactive : bool, optional
+        If False, no dialogs or browser windows are opened, for runs on
+        machines without a display. The default is True.
+    cache_memory : float, optional
+        Memory available for reusing rotated and reduced cup data and contact
+        points between cases (MB). Cases are run in the order that reuses
+        them most, see PyEL_Planner. 0 runs every case from scratch in job
+        list order. The default is PL.DEFAULT_MEMORY_MB.
+    timing : bool, optional
+        If True, the time spent in each stage is recorded per case and for
+        the whole run, and written to Run Timing.json and Run Timing.csv.
+        The default is False.
+    counters : bool, optional
+        If True, the work done by the contact search of each case (points
+        evaluated, hill-climb rounds, escapes, random restarts and lookups)
+        is counted and written with the case run time to Run Counters.csv.
+        The default is False.
+    memory : bool, optional
+        If True, the memory allocated by each stage, the peak RSS, and the
+        size of the liner geometry frame are recorded in Run Metadata.json.
+        This slows the run down. The default is False.
+    engine : str, optional
+        Contact search engine to use, see PyEL_Engines. The default is
+        EN.DEFAULT_ENGINE, PyEL_Functions.contact_path.
+    store : str, optional
+        If 'parquet' or 'hdf5', the results of every case are also written
+        to one columnar store for the sweep, see PyEL_ResultStore. The
+        default is None, no store.
+    write_queue : int, optional
+        Number of finished cases that can wait to be saved by the background
+        writer before the next case waits for it, see PyEL_Writer. 0 saves
+        each case before starting the next. The default is
+        WR.DEFAULT_QUEUE_SIZE.
+    plots : bool, optional
+        If False, the Geometry-Force and bar chart plots are not made. The
+        default is True.
+    plot_workers : int, optional
+        Number of processes drawing the Geometry-Force plots while the cases
+        are run, see PyEL_Plots. 0 draws them in this process. The default is
+        PT.DEFAULT_PLOT_WORKERS.
+    shared_plots : bool, optional
+        If True, the plots share one copy of the liner geometry and plotly.js
+        in the Charts folder. If False, every plot file has its own, so it
+        can be opened on its own. The default is True.
 
     Returns
     -------
@@ -111,19 +228,18 @@ def run_analysis_2D(CaseName, JobFile, CupGeomFile, CupMeshSize, ContactIts,
         .html file of bar chart for maximum lateral separation of all cases.
 
     """
-    misc_dict = {}
+    from scipy.interpolate import interp1d
 
-    # Importing Case Data from Job list
-    CaseData = ELF.Inputs_JobList(JobFile)
-    HeadRad = CaseData[3][0]
-    num_jobs = len(CaseData[0])
+    misc_dict = {}
+    runStarted = datetime.datetime.now()
+    timer = TM.Timer(enabled=timing or memory, memory=memory)
+    search = EN.get_engine(engine)
 
-    hour = datetime.datetime.now().hour
-    mins = datetime.datetime.now().minute
-    sec = datetime.datetime.now().second
-    time = str(hour) + ':' + str(mins) + ':' + str(sec)
+    # Counting the cases in the Job list, they are read in as they are run
+    num_jobs = JL.count_job_file(JobFile)
+    HeadRad = next(JL.iter_job_file(JobFile))['head_rad']
 
-    print('Done collecting setup parameters and cases' + ': ' + time)
+    TM.progress('Done collecting setup parameters and cases')
 
     # User Interface for graph production
     graph_info = {"graph_force": "Axial",
@@ -133,136 +249,171 @@ def run_analysis_2D(CaseName, JobFile, CupGeomFile, CupMeshSize, ContactIts,
                                      'lip_ang', 'head_rad', 'load_file'],
                   "x_params": ['lat_mm', 'ant_mm', 'lat_spr', 'ant_spr']}
 
-    per_page = graph_info['per_page']
-
     # Creating cup geometry
-
+    started = timer.start()
     CupData = ELF.CupGeom_AxisymPointCloud(CupGeomFile, HeadRad)
     # NOTE: MasterCupData used to save the geometry instead of reloading.
     # Will be updated if CupData list reference changed to
     # direct relation due to python's pass-by-reference
     HeadRad = CupData[1]
     MasterCupData = CupData[0]
+    timer.stop('load geometry', started)
 
     # Conversion to DataFrame for plotly plotting
-    CupData_df = pd.DataFrame(MasterCupData)
-    CupData_df.rename(columns={0: 'NodeID', 1: 'Nx', 2: 'Ny', 3: 'Nz',
-                               4: 'SNx', 5: 'SNy', 6: 'SNz', 7: 'Location',
-                               8: 'Edge?', 9: 'Neighbours',
-                               10: 'boundary_location'},
-                      inplace=True)
-
-    hour = datetime.datetime.now().hour
-    mins = datetime.datetime.now().minute
-    sec = datetime.datetime.now().second
-    time = str(hour) + ':' + str(mins) + ':' + str(sec)
-    print('Done creating cup data from the geometrical information'
-          + ': ' + time + '\n\n')
-
-    # Create subplots in figure for 3D mesh plots
-    fig_no = 1
-    row = 1
-    col = 1
-    num_figures = math.ceil(num_jobs / per_page)
-    figs = []
-    for i in range(num_figures):
-        fig, fig_tot, rows, cols = ELF.create_fig_subplots(
-            num_jobs, per_page, CaseName, caseNum=4 * i)
-        figs.append(fig)
+    started = timer.start()
+    CupData_df = PT.cup_frame(MasterCupData)
+    timer.stop('geometry frame', started)
+
+    TM.progress('Done creating cup data from the geometrical information')
+    print('\n')
+
+    # Creation of pathway for raw data and the run manifest
+    CaseNamePath = linerPath
+    if CaseNamePath[-4] == '.':
+        CaseNamePath = CaseNamePath[:-4]
+    CaseNamePath = os.path.join(CaseNamePath, CaseName)
+    if not os.path.exists(os.path.join(CaseNamePath, 'Raw Data')):
+        os.makedirs(os.path.join(CaseNamePath, 'Raw Data'))
+    manifest = CP.open_manifest(CaseNamePath, resume)
+    if store is not None:
+        resultStore = RS.open_store(store, CaseNamePath, CaseName)
+    if counters:
+        counterLog = TM.CounterLog(os.path.join(CaseNamePath,
+                                                TM.COUNTERS_NAME))
+
+    # Creation of pathway for graphs
+    chartDir = os.path.join(CaseNamePath, 'Charts')
+    if not os.path.exists(chartDir):
+        os.makedirs(chartDir)
+
+    # Pages of 3D mesh plots are drawn as their cases finish
+    if plots:
+        with timer.span('plotting'):
+            geometry = PT.plot_geometry(
+                CupData_df, CupGeomFile,
+                os.path.join(os.path.dirname(CaseNamePath), ME.MESH_NAME))
+            renderer = PT.PlotRenderer(geometry, CaseName, graph_info,
+                                       num_jobs, chartDir, plot_workers,
+                                       shared_plots)
+
+    # Choosing the case order and caches for reuse between cases
+    with timer.span('planning'):
+        plan = PL.plan_sweep(JobFile, MasterCupData, ContactIts,
+                             cache_memory)
+    caches = plan.caches()
+    print(plan.report() + '\n')
+
+    # Finished cases are saved in the background while the next is run
+    writer = WR.BackgroundWriter(write_queue, timer)
 
     # Starting loop through cases
-    caseNum = 0
-    dfs = []
-    for line in CaseData[0]:
+    # Summary of each case, added to as the cases finish
+    summaries = {}
+    warned = set()
+    for case in PL.iter_planned(JobFile, plan):
         startTime = datetime.datetime.now()
-        CupIncAngle_degrees = CaseData[0][caseNum]
+        caseNum = case['case_num']
+        timer.begin_case(caseNum)
+        JL.warn_unused(case, warned)
+        CupIncAngle_degrees = case['sim_inc']
         CupAVersionAngle_degrees = 0
         CupOVersionAngle_degrees = 0
-        LatMaxDynSep = CaseData[4][caseNum]
+        LatMaxDynSep = case['lat_mm']
         AntMaxDynSep = 0
-        LatSpringF = CaseData[6][caseNum]
+        LatSpringF = case['lat_spr']
         AntSpringF = 0
-        ActivityFile = CaseData[8][caseNum]
-        LipAngle_degrees = 0
+        ActivityFile = case['load_file']
+
+        # Reusing the result of a case finished by a previous run
+        signature = CP.case_signature(case, CupGeomFile, CupMeshSize,
+                                      ContactIts)
+        OutputFile = CP.results_file(CaseNamePath, caseNum, CaseName)
+        if resume and CP.case_complete(CaseNamePath, manifest, caseNum,
+                                       signature):
+            print('Case ' + str(caseNum) + ' already complete, skipping')
+            with timer.span('resume'):
+                df = pd.read_csv(OutputFile, skiprows=1,
+                                 float_precision='round_trip')
+                summaries[caseNum] = ELF.case_summary(
+                    df, CupIncAngle_degrees, OutputFile)
+                if store is not None:
+                    writer.submit(resultStore.append, caseNum, df.copy(),
+                                  RS.case_info(case, HeadRad, CupGeomFile,
+                                               CupMeshSize, ContactIts))
+                if plots:
+                    writer.submit(renderer.add_case, caseNum, OutputFile,
+                                  CupIncAngle_degrees)
+            timer.end_case()
+            continue
 
         # Reading activity data
-        ActivityData = ELF.ReadActivity(ActivityFile)
+        started = timer.start()
+        ActivityData = ELF.ReadActivity(ActivityFile, interactive)
 
         # Turning activity profile into load sections
         LoadSections = ELF.Load_IdealisedTwoPeak(ActivityData)
+        timer.stop('load activity', started)
 
-        hour = datetime.datetime.now().hour
-        mins = datetime.datetime.now().minute
-        sec = datetime.datetime.now().second
-        time = str(hour) + ':' + str(mins) + ':' + str(sec)
-        print('Done reading activity data' + ': ' + time)
+        TM.progress('Done reading activity data')
 
-        # Rotating the cup to its final orientation
         LipAngle = 0
         CupIncAngle = math.radians(CupIncAngle_degrees)
         CupAVersionAngle = math.radians(CupAVersionAngle_degrees)
         CupOVersionAngle = math.radians(CupOVersionAngle_degrees)
-        sin_Lip = math.sin(LipAngle)
-        cos_Lip = math.cos(LipAngle)
-        sin_Inc = math.sin(CupIncAngle)
-        cos_Inc = math.cos(CupIncAngle)
-        cos_Ver = math.cos((-1) * CupAVersionAngle)
-        sin_Ver = math.sin((-1) * CupAVersionAngle)
-        cos_Tilt = math.cos(CupOVersionAngle)
-        sin_Tilt = math.sin(CupOVersionAngle)
-        CupData = ELF \
-            .CupRotation_IVTseq_AxisymPointCloud(sin_Lip, cos_Lip, sin_Inc,
-                                                 cos_Inc, sin_Ver, cos_Ver,
-                                                 sin_Tilt, cos_Tilt,
-                                                 MasterCupData,
-                                                 LipAngle_degrees,
-                                                 CupIncAngle_degrees,
-                                                 CupAVersionAngle_degrees,
-                                                 CupOVersionAngle_degrees)
-        if CupData == MasterCupData:
-            SystemError('Please check the liner has been rotated. If this is '
-                        'correct, MasterCupData has been changed erroneously.'
-                        ' Please ensure MasterCupData = CupData[0], else '
-                        'following cases will be incorrect. \n(Excepting all '
-                        'angles being 0 degrees)')
+
+        # The contact path, and the geometry it is found from, are reused
+        # from an earlier case with the same inclination, mismatch and head
+        CupData = None
+        StartID = None
+        caseCounters = {} if counters else None
+        ContactPath = caches['path'].get(PL.stage_key(case, 'path'))
+        if ContactPath is not None:
+            print('Reusing the contact points of an earlier case')
         else:
-            pass
-
-        hour = datetime.datetime.now().hour
-        mins = datetime.datetime.now().minute
-        sec = datetime.datetime.now().second
-        time = str(hour) + ':' + str(mins) + ':' + str(sec)
-        print('Done creating an edge list' + ': ' + time)
-
-        # Removing unnecessary points from the cup
-        CupFilletRad = 2
-        CupData = ELF \
-            .RemoveCupPoints_AxisymPointCloud(CupData, LatMaxDynSep,
-                                              AntMaxDynSep, CupIncAngle,
-                                              CupAVersionAngle,
-                                              CupOVersionAngle,
-                                              CupFilletRad, CupMeshSize)
-        StartID = CupData[1]
-        CupData = [CupData[0]]
-
-        hour = datetime.datetime.now().hour
-        mins = datetime.datetime.now().minute
-        sec = datetime.datetime.now().second
-        time = str(hour) + ':' + str(mins) + ':' + str(sec)
-        print('Done removing unnecessary points from the cup definition'
-              + ': ' + time)
+            ReducedCupData = caches['culled'].get(
+                PL.stage_key(case, 'culled'))
+            if ReducedCupData is not None:
+                print('Reusing the reduced cup definition of an earlier case')
+            else:
+                RotatedCupData = caches['rotated'].get(
+                    PL.stage_key(case, 'rotated'))
+                if RotatedCupData is not None:
+                    print('Reusing the rotated cup of an earlier case')
+                else:
+                    with timer.span('rotation'):
+                        RotatedCupData = rotate_cup(
+                            MasterCupData, LipAngle, CupIncAngle,
+                            CupAVersionAngle, CupOVersionAngle)
+                    caches['rotated'].put(PL.stage_key(case, 'rotated'),
+                                          RotatedCupData)
+
+                # Removing unnecessary points from the cup
+                CupFilletRad = 2
+                with timer.span('culling'):
+                    ReducedCupData = ELF.RemoveCupPoints_AxisymPointCloud(
+                        RotatedCupData, LatMaxDynSep, AntMaxDynSep,
+                        CupIncAngle, CupAVersionAngle, CupOVersionAngle,
+                        CupFilletRad, CupMeshSize)
+                caches['culled'].put(PL.stage_key(case, 'culled'),
+                                     ReducedCupData)
+
+                TM.progress('Done removing unnecessary points from the cup '
+                            'definition')
+            StartID = ReducedCupData[1]
+            CupData = [ReducedCupData[0]]
+            with timer.span('contact search'):
+                ContactPath = search(CupData, LatMaxDynSep, AntMaxDynSep,
+                                     ContactIts, HeadRad, StartID,
+                                     caseCounters)
+            caches['path'].put(PL.stage_key(case, 'path'), ContactPath)
 
         # Loop to find contact points
         AAFun = interp1d(ActivityData[0], ActivityData[2])
         FEFun = interp1d(ActivityData[0], ActivityData[3])
         IEFun = interp1d(ActivityData[0], ActivityData[4])
 
-        hour = datetime.datetime.now().hour
-        mins = datetime.datetime.now().minute
-        sec = datetime.datetime.now().second
-        time = str(hour) + ':' + str(mins) + ':' + str(sec)
-        print('Done creating interpolation functions for the head rotations'
-              + ': ' + time)
+        TM.progress('Done creating interpolation functions for the head '
+                    'rotations')
 
         CupOrient = [CupIncAngle, CupAVersionAngle, CupOVersionAngle]
         ContactList, df, CaseNamePath = ELF \
@@ -276,57 +427,193 @@ def run_analysis_2D(CaseName, JobFile, CupGeomFile, CupMeshSize, ContactIts,
                                                     CupMeshSize, CupGeomFile,
                                                     startTime, CaseName,
                                                     ActivityFile, LipAngle,
-                                                    linerPath, misc_dict)
+                                                    linerPath, misc_dict,
+                                                    ContactPath, timer,
+                                                    writer)
+        ELType = ContactList[0][1]
         ContactList = ContactList[0][0]
-
-        hour = datetime.datetime.now().hour
-        mins = datetime.datetime.now().minute
-        sec = datetime.datetime.now().second
-        time = str(hour) + ':' + str(mins) + ':' + str(sec)
-        print('Done calculating the final list of contact points'
-              + ': ' + time)
-
-        # Creation of pathway for graphs
-        mainDir = os.getcwd()[:-11]
-        resDir = mainDir + '\\output'
-        geom = os.path.basename(CupGeomFile)
-        linerDir = resDir + '\\' + geom[:-4]
-        caseDir = linerDir + '\\' + CaseName + '\\'
-        if not os.path.exists(caseDir + 'Charts'):
-            os.makedirs(caseDir + 'Charts')
-
-        # Rotating contact points to 0degrees for visualisation
-        df['Nz'], df['Ny'] = ELF.Rotate_2D(df['Nz'], df['Ny'], CupIncAngle,
-                                           direction=-1)
-        dfs.append(df)
-        caseNum += 1
+        with timer.span('output'):
+            if store is not None:
+                runTime = datetime.datetime.now() - startTime
+                writer.submit(resultStore.append, caseNum, df, RS.case_info(
+                    case, HeadRad, CupGeomFile, CupMeshSize, ContactIts,
+                    ELType, runTime.total_seconds()))
+            # Recorded once the raw data file has been written
+            writer.submit(CP.record_case, CaseNamePath, manifest, caseNum,
+                          signature, OutputFile)
+            if plots:
+                writer.submit(renderer.add_case, caseNum, OutputFile,
+                              CupIncAngle_degrees)
+
+        TM.progress('Done calculating the final list of contact points')
+        summaries[caseNum] = ELF.case_summary(df, CupIncAngle_degrees,
+                                              OutputFile)
+        timer.end_case()
+        if counters:
+            runTime = datetime.datetime.now() - startTime
+            counterLog.write(caseNum, runTime.total_seconds(), caseCounters)
         print('\n')
-    fig_no = 1
-    rc = [[1, 1], [1, 2], [2, 1], [2, 2]]
-    rc_count = 0
-    caseNum = 0
-    numCases = len(dfs) - 1
-    for fig in figs:
-        for i in range(4):
-            if caseNum <= numCases:
-                row, col, fig_no = ELF.create_models(
-                    dfs[caseNum], CupData_df, caseNum,
-                    graph_info, fig,
-                    CaseName, rows,
-                    cols, rc[rc_count][0], rc[rc_count][1], fig_no, fig_no,
-                    num_jobs,
-                    caseDir + 'Charts\\')
-                caseNum += 1
-                rc_count += 1
-            fig_no += 1
-            rc_count = 0
+    with timer.span('output'):
+        if store is not None:
+            writer.submit(resultStore.close)
+        writer.close()
+    if plots:
+        with timer.span('plotting'):
+            renderer.close()
 
     # Summarizing results of case list for geometry file
-    ELF.summarise_results(CaseNamePath, JobFile, CupGeomFile, CaseName,
-                          graph_info)
+    with timer.span('summary'):
+        ELF.summarise_results(CaseNamePath, JobFile, CupGeomFile, CaseName,
+                              graph_info, interactive, summaries, plots,
+                              'directory' if shared_plots else True)
+
+    if timing:
+        timer.write_json(os.path.join(CaseNamePath, TM.TIMING_NAME + '.json'))
+        timer.write_csv(os.path.join(CaseNamePath, TM.TIMING_NAME + '.csv'))
+        print(timer.report())
+
+    # Recording what was run, and the memory it needed
+    metadata = {'case_name': CaseName,
+                'job_file': JobFile,
+                'num_jobs': num_jobs,
+                'geom_file': CupGeomFile,
+                'mesh_size': CupMeshSize,
+                'contact_its': ContactIts,
+                'cache_memory_mb': cache_memory,
+                'engine': engine,
+                'store': store,
+                'write_queue': write_queue,
+                'plots': plots,
+                'plot_workers': plot_workers if plots else 0,
+                'shared_plots': shared_plots,
+                'case_order': plan.order,
+                'started': runStarted.isoformat(),
+                'finished': datetime.datetime.now().isoformat(),
+                'peak_rss_bytes': TM.peak_rss()}
+    if memory:
+        metadata['memory'] = timer.memory_summary()
+        metadata['frames'] = {
+            'CupData_df': int(CupData_df.memory_usage(deep=True).sum())}
+        timer.close()
+    TM.write_metadata(os.path.join(CaseNamePath, TM.METADATA_NAME), metadata)
+
+
+def read_settings(settFile):
+    """
+    Read a settings file written by the UI or for a manual run.
+
+    Parameters
+    ----------
+    settFile : str
+        Location of the settings file.
 
+    Returns
+    -------
+    dict
+        Settings keyed by parameter name, with ApproximateMeshSize and
+        ContactIterations converted to numbers.
 
-def main(mainPath=os.getcwd()):
+    """
+    settings = {}
+    with open(settFile, 'r', newline='') as csvfile:
+        setupData = csv.reader(csvfile, delimiter=',', dialect='excel')
+        for line in setupData:
+            parameterType = line[0]
+            parameterVal = line[1]
+            if parameterType == 'ApproximateMeshSize':
+                settings[parameterType] = float(parameterVal)
+            elif parameterType == 'ContactIterations':
+                settings[parameterType] = int(parameterVal)
+            else:
+                settings[parameterType] = parameterVal
+    return settings
+
+
+def run_settings(settFile, JobFile=None, mainPath=None, first_geom='Yes',
+                 resume=False, interactive=True,
+                 cache_memory=PL.DEFAULT_MEMORY_MB, timing=False,
+                 counters=False, memory=False, engine=EN.DEFAULT_ENGINE,
+                 store=None, write_queue=WR.DEFAULT_QUEUE_SIZE, plots=True,
+                 plot_workers=PT.DEFAULT_PLOT_WORKERS, shared_plots=True):
+    """
+    Set up the output folders for a settings file and run its analysis.
+
+    Parameters
+    ----------
+    settFile : str
+        Location of the settings file.
+    JobFile : str, optional
+        Location of the job list to run. If None the JobFile given in the
+        settings file is used. The default is None.
+    mainPath : str, optional
+        Top level directory, results are placed in its output folder. If None
+        the directory containing this repository is used. The default is None.
+    first_geom : str, optional
+        Identifies if this is the first geometry. The default is 'Yes'.
+    resume : bool, optional
+        Skip cases already completed by a previous run. The default is False.
+    interactive : bool, optional
+        If False, no dialogs or browser windows are opened. The default is
+        True.
+    cache_memory : float, optional
+        Memory available for reusing results between cases (MB). The default
+        is PL.DEFAULT_MEMORY_MB.
+    timing : bool, optional
+        Record the time spent in each stage. The default is False.
+    counters : bool, optional
+        Count the work done by the contact search of each case. The default
+        is False.
+    memory : bool, optional
+        Record the memory used by each stage. The default is False.
+    engine : str, optional
+        Contact search engine to use. The default is EN.DEFAULT_ENGINE.
+    store : str, optional
+        Also write the results to a 'parquet' or 'hdf5' store. The default
+        is None.
+    write_queue : int, optional
+        Finished cases that can wait to be saved in the background, 0 saves
+        them before starting the next case. The default is
+        WR.DEFAULT_QUEUE_SIZE.
+    plots : bool, optional
+        Make the Geometry-Force and bar chart plots. The default is True.
+    plot_workers : int, optional
+        Processes drawing the plots while the cases are run, 0 draws them in
+        this process. The default is PT.DEFAULT_PLOT_WORKERS.
+    shared_plots : bool, optional
+        Share one copy of the liner geometry and plotly.js between the plot
+        files. The default is True.
+
+    """
+    if mainPath is None:
+        mainPath = ELF.main_directory()
+    settings = read_settings(settFile)
+    CaseName = settings['CaseName']
+    if JobFile is None:
+        JobFile = settings['JobFile']
+
+    linerPath = os.path.join(mainPath, 'output', settings['CupGeomFolder'])
+    if linerPath[-4] == '.':
+        linerPath = linerPath[:-4]
+    caseDir = os.path.join(linerPath, CaseName)
+    for folder in ('Raw Data', 'Analysis Parameter Files'):
+        if not os.path.exists(os.path.join(caseDir, folder)):
+            os.makedirs(os.path.join(caseDir, folder))
+    paramDir = os.path.join(caseDir, 'Analysis Parameter Files')
+    for file in (settFile, JobFile):
+        copy = os.path.join(paramDir, os.path.basename(file))
+        if not (os.path.exists(copy) and os.path.samefile(file, copy)):
+            shutil.copy(file, paramDir)
+    run_analysis_2D(CaseName, JobFile, settings['CupGeomFile'],
+                    settings['ApproximateMeshSize'],
+                    settings['ContactIterations'], linerPath, first_geom,
+                    resume=resume, interactive=interactive,
+                    cache_memory=cache_memory, timing=timing,
+                    counters=counters, memory=memory, engine=engine,
+                    store=store, write_queue=write_queue, plots=plots,
+                    plot_workers=plot_workers, shared_plots=shared_plots)
+
+
+def main(mainPath=None, resume=False):
     r"""
     Drive the analysis without using UI.
 
@@ -342,64 +629,34 @@ def main(mainPath=os.getcwd()):
     be set to 0 in this release as it is only designed for ML
     separation cases.
 
-    :param mainPath: DESCRIPTION, defaults to os.getcwd()
-    :type mainPath: TYPE, optional
-    :return: DESCRIPTION
-    :rtype: TYPE
+    :param mainPath: Top level directory containing the config and output
+        folders, defaults to the directory containing this repository
+    :type mainPath: str, optional
+    :param resume: Skip cases already completed by a previous run of the same
+        settings, defaults to False
+    :type resume: bool, optional
 
     """
-    mainPath = mainPath[:-11]
-    path = mainPath + '\\config\\Manual_Run'
+    if mainPath is None:
+        mainPath = ELF.main_directory()
+    path = os.path.join(mainPath, 'config', 'Manual_Run')
     file_list = os.listdir(path)
 
     flagFirst = 1
     for filename in file_list:
         if filename[0:9] == 'Settings_':
-            with open(path + '\\' + filename, 'r', newline='') as csvfile:
-                setupData = csv.reader(csvfile, delimiter=',', dialect='excel')
-                for line in setupData:
-                    parameterType = line[0]
-                    parameterVal = line[1]
-                    if parameterType == 'CaseName':
-                        CaseName = parameterVal
-                    elif parameterType == 'JobFile':
-                        JobFile = parameterVal
-                    elif parameterType == 'CupGeomFile':
-                        CupGeomFile = parameterVal
-                    elif parameterType == 'ApproximateMeshSize':
-                        CupMeshSize = float(parameterVal)
-                    elif parameterType == 'ContactIterations':
-                        ContactIts = int(parameterVal)
-                    elif parameterType == 'CupGeomFolder':
-                        CupGeomFolder = parameterVal
-                    else:
-                        continue
-
-                if flagFirst == 1:
-                    first_geom = 'Yes'
-                    flagFirst = 0
-                else:
-                    first_geom = 'No'
-
-                linerPath = mainPath + '\\output\\' + CupGeomFolder
-                if linerPath[-4] == '.':
-                    linerPath = linerPath[:-4]
-                if not os.path.exists(linerPath):
-                    os.makedirs(linerPath)
-                caseDir = linerPath + '\\' + CaseName
-                if not os.path.exists(caseDir):
-                    os.makedirs(caseDir)
-                if not os.path.exists(caseDir + '\\Raw Data'):
-                    os.makedirs(caseDir + '\\Raw Data')
-                if not os.path.exists(caseDir + '\\Analysis Parameter Files'):
-                    os.makedirs(caseDir + '\\Analysis Parameter Files')
-                settFile = path + '\\' + filename
-                jobFile = path + '\\Joblist_' + filename[9:]
-                shutil.copy(settFile, caseDir + '\\Analysis Parameter Files')
-                shutil.copy(jobFile, caseDir + '\\Analysis Parameter Files')
-                run_analysis_2D(CaseName, JobFile, CupGeomFile, CupMeshSize,
-                                ContactIts, linerPath, first_geom)
+            if flagFirst == 1:
+                first_geom = 'Yes'
+                flagFirst = 0
+            else:
+                first_geom = 'No'
+            run_settings(os.path.join(path, filename), mainPath=mainPath,
+                         first_geom=first_geom, resume=resume)
 
 
 if __name__ == '__main__':
-    main()
+    parser = argparse.ArgumentParser(
+        description='Run the analyses set up in config\\Manual_Run.')
+    parser.add_argument('--resume', action='store_true',
+                        help='skip cases completed by a previous run')
+    main(resume=parser.parse_args().resume)
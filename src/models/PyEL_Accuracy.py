@@ -0,0 +1,307 @@
+"""
+Accuracy checks of contact search engines against the reference.
+
+Runs the reference contact search (PyEL_Functions.contact_path) and a
+candidate engine from PyEL_Engines on the same cases, seeding the random
+number generator the same way before each, and compares for every case
+
+* the contact node sequence (Old Point ID at each separation position)
+* the maximum lateral separation
+* the peak axial force while edge loading
+* the edge loading classification
+
+against stated tolerances, with the speed of the candidate relative to the
+reference, e.g. from the src/models folder
+
+    python -m pyel accuracy --engine indexed
+
+By default the cases are run on a synthetic liner (see PyEL_SyntheticLiner)
+with the SmoothedISO load profile; a liner file and job list can be given
+instead. The command exits with an error if any case is outside the
+tolerances, so it can be used as a check before switching sweeps to a new
+engine.
+
+Version 1.0 (19/10/26)
+"""
+
+
+import json
+import math
+import random
+
+import PyEL_Benchmark as BM
+import PyEL_Engines as EN
+import PyEL_Functions as ELF
+import PyEL_Library as ELL
+
+
+# Largest differences from the reference allowed for a case to pass.
+# Contact node sequences must match exactly, as must the edge loading
+# classification.
+DEFAULT_TOLERANCES = {'path_mismatches': 0,
+                      'max_lat_sep_mm': 1e-9,
+                      'peak_axial_force_n': 1e-6}
+
+# Cases checked by default (inclination, lateral mismatch)
+DEFAULT_CASES = [(inc, lat) for inc in (35.0, 45.0, 55.0, 65.0)
+                 for lat in (1.0, 2.0, 4.0)]
+
+DEFAULT_CONTACT_ITS = 500
+
+DEFAULT_POINTS = 10000
+
+
+def default_cases(ActivityFile, ContactIts=DEFAULT_CONTACT_ITS):
+    """
+    Return the cases checked by default.
+
+    Parameters
+    ----------
+    ActivityFile : str
+        File path to the load profile.
+    ContactIts : int, optional
+        Number of separation positions. The default is DEFAULT_CONTACT_ITS.
+
+    Returns
+    -------
+    list
+        Case dictionaries, see PyEL_Library.solve_case.
+
+    """
+    return [{'sim_inc': inc, 'lat_mm': lat, 'lat_spr': 100.0,
+             'load_file': ActivityFile, 'contact_its': ContactIts}
+            for inc, lat in DEFAULT_CASES]
+
+
+def case_metrics(ContactForceTimeList, df):
+    """
+    Return the results of a case that engines are compared on.
+
+    The maximum lateral separation and peak axial force are found as in the
+    results summary: the peak axial force is the largest while the contact
+    point is on the edge of the liner.
+
+    Parameters
+    ----------
+    ContactForceTimeList : list
+        First output of PyEL_Functions.solve_contact.
+    df : DataFrame
+        Second output of PyEL_Functions.solve_contact.
+
+    Returns
+    -------
+    dict
+        'path' (Old Point ID at each position), 'max_lat_sep_mm',
+        'peak_axial_force_n' (None without edge loading), 'edge_loading'
+        and 'el_type'.
+
+    """
+    edge = df['Location'].apply(lambda Loc: 'EL_' in str(Loc))
+    edgeLoading = bool(edge.any())
+    if edgeLoading:
+        peak = float(df.loc[edge, 'Axial Force (N)'].max())
+    else:
+        peak = None
+    return {'path': df['Old Point ID'].tolist(),
+            'max_lat_sep_mm': float(df['Lateral Mismatch'].max()),
+            'peak_axial_force_n': peak,
+            'edge_loading': edgeLoading,
+            'el_type': ContactForceTimeList[1]}
+
+
+def _difference(reference, candidate):
+    """Return the size of the difference between two optional values."""
+    if reference is None and candidate is None:
+        return 0.0
+    if reference is None or candidate is None:
+        return math.inf
+    return abs(candidate - reference)
+
+
+def compare_metrics(reference, candidate, tolerances=None):
+    """
+    Compare the results of a candidate engine with the reference.
+
+    Parameters
+    ----------
+    reference, candidate : dict
+        Outputs of case_metrics.
+    tolerances : dict, optional
+        Largest differences allowed. The default is DEFAULT_TOLERANCES.
+
+    Returns
+    -------
+    dict
+        Number of positions with a different contact point (including any
+        missing from the end of the shorter path), the differences in
+        maximum lateral separation and peak axial force, whether the edge
+        loading classification matches, and whether all of these are
+        within the tolerances ('passed').
+
+    """
+    if tolerances is None:
+        tolerances = DEFAULT_TOLERANCES
+    mismatches = sum(a != b for a, b
+                     in zip(reference['path'], candidate['path']))
+    mismatches += abs(len(reference['path']) - len(candidate['path']))
+    deltas = {'path_mismatches': mismatches,
+              'max_lat_sep_mm': _difference(reference['max_lat_sep_mm'],
+                                            candidate['max_lat_sep_mm']),
+              'peak_axial_force_n': _difference(
+                  reference['peak_axial_force_n'],
+                  candidate['peak_axial_force_n'])}
+    classMatch = (reference['edge_loading'] == candidate['edge_loading']
+                  and reference['el_type'] == candidate['el_type'])
+    passed = classMatch and all(deltas[name] <= tolerances[name]
+                                for name in deltas)
+    comparison = dict(deltas)
+    comparison.update({'el_match': classMatch, 'passed': passed})
+    return comparison
+
+
+def run_engine(engine, CupData, case, HeadRad, StartID, seed, repeat):
+    """
+    Solve a case with a contact search engine.
+
+    Parameters
+    ----------
+    engine : str
+        Name of the engine, see PyEL_Engines.ENGINES.
+    CupData : list
+        Reduced cup data from PyEL_Library.cull_geometry.
+    case : dict
+        Case parameters, see PyEL_Library.solve_case.
+    HeadRad : float
+        Radius of the head (mm).
+    StartID : int
+        ID of the first point to search from for contact.
+    seed : int
+        Seed for the random restarts of the search, set before each run.
+    repeat : int
+        Number of times to time the search.
+
+    Returns
+    -------
+    tuple
+        (timing of the search, see PyEL_Benchmark.time_call, output of
+        case_metrics)
+
+    """
+    search = EN.get_engine(engine)
+    LatMaxDynSep = float(case['lat_mm'])
+    ContactIts = int(case.get('contact_its', ELL.DEFAULT_CONTACT_ITS))
+
+    def contact():
+        random.seed(seed)
+        return search([CupData], LatMaxDynSep, 0, ContactIts, HeadRad,
+                      StartID)
+
+    timing, ContactPath = BM.time_call(contact, repeat)
+    ActivityData, LoadSections = ELL.load_activity(case['load_file'])
+    ContactForceTimeList, df = ELF.solve_contact(
+        [CupData], LatMaxDynSep, 0, float(case['lat_spr']), 0, ContactIts,
+        HeadRad, LoadSections, ActivityData[0], StartID,
+        ContactPath=ContactPath)
+    return timing, case_metrics(ContactForceTimeList, df)
+
+
+def check_engine(geometry, cases, engine, seed=0, repeat=1, tolerances=None):
+    """
+    Compare an engine with the reference on a set of cases.
+
+    Parameters
+    ----------
+    geometry : dict
+        Output of PyEL_Library.load_geometry.
+    cases : iterable
+        Case dictionaries, see PyEL_Library.solve_case.
+    engine : str
+        Name of the candidate engine.
+    seed : int, optional
+        Seed for the random restarts. The default is 0.
+    repeat : int, optional
+        Number of times to time each search. The default is 1.
+    tolerances : dict, optional
+        Largest differences allowed. The default is DEFAULT_TOLERANCES.
+
+    Returns
+    -------
+    list
+        For each case: the case, the output of compare_metrics, the fastest
+        search time of each engine and the speed ratio (reference time over
+        candidate time).
+
+    """
+    results = []
+    for case in cases:
+        IncDegrees = float(case['sim_inc'])
+        CupData = ELL.rotate_geometry(geometry, IncDegrees)
+        CupData = ELL.cull_geometry(geometry, CupData, IncDegrees,
+                                    float(case['lat_mm']))
+        HeadRad = ELL.case_head_radius(geometry, case)
+        refTiming, reference = run_engine(
+            'reference', CupData[0], case, HeadRad, CupData[1], seed, repeat)
+        timing, candidate = run_engine(
+            engine, CupData[0], case, HeadRad, CupData[1], seed, repeat)
+        result = {'case': {name: value for name, value in case.items()
+                           if name != 'load_file'},
+                  'reference_s': refTiming['min_s'],
+                  'candidate_s': timing['min_s'],
+                  'speed_ratio': refTiming['min_s'] / timing['min_s']}
+        result.update(compare_metrics(reference, candidate, tolerances))
+        results.append(result)
+    return results
+
+
+def report(results, engine, tolerances=None):
+    """
+    Describe the accuracy and speed of an engine.
+
+    Parameters
+    ----------
+    results : list
+        Output of check_engine.
+    engine : str
+        Name of the candidate engine.
+    tolerances : dict, optional
+        Tolerances the results were checked against. The default is
+        DEFAULT_TOLERANCES.
+
+    Returns
+    -------
+    str
+        One line per case and an overall verdict.
+
+    """
+    if tolerances is None:
+        tolerances = DEFAULT_TOLERANCES
+    lines = ['Engine ' + engine + ' against reference (tolerances: '
+             + ', '.join(name + ' ' + str(value)
+                         for name, value in tolerances.items()) + ')',
+             '{:>6} {:>6} {:>10} {:>12} {:>12} {:>5} {:>7} {}'.format(
+                 'inc', 'lat', 'mismatches', 'd lat sep', 'd peak AF', 'EL',
+                 'speed', 'result')]
+    for result in results:
+        lines.append('{:>6} {:>6} {:>10} {:>12.3g} {:>12.3g} {:>5} {:>6.2f}x '
+                     '{}'.format(result['case']['sim_inc'],
+                                 result['case']['lat_mm'],
+                                 result['path_mismatches'],
+                                 result['max_lat_sep_mm'],
+                                 result['peak_axial_force_n'],
+                                 'ok' if result['el_match'] else 'DIFF',
+                                 result['speed_ratio'],
+                                 'pass' if result['passed'] else 'FAIL'))
+    failed = sum(not result['passed'] for result in results)
+    reference = sum(result['reference_s'] for result in results)
+    candidate = sum(result['candidate_s'] for result in results)
+    lines.append(str(len(results) - failed) + ' of ' + str(len(results))
+                 + ' cases within tolerance, contact search '
+                 + str(round(reference / candidate, 2))
+                 + 'x the speed of the reference overall')
+    return '\n'.join(lines)
+
+
+def write_results(results, path):
+    """Save the results of check_engine as json."""
+    with open(path, 'w') as file:
+        json.dump(results, file, indent=1, default=str)
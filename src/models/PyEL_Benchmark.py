@@ -0,0 +1,391 @@
+"""
+Benchmarks of the main stages of the model.
+
+Times the geometry loader, rotation, culling, the contact calculation, the
+time point calculation and the results summary on synthetic liners of
+increasing mesh density (see PyEL_SyntheticLiner) with the SmoothedISO load
+profile, e.g. from the src/models folder
+
+    python -m pyel bench --points 10000 40000 160000
+
+Each stage is run a few times and the fastest, median and mean times kept.
+Results are saved as json in output/benchmarks, named by date and git commit,
+so they can be compared between commits with --compare.
+
+The synthetic liners are kept in output/benchmarks/liners and only written
+the first time they are needed. The contact search's random restarts are
+seeded, so every run times the same work.
+
+Version 1.0 (19/10/26)
+"""
+
+
+import datetime
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+
+import numpy
+
+import PyEL_Functions as ELF
+import PyEL_JobList as JL
+import PyEL_Library as ELL
+import PyEL_SyntheticLiner as SL
+
+
+# Liner sizes benchmarked by default (points)
+DEFAULT_POINTS = (10000, 40000, 160000)
+
+DEFAULT_REPEAT = 3
+
+# Case timed on each liner, an edge loading case
+BENCH_CASE = {'sim_inc': 55.0, 'lat_mm': 4.0, 'lat_spr': 100.0,
+              'contact_its': 2000}
+
+# Cases summarised by the summary benchmark (inclination, lateral mismatch)
+SUMMARY_CASES = [(inc, lat) for inc in (45.0, 65.0)
+                 for lat in (1.0, 2.0, 3.0, 4.0)]
+
+# Default plot settings of the runner
+GRAPH_INFO = {"graph_force": "Axial",
+              "params": ['dflt_bar_chart'],
+              "per_page": 4,
+              "row_col_params": ['sim_inc', 'ver_ang', 'tilt_ang',
+                                 'lip_ang', 'head_rad', 'load_file'],
+              "x_params": ['lat_mm', 'ant_mm', 'lat_spr', 'ant_spr']}
+
+
+def benchmark_directory(mainPath=None):
+    """Return the folder benchmark results are saved in."""
+    if mainPath is None:
+        mainPath = ELF.main_directory()
+    return os.path.join(mainPath, 'output', 'benchmarks')
+
+
+def default_activity_file():
+    """Return the location of the SmoothedISO load profile."""
+    return os.path.join(ELF.main_directory(), 'data', 'external',
+                        'SmoothedISO-70NSwPL.csv')
+
+
+def time_call(func, repeat):
+    """
+    Time a function.
+
+    Parameters
+    ----------
+    func : callable
+        Function to time, called with no arguments.
+    repeat : int
+        Number of times to call it.
+
+    Returns
+    -------
+    tuple
+        (dict of the fastest, median and mean time and the times of every
+        call in seconds, result of the last call)
+
+    """
+    times = []
+    for i in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - started)
+    return {'min_s': min(times), 'median_s': statistics.median(times),
+            'mean_s': statistics.mean(times), 'times_s': times}, result
+
+
+def liner_file(points, linerDir):
+    """
+    Return a synthetic liner with about a number of points, writing it if
+    it does not exist yet.
+
+    Returns
+    -------
+    tuple
+        (file path, mesh size) of the liner.
+
+    """
+    path = os.path.join(linerDir, 'Liner_' + str(points) + '.txt')
+    MeshSize = SL.mesh_size_for_points(points)
+    if not os.path.exists(path):
+        if not os.path.exists(linerDir):
+            os.makedirs(linerDir)
+        SL.write_liner(path, MeshSize=MeshSize)
+    return path, MeshSize
+
+
+def bench_liner(CupGeomFile, MeshSize, ActivityFile, repeat, workDir):
+    """
+    Time each stage of the model on one liner.
+
+    Parameters
+    ----------
+    CupGeomFile : str
+        File path to the point cloud geometry file.
+    MeshSize : float
+        Approximate point spacing of the point cloud (mm).
+    ActivityFile : str
+        File path to the load profile.
+    repeat : int
+        Number of times each stage is run.
+    workDir : str
+        Folder the contact calculation can write its results to.
+
+    Returns
+    -------
+    dict
+        Timings of each stage, keyed by the name of the function timed.
+
+    """
+    from scipy.interpolate import interp1d
+
+    results = {}
+    timing, CupData = time_call(
+        lambda: ELF.CupGeom_AxisymPointCloud(CupGeomFile, 'd'), repeat)
+    results['CupGeom_AxisymPointCloud'] = timing
+    MasterCupData, HeadRad = CupData
+
+    ActivityData = ELF.ReadActivity(ActivityFile, interactive=False)
+    LoadSections = ELF.Load_IdealisedTwoPeak(ActivityData)
+
+    IncDegrees = BENCH_CASE['sim_inc']
+    Inc = math.radians(IncDegrees)
+    LatMM = BENCH_CASE['lat_mm']
+    LatSpr = BENCH_CASE['lat_spr']
+    ContactIts = BENCH_CASE['contact_its']
+
+    timing, RotatedCupData = time_call(
+        lambda: ELF.CupRotation_IVTseq_AxisymPointCloud(
+            0, 1, math.sin(Inc), math.cos(Inc), 0, 1, 0, 1, MasterCupData,
+            0, IncDegrees, 0, 0, verbose=False), repeat)
+    results['CupRotation_IVTseq_AxisymPointCloud'] = timing
+
+    timing, ReducedCupData = time_call(
+        lambda: ELF.RemoveCupPoints_AxisymPointCloud(
+            RotatedCupData, LatMM, 0, Inc, 0, 0, ELL.CUP_FILLET_RAD,
+            MeshSize, verbose=False), repeat)
+    results['RemoveCupPoints_AxisymPointCloud'] = timing
+    StartID = ReducedCupData[1]
+
+    AAFun = interp1d(ActivityData[0], ActivityData[2])
+    FEFun = interp1d(ActivityData[0], ActivityData[3])
+    IEFun = interp1d(ActivityData[0], ActivityData[4])
+
+    def contact():
+        random.seed(0)
+        return ELF.ContactCalculator_AxisymPointCloud_IVT(
+            [ReducedCupData[0]], LatMM, 0, LatSpr, 0, ContactIts, HeadRad,
+            [Inc, 0, 0], LoadSections, AAFun, FEFun, IEFun, 0,
+            ActivityData[0], StartID, MeshSize, CupGeomFile,
+            datetime.datetime.now(), 'Bench', ActivityFile, 0, workDir, {})
+
+    timing, result = time_call(contact, repeat)
+    results['ContactCalculator_AxisymPointCloud_IVT'] = timing
+    results['ContactCalculator_AxisymPointCloud_IVT']['contact_points'] = \
+        len(result[1])
+
+    random.seed(0)
+    ContactList = ELF.contact_path([ReducedCupData[0]], LatMM, 0, ContactIts,
+                                   HeadRad, StartID)
+    ContactForceList = ELF.contact_forces(ContactList, LatMM, 0, LatSpr, 0)
+    timing, result = time_call(
+        lambda: ELF.TimePoints_IdealisedTwoPeak_AxisymPointCloud(
+            LoadSections, ContactForceList), repeat)
+    results['TimePoints_IdealisedTwoPeak_AxisymPointCloud'] = timing
+
+    results['reduced_points'] = len(ReducedCupData[0]) - 1
+    results['mesh_size'] = MeshSize
+    return results
+
+
+def bench_summary(CupGeomFile, MeshSize, ActivityFile, repeat, workDir):
+    """
+    Time summarise_results on the results of SUMMARY_CASES, summarised as
+    they were solved.
+
+    Parameters
+    ----------
+    CupGeomFile : str
+        File path to the point cloud geometry file.
+    MeshSize : float
+        Approximate point spacing of the point cloud (mm).
+    ActivityFile : str
+        File path to the load profile.
+    repeat : int
+        Number of times to run the summary.
+    workDir : str
+        Folder to write the results and summary to.
+
+    Returns
+    -------
+    dict
+        Timing of summarise_results.
+
+    """
+    CaseName = 'Bench'
+    CaseNamePath = os.path.join(workDir, CaseName)
+    geometry = ELL.load_geometry(CupGeomFile, MeshSize)
+    sink = ELL.RawDataSink(CaseNamePath, CaseName)
+    axes = {name: [0.0] for name in JL.JOB_AXES}
+    axes.update({'sim_inc': sorted(set(inc for inc, lat in SUMMARY_CASES)),
+                 'head_rad': ['dflt'],
+                 'lat_mm': sorted(set(lat for inc, lat in SUMMARY_CASES)),
+                 'lat_spr': [BENCH_CASE['lat_spr']],
+                 'load_file': [ActivityFile]})
+    JobFile = os.path.join(workDir, 'Joblist_Bench.csv')
+    JL.write_job_csv(JobFile, axes)
+    random.seed(0)
+    cases = [dict(case, contact_its=500) for case in JL.iter_job_file(JobFile)]
+    # Summarised as the cases finish, as the runner does
+    summaries = {}
+    for caseNum, result in ELL.solve_cases(geometry, cases, sink):
+        summaries[caseNum] = ELF.case_summary(
+            result, result.attrs['case']['sim_inc'],
+            os.path.join(CaseNamePath, 'Raw Data', str(caseNum) + '_'
+                         + CaseName + '_Results.txt'))
+    os.makedirs(os.path.join(CaseNamePath, 'Charts'))
+
+    timing, result = time_call(
+        lambda: ELF.summarise_results(CaseNamePath, JobFile, CupGeomFile,
+                                      CaseName, GRAPH_INFO,
+                                      interactive=False, Summary=summaries),
+        repeat)
+    timing['cases'] = len(cases)
+    return timing
+
+
+def git_commit():
+    """Return the current git commit, or None if it cannot be found."""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+            text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(points=DEFAULT_POINTS, repeat=DEFAULT_REPEAT,
+                   ActivityFile=None, mainPath=None):
+    """
+    Run the benchmarks.
+
+    Parameters
+    ----------
+    points : iterable, optional
+        Sizes of synthetic liner to benchmark (points). The default is
+        DEFAULT_POINTS.
+    repeat : int, optional
+        Number of times each stage is run. The default is DEFAULT_REPEAT.
+    ActivityFile : str, optional
+        Load profile to use. The default is None, SmoothedISO-70NSwPL.csv.
+    mainPath : str, optional
+        Top level directory, the liners are kept in its output/benchmarks
+        folder. The default is None, the top of this repository.
+
+    Returns
+    -------
+    dict
+        Details of the machine and commit, and the timings of each stage for
+        each liner ('liners') and of the summary ('summarise_results').
+
+    """
+    if ActivityFile is None:
+        ActivityFile = default_activity_file()
+    linerDir = os.path.join(benchmark_directory(mainPath), 'liners')
+    workDir = tempfile.mkdtemp(prefix='pyel_bench_')
+    results = {'date': datetime.datetime.now().isoformat(),
+               'commit': git_commit(),
+               'python': platform.python_version(),
+               'numpy': numpy.__version__,
+               'platform': platform.platform(),
+               'repeat': repeat,
+               'case': BENCH_CASE,
+               'activity_file': os.path.basename(ActivityFile),
+               'liners': {}}
+    try:
+        for numPoints in points:
+            CupGeomFile, MeshSize = liner_file(numPoints, linerDir)
+            print('Benchmarking ' + os.path.basename(CupGeomFile))
+            results['liners'][str(numPoints)] = bench_liner(
+                CupGeomFile, MeshSize, ActivityFile, repeat, workDir)
+        print('Benchmarking summarise_results')
+        CupGeomFile, MeshSize = liner_file(min(points), linerDir)
+        results['summarise_results'] = bench_summary(
+            CupGeomFile, MeshSize, ActivityFile, repeat, workDir)
+    finally:
+        shutil.rmtree(workDir, ignore_errors=True)
+    return results
+
+
+def write_results(results, mainPath=None):
+    """
+    Save benchmark results as json in output/benchmarks.
+
+    Returns
+    -------
+    str
+        File path written to.
+
+    """
+    outDir = benchmark_directory(mainPath)
+    if not os.path.exists(outDir):
+        os.makedirs(outDir)
+    date = datetime.datetime.fromisoformat(results['date'])
+    name = 'bench_' + date.strftime('%Y%m%d-%H%M%S')
+    if results['commit']:
+        name += '_' + results['commit']
+    path = os.path.join(outDir, name + '.json')
+    with open(path, 'w') as file:
+        json.dump(results, file, indent=1)
+    return path
+
+
+def _flatten(results):
+    """Return the fastest time of every benchmark, keyed by a flat name."""
+    flat = {}
+    for numPoints, stages in results['liners'].items():
+        for stage, timing in stages.items():
+            if isinstance(timing, dict):
+                flat[stage + ' [' + numPoints + ']'] = timing['min_s']
+    if 'summarise_results' in results:
+        flat['summarise_results'] = results['summarise_results']['min_s']
+    return flat
+
+
+def report(results, baseline=None):
+    """
+    Describe benchmark results, compared with earlier results if given.
+
+    Parameters
+    ----------
+    results : dict
+        Output of run_benchmarks.
+    baseline : dict, optional
+        Earlier results to compare with. The default is None.
+
+    Returns
+    -------
+    str
+        One line per benchmark with its fastest time, and the ratio of the
+        baseline time to it (above 1 is a speed up).
+
+    """
+    flat = _flatten(results)
+    old = _flatten(baseline) if baseline is not None else {}
+    lines = []
+    for name, seconds in flat.items():
+        line = '{:<60} {:>10.4f} s'.format(name, seconds)
+        if name in old:
+            line += '   x{:.2f} vs {}'.format(old[name] / seconds,
+                                              baseline.get('commit'))
+        lines.append(line)
+    return '\n'.join(lines)
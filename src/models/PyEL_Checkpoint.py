@@ -0,0 +1,200 @@
+"""
+Checkpointing for analysis runs.
+
+Keeps a manifest of the cases in a run that have finished, so that a sweep
+which stops part way through (a crash, a bad activity file, a killed job) can
+be resumed without re-running the cases that already have valid results.
+
+The manifest is a json lines file with one line appended per finished case,
+written in a single call and flushed to disk only after the case's raw data
+file is complete. A line cut short by a crash is ignored when the manifest is
+read, so the manifest only ever lists cases that finished, and recording a
+case costs the same however long the sweep is.
+
+Version 1.0 (19/10/26)
+"""
+
+
+import json
+import os
+
+import PyEL_JobList as JL
+
+
+MANIFEST_NAME = 'Run Manifest.jsonl'
+
+
+def case_signature(case, CupGeomFile, CupMeshSize, ContactIts):
+    """
+    Describe a case so that a previous result can be matched to it.
+
+    Parameters
+    ----------
+    case : dict
+        Case parameters, as read by PyEL_JobList.iter_job_file.
+    CupGeomFile : str
+        Location of liner geometry file for analysis.
+    CupMeshSize : float
+        Approximate point spacing of the point cloud (mm).
+    ContactIts : int
+        Number of separation positions to evaluate forces at.
+
+    Returns
+    -------
+    dict
+        JSON serialisable description of every input that affects the result.
+
+    """
+    signature = {name: case[name] for name in JL.JOB_AXES}
+    signature.update({'geom_file': CupGeomFile,
+                      'mesh_size': CupMeshSize,
+                      'contact_its': ContactIts})
+    return signature
+
+
+def results_file(CaseNamePath, caseNum, CaseName):
+    """
+    Return the location of the raw data file written for a case.
+
+    Parameters
+    ----------
+    CaseNamePath : str
+        Location for putting raw data and charts.
+    caseNum : int
+        Index of the case in the job list.
+    CaseName : str
+        Name of the case being run.
+
+    Returns
+    -------
+    str
+        File path of the case's raw data file.
+
+    """
+    return os.path.join(CaseNamePath, 'Raw Data',
+                        str(caseNum) + '_' + CaseName + '_Results.txt')
+
+
+def read_manifest(CaseNamePath):
+    """
+    Read the completion manifest for a run.
+
+    Parameters
+    ----------
+    CaseNamePath : str
+        Location for putting raw data and charts.
+
+    Returns
+    -------
+    dict
+        Completed cases keyed by case number (as a string). Empty if there is
+        no manifest.
+
+    """
+    manifest = {}
+    path = os.path.join(CaseNamePath, MANIFEST_NAME)
+    try:
+        with open(path, 'r') as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Partly written line from an interrupted run
+                    continue
+                manifest[str(entry['case_num'])] = entry
+    except FileNotFoundError:
+        pass
+    return manifest
+
+
+def open_manifest(CaseNamePath, resume):
+    """
+    Prepare the completion manifest at the start of a run.
+
+    Parameters
+    ----------
+    CaseNamePath : str
+        Location for putting raw data and charts.
+    resume : bool
+        If True the existing manifest is kept and read, otherwise a new empty
+        one is started.
+
+    Returns
+    -------
+    dict
+        Completed cases keyed by case number (as a string).
+
+    """
+    path = os.path.join(CaseNamePath, MANIFEST_NAME)
+    if not resume or not os.path.exists(path):
+        with open(path, 'w'):
+            pass
+        return {}
+    # Finish off a line cut short by an interrupted run so that the next
+    # case is recorded on a line of its own
+    with open(path, 'rb+') as file:
+        if file.seek(0, os.SEEK_END) > 0:
+            file.seek(-1, os.SEEK_END)
+            if file.read(1) != b'\n':
+                file.write(b'\n')
+    return read_manifest(CaseNamePath)
+
+
+def record_case(CaseNamePath, manifest, caseNum, signature, OutputFile):
+    """
+    Mark a case as complete and append it to the manifest.
+
+    Parameters
+    ----------
+    CaseNamePath : str
+        Location for putting raw data and charts.
+    manifest : dict
+        Completed cases keyed by case number, updated in place.
+    caseNum : int
+        Index of the case in the job list.
+    signature : dict
+        Output of case_signature for the case.
+    OutputFile : str
+        Raw data file written for the case.
+
+    """
+    entry = {'case_num': caseNum,
+             'signature': signature,
+             'file': os.path.basename(OutputFile),
+             'size': os.path.getsize(OutputFile)}
+    manifest[str(caseNum)] = entry
+    with open(os.path.join(CaseNamePath, MANIFEST_NAME), 'a') as file:
+        file.write(json.dumps(entry) + '\n')
+        file.flush()
+        os.fsync(file.fileno())
+
+
+def case_complete(CaseNamePath, manifest, caseNum, signature):
+    """
+    Check whether a case already has a valid result from a previous run.
+
+    A result is only reused if it was run with the same inputs and its raw
+    data file is still present with the size recorded when it finished.
+
+    Parameters
+    ----------
+    CaseNamePath : str
+        Location for putting raw data and charts.
+    manifest : dict
+        Completed cases keyed by case number (as a string).
+    caseNum : int
+        Index of the case in the job list.
+    signature : dict
+        Output of case_signature for the case.
+
+    Returns
+    -------
+    bool
+        True if the case can be skipped.
+
+    """
+    entry = manifest.get(str(caseNum))
+    if entry is None or entry['signature'] != signature:
+        return False
+    path = os.path.join(CaseNamePath, 'Raw Data', entry['file'])
+    return os.path.isfile(path) and os.path.getsize(path) == entry['size']
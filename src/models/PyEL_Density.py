@@ -0,0 +1,292 @@
+"""
+Contact density heatmaps across the cases of a sweep.
+
+Overlaying the contact paths of thousands of cases is not practical, so
+this projects the contact points of every case onto one grid over the
+unrotated liner instead: each point is rotated back to 0° inclination (as
+for the plots, with PyEL_Functions.Rotate_2D) and placed by its angles about
+the centre of the liner,
+
+* polar angle, from the pole of the liner (the +y axis), 90° at the face
+* azimuth, around the pole from +x (anterior) towards +z (medial)
+
+and all of the points are binned in one pass, weighted by the number of
+points (the time spent in contact at each place) or by their axial force.
+The grid is saved as a .npz array and drawn as a heatmap, named after the
+weight and the points binned (e.g. Contact Density <name> (axial_force,
+edge).npz) so that each can be kept side by side, e.g. from the src/models
+folder
+
+    python -m pyel density <case folder> --weight axial_force --edge-only
+
+Points are read from the run's results store if it has one (see
+PyEL_ResultStore), otherwise from its raw data files.
+
+Version 1.0 (19/10/26)
+"""
+
+
+import math
+import os
+
+import numpy
+import pandas as pd
+
+import PyEL_Functions as ELF
+import PyEL_ResultStore as RS
+
+
+# Ways of weighting the points
+WEIGHTS = ('count', 'axial_force')
+
+# Bins of azimuth and polar angle
+DEFAULT_BINS = (180, 60)
+
+# Smallest range of polar angles binned (degrees), widened to fit points
+# past the face of the liner
+POLAR_RANGE = (0.0, 90.0)
+
+DENSITY_NAME = 'Contact Density '
+
+
+def liner_angles(Nx, Ny, Nz):
+    """
+    Return the angles of points about the centre of the unrotated liner.
+
+    Parameters
+    ----------
+    Nx, Ny, Nz : ndarray
+        Positions of the points.
+
+    Returns
+    -------
+    tuple
+        (azimuth, polar angle) of each point in degrees, see the module
+        docstring.
+
+    """
+    radius = numpy.sqrt(Nx ** 2 + Ny ** 2 + Nz ** 2)
+    polar = numpy.degrees(numpy.arccos(numpy.clip(Ny / radius, -1, 1)))
+    azimuth = numpy.degrees(numpy.arctan2(Nz, Nx))
+    return azimuth, polar
+
+
+def _edge(Location):
+    """Return which locations are on the edge of the liner."""
+    return numpy.array(['EL_' in str(Loc) for Loc in Location], dtype=bool)
+
+
+def raw_data_points(CaseNamePath, CaseName, edge_only=False):
+    """
+    Read the contact points of a run from its raw data files.
+
+    Parameters
+    ----------
+    CaseNamePath : str
+        Location of the run's raw data and charts.
+    CaseName : str
+        Name of the case that was run.
+    edge_only : bool, optional
+        If True, only points on the edge of the liner are read. The default
+        is False.
+
+    Returns
+    -------
+    tuple
+        (DataFrame of Nx, Ny and Nz rotated back to 0° inclination and the
+        axial force of each point, number of cases)
+
+    """
+    frames = []
+    cases = RS.raw_data_cases(CaseNamePath, CaseName)
+    for caseNum, OutputFile in cases:
+        with open(OutputFile, 'r') as file:
+            case = RS.read_header(file.readline())[0]
+        df = pd.read_csv(OutputFile, skiprows=1,
+                         usecols=['Nx', 'Ny', 'Nz', 'Axial Force (N)',
+                                  'Location'])
+        if edge_only:
+            df = df[_edge(df['Location'])]
+        df['Nz'], df['Ny'] = ELF.Rotate_2D(
+            df['Nz'], df['Ny'], math.radians(case['sim_inc']), direction=-1)
+        frames.append(df[['Nx', 'Ny', 'Nz', 'Axial Force (N)']])
+    if not frames:
+        raise FileNotFoundError('No raw data files for ' + CaseName + ' in '
+                                + CaseNamePath)
+    return pd.concat(frames, ignore_index=True), len(cases)
+
+
+def store_points(path, edge_only=False):
+    """
+    Read the contact points of a run from its results store.
+
+    Parameters and returns are as for raw_data_points, apart from path, the
+    location of the store.
+
+    """
+    filters = None
+    if edge_only:
+        codes = [code for code, label in enumerate(RS.read_locations(path))
+                 if 'EL_' in label]
+        filters = [('location', 'in', codes)]
+    df = RS.read_results(path, filters,
+                         ['case_num', 'nx', 'ny', 'nz', 'axial_force_n'])
+    cases = RS.read_cases(path)
+    inclinations = cases.set_index('case_num')['sim_inc']
+    Inc = numpy.radians(inclinations.reindex(df['case_num']).to_numpy())
+    Nz, Ny = ELF.Rotate_2D(df['nz'].to_numpy(), df['ny'].to_numpy(), Inc,
+                           direction=-1)
+    return pd.DataFrame({'Nx': df['nx'].to_numpy(), 'Ny': Ny, 'Nz': Nz,
+                         'Axial Force (N)': df['axial_force_n'].to_numpy()}
+                        ), len(cases)
+
+
+def contact_density(points, weight='count', bins=DEFAULT_BINS):
+    """
+    Bin contact points by their angles about the liner.
+
+    Parameters
+    ----------
+    points : DataFrame
+        Output of raw_data_points or store_points.
+    weight : str, optional
+        'count' to count the points in each bin, or 'axial_force' to sum
+        their axial force. The default is 'count'.
+    bins : tuple, optional
+        Number of bins of azimuth and polar angle. The default is
+        DEFAULT_BINS.
+
+    Returns
+    -------
+    dict
+        'density', the binned weights indexed by (azimuth, polar angle) bin,
+        the bin edges 'azimuth' and 'polar' (degrees), and the 'weight'.
+
+    """
+    if weight not in WEIGHTS:
+        raise ValueError('Unknown weight ' + repr(weight) + ', choose from '
+                         + ', '.join(WEIGHTS))
+    azimuth, polar = liner_angles(points['Nx'].to_numpy(),
+                                  points['Ny'].to_numpy(),
+                                  points['Nz'].to_numpy())
+    weights = None
+    if weight == 'axial_force':
+        weights = points['Axial Force (N)'].to_numpy()
+    polarMax = POLAR_RANGE[1]
+    if len(polar):
+        polarMax = max(polarMax, math.ceil(polar.max()))
+    density, azimuthEdges, polarEdges = numpy.histogram2d(
+        azimuth, polar, bins=bins,
+        range=[(-180.0, 180.0), (POLAR_RANGE[0], polarMax)], weights=weights)
+    return {'density': density, 'azimuth': azimuthEdges,
+            'polar': polarEdges, 'weight': weight}
+
+
+def density_name(CaseName, weight='count', edge_only=False):
+    """Return the file name, without extension, of a contact density."""
+    return (DENSITY_NAME + CaseName + ' (' + weight + ', '
+            + ('edge' if edge_only else 'all') + ')')
+
+
+def write_density(density, CaseNamePath, CaseName, title, edge_only=False):
+    """
+    Save a contact density grid and draw it as a heatmap.
+
+    Parameters
+    ----------
+    density : dict
+        Output of contact_density.
+    CaseNamePath : str
+        Location of the run's raw data and charts.
+    CaseName : str
+        Name of the case that was run.
+    title : str
+        Title of the heatmap.
+    edge_only : bool, optional
+        Whether only points on the edge of the liner were binned, for the
+        file names. The default is False.
+
+    Returns
+    -------
+    tuple
+        (.npz file of the grid, .html file of the heatmap in the Charts
+        folder)
+
+    """
+    import plotly.graph_objects as go
+
+    name = density_name(CaseName, density['weight'], edge_only)
+    arrays = os.path.join(CaseNamePath, name + '.npz')
+    numpy.savez(arrays, density=density['density'],
+                azimuth=density['azimuth'], polar=density['polar'],
+                weight=density['weight'])
+
+    # Empty bins are left blank
+    grid = density['density'].T.copy()
+    grid[grid == 0] = numpy.nan
+    label = {'count': 'Points', 'axial_force': 'Axial Force (N)'}
+    fig = go.Figure(go.Heatmap(
+        z=grid, colorscale='Viridis',
+        x=(density['azimuth'][:-1] + density['azimuth'][1:]) / 2,
+        y=(density['polar'][:-1] + density['polar'][1:]) / 2,
+        colorbar=dict(title=label[density['weight']])))
+    fig.update_layout(title=title,
+                      xaxis_title='Azimuth from anterior (°)',
+                      yaxis_title='Angle from the pole (°)',
+                      yaxis_autorange='reversed')
+    chartDir = os.path.join(CaseNamePath, 'Charts')
+    os.makedirs(chartDir, exist_ok=True)
+    heatmap = os.path.join(chartDir, name + '.html')
+    fig.write_html(heatmap, include_plotlyjs='directory')
+    return arrays, heatmap
+
+
+def density_report(CaseNamePath, CaseName, weight='count', bins=DEFAULT_BINS,
+                   edge_only=False):
+    """
+    Write the contact density of a run, see the module docstring.
+
+    Parameters
+    ----------
+    CaseNamePath : str
+        Location of the run's raw data and charts.
+    CaseName : str
+        Name of the case that was run.
+    weight : str, optional
+        'count' or 'axial_force', see contact_density. The default is
+        'count'.
+    bins : tuple, optional
+        Number of bins of azimuth and polar angle. The default is
+        DEFAULT_BINS.
+    edge_only : bool, optional
+        If True, only points on the edge of the liner are binned. The default
+        is False.
+
+    Returns
+    -------
+    dict
+        Output of contact_density, with the 'cases' and 'points' binned, and
+        the 'arrays' and 'heatmap' files written.
+
+    """
+    points = None
+    for fmt in RS.STORE_FORMATS:
+        path = RS.store_path(CaseNamePath, CaseName, fmt)
+        if os.path.exists(path):
+            try:
+                points, numCases = store_points(path, edge_only)
+            except ImportError:
+                continue
+            break
+    if points is None:
+        points, numCases = raw_data_points(CaseNamePath, CaseName, edge_only)
+    density = contact_density(points, weight, bins)
+    title = ('Contact density of ' + CaseName + ' (' + str(numCases)
+             + ' cases, ' + ('edge loading points, ' if edge_only else '')
+             + ('weighted by axial force' if weight == 'axial_force'
+                else 'point count') + ')')
+    arrays, heatmap = write_density(density, CaseNamePath, CaseName, title,
+                                    edge_only)
+    density.update({'cases': numCases, 'points': len(points),
+                    'arrays': arrays, 'heatmap': heatmap})
+    return density
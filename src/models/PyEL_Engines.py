@@ -0,0 +1,203 @@
+"""
+Contact search engines.
+
+The contact search (PyEL_Functions.contact_path) is where most of the time
+of a case goes. Faster versions of it are kept here as engines with the same
+arguments and results as contact_path, so a run can be switched between
+them by name, e.g. from the src/models folder
+
+    python -m pyel run Settings_Example.csv --engine indexed
+
+'reference' is contact_path itself. Every other engine must give the same
+contact points as the reference for the same random seed, which is checked
+with PyEL_Accuracy before an engine is used for production sweeps.
+
+Version 1.0 (19/10/26)
+"""
+
+
+import bisect
+import collections
+import math
+import random
+
+import PyEL_Functions as ELF
+
+
+DEFAULT_ENGINE = 'reference'
+
+
+def contact_path_indexed(CupData, LatMaxDynSep, AntMaxDynSep, ContactIts,
+                         HeadRad, StartID, counters=None):
+    """
+    Find the contact point at each separation position, looking points up
+    by ID with a dictionary.
+
+    Follows contact_path step for step, including the order the neighbours
+    are tested in (which decides ties) and the calls to the random number
+    generator, but finds points from their IDs with a dictionary instead of
+    a bisection of the sorted IDs, and builds the list of points to test
+    with a set of the points already in it instead of searching the list.
+
+    Parameters and returns are as for PyEL_Functions.contact_path; the
+    'id_lookups' counter counts the dictionary lookups.
+
+    """
+    LatInc = LatMaxDynSep / ContactIts
+    AntInc = AntMaxDynSep / ContactIts
+
+    IncCount = 0
+    ContactList = []
+    Headers = ('Contact Point ID', 'Old Point ID', 'Nx', 'Ny', 'Nz', 'SNx',
+               'SNy', 'SNz', 'Anterior Mismatch', 'Lateral Mismatch',
+               'Location', 'Edge?')
+    ContactList.append(Headers)
+    CPointID = 1
+
+    LatMM = (LatMaxDynSep - IncCount * LatInc)
+    AntMM = (AntMaxDynSep - IncCount * AntInc)
+
+    if AntMaxDynSep < 0:
+        AntMMCheck = AntMM * (-1)
+        AntCheckInc = AntInc * (-1)
+    else:
+        AntMMCheck = AntMM
+        AntCheckInc = AntInc
+
+    CupData = CupData[0]
+    OldPIDSortedCupData = sorted(CupData, key=lambda x: x[1])
+    JustPointsIDs = [row[1] for row in OldPIDSortedCupData]
+    # Row of CupData found by contact_path for each ID. As in contact_path
+    # this is the position of the ID in the sorted IDs, and the first one
+    # for a repeated ID.
+    Rows = {}
+    for index, PointID in enumerate(JustPointsIDs):
+        if PointID not in Rows:
+            Rows[PointID] = CupData[index]
+    HeadRad2 = math.pow(HeadRad, 2)
+
+    def find(PointID):
+        """Return the row contact_path would find for an ID."""
+        row = Rows.get(PointID)
+        if row is None:
+            # Not a point ID, bisection gives the next point along
+            row = CupData[bisect.bisect_left(JustPointsIDs, PointID)]
+        return row
+
+    OldCP = StartID
+    Evaluated = 0
+    Rounds = 0
+    Escapes = 0
+    Restarts = 0
+    Lookups = 0
+    while (LatMM >= 0) and (AntMMCheck >= 0):
+        hx = AntMaxDynSep - (IncCount * AntInc)
+        hy = -100
+        hz = LatMaxDynSep - (IncCount * LatInc)
+        improved = True
+        BestPoint = 0
+        vertdbest = 999999
+        Nbrs = find(OldCP)[10]
+        Lookups += 1
+        while improved:
+            improved = False
+            Rounds += 1
+            TestList = []
+            Tested = set()
+            for line in Nbrs:
+                TestList.append(line)
+                Tested.add(line)
+                for i in find(line)[10]:
+                    if i not in Tested:
+                        TestList.append(i)
+                        Tested.add(i)
+            BestNeighbours = []
+            Evaluated += len(TestList)
+            Lookups += len(Nbrs) + len(TestList)
+            for line in TestList:
+                point = find(line)
+                xd = point[2] - hx
+                zd = point[4] - hz
+                if math.sqrt(math.pow(xd, 2) + math.pow(zd, 2)) <= HeadRad:
+                    vertd = point[3] - ((math.sqrt(HeadRad2 - math.pow(xd, 2)
+                                                   - math.pow(zd, 2))) + hy)
+                    if vertd < vertdbest:
+                        vertdbest = vertd
+                        BestPoint = point[1]
+                        best = point
+                        Lookups += 1
+                        BestNeighbours = find(BestPoint)[10]
+                        improved = True
+                elif BestNeighbours == []:
+                    # Step towards the head from outside its footprint
+                    Escapes += 1
+                    Lookups += len(point[10])
+                    distBest = HeadRad * 2
+                    for nbr in point[10]:
+                        nbrPoint = find(nbr)
+                        dist = math.sqrt(math.pow(AntMM - nbrPoint[2], 2)
+                                         + math.pow(LatMM - nbrPoint[4], 2))
+                        if dist < distBest:
+                            BestNeighbours = nbrPoint[10]
+                            distBest = dist
+                    improved = True
+                else:
+                    Restarts += 1
+                    BestNeighbours = CupData[random.randint(
+                        0, len(CupData) - 1)][10]
+                    improved = True
+            Nbrs = BestNeighbours
+
+        OldCP = BestPoint
+        if AntMaxDynSep < 0:
+            AntMMCheck = AntMM * (-1)
+            AntCheckInc = AntInc * (-1)
+        else:
+            AntMMCheck = AntMM
+            AntCheckInc = AntInc
+        AntMMCheck = AntMMCheck - AntCheckInc
+        ContactList.append((CPointID, BestPoint, best[2], best[3], best[4],
+                            best[5], best[6], best[7], AntMM, LatMM, best[8],
+                            best[9]))
+        CPointID = CPointID + 1
+        IncCount = IncCount + 1
+        LatMM = (LatMaxDynSep - (IncCount * LatInc))
+        AntMM = (AntMaxDynSep - (IncCount * AntInc))
+
+    if counters is not None:
+        for name, count in (('positions', len(ContactList) - 1),
+                            ('neighbours_evaluated', Evaluated),
+                            ('climb_rounds', Rounds),
+                            ('footprint_escapes', Escapes),
+                            ('random_restarts', Restarts),
+                            ('id_lookups', Lookups)):
+            counters[name] = counters.get(name, 0) + count
+    return ContactList
+
+
+# Contact search engines by name
+ENGINES = collections.OrderedDict([
+    ('reference', ELF.contact_path),
+    ('indexed', contact_path_indexed)])
+
+
+def get_engine(name):
+    """
+    Return a contact search engine.
+
+    Parameters
+    ----------
+    name : str
+        Name of the engine, one of ENGINES.
+
+    Returns
+    -------
+    callable
+        Function with the arguments and results of
+        PyEL_Functions.contact_path.
+
+    """
+    if name not in ENGINES:
+        raise ValueError('Unknown contact search engine ' + repr(name)
+                         + ', choose from ' + ', '.join(ENGINES))
+    return ENGINES[name]
@@ -2,6 +2,11 @@
 Functions called by MainFile.
 
 Version 1.0 (29/03/22)
+
+NB: tkinter, plotly and scipy.interpolate are imported inside the functions
+that use them rather than at the top of this file. They are slow to import
+and tkinter cannot always be loaded on headless machines, so batch workers
+that never plot or open a dialog should not have to load them.
 """
 
 
@@ -11,16 +16,29 @@ import bisect
 import random
 import csv
 import re
-from scipy.interpolate import interp1d
 import os
 import numpy
-from tkinter import messagebox
-import tkinter.filedialog
 import pandas as pd
-from plotly.offline import plot
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+
+import PyEL_JobList as JL
+import PyEL_Timing as TM
+
+
+def main_directory():
+    """
+    Return the top level directory of the repository.
+
+    Used in place of the working directory so that output and config folders
+    are found wherever the code is run from.
+
+    Returns
+    -------
+    str
+        Path of the directory containing src, config and output.
+
+    """
+    return os.path.dirname(os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__))))
 
 
 def Rotate_2D(a, b, ang, direction):
@@ -57,7 +75,8 @@ def ContactCalculator_AxisymPointCloud_IVT(CupData, LatMaxDynSep, AntMaxDynSep,
                                            ActivityTData, StartID, meshSize,
                                            CupGeomFile, startTime, CaseName,
                                            ActivityFile, LipAngle, linerPath,
-                                           misc_dict):
+                                           misc_dict, ContactPath=None,
+                                           timer=TM.NO_TIMER, writer=None):
     """
     Take inputs and solves for contact points, forces, and times.
 
@@ -109,16 +128,109 @@ def ContactCalculator_AxisymPointCloud_IVT(CupData, LatMaxDynSep, AntMaxDynSep,
         Rotation angle describing lip orientation (radians).
     linerPath: str
         File path for where to place the results in the directory.
+    ContactPath : list, optional
+        Contact points found for an earlier case, see solve_contact. The
+        default is None.
+    timer : PyEL_Timing.Timer, optional
+        Records the time spent in the stages of solve_contact, in finding the
+        head frame contact points and in writing the output. The default is
+        TM.NO_TIMER, which records nothing.
+    writer : PyEL_Writer.BackgroundWriter, optional
+        If given, the raw data file is written by the writer, and the
+        returned DataFrame must not be changed. The default is None, in which
+        case the file is written before returning.
 
     Returns
     -------
     ContactForceTimeList : list
         Contains each contact location and associated force and time.
     df : DataFrame
-        Contains same data as ContactForceTimeList but in DataFrame format
+        Contains same data as ContactForceTimeList but in DataFrame format,
+        with the contact points in the head frame (see head_frame)
     CaseNamePath : str
         Location for putting raw data and charts
 
+    """
+    TM.progress('Done setting the initial head location')
+
+    ContactForceTimeList, Contact_df = solve_contact(
+        CupData, LatMaxDynSep, AntMaxDynSep, LatSpringF, AntSpringF,
+        ContactIts, HeadRad, LoadSections, ActivityTData, StartID,
+        ContactPath, timer)
+    with timer.span('head frame'):
+        Contact_df[HEAD_FRAME_COLUMNS] = head_frame(Contact_df, HeadRad,
+                                                    AAFun, FEFun, IEFun)
+
+    time = datetime.datetime.now()
+    runTime = time - startTime
+    runTime = runTime.total_seconds()
+
+    started = timer.start()
+
+    # Manages if this is a copy of another file
+    if 'copy_num' in misc_dict:
+        CaseName = CaseName + '(' + str(misc_dict['copy_num']) + ')'
+
+    # Insertion of raw data into correct location
+    if linerPath[-4] == '.':
+        linerPath = linerPath[:-4]
+    CaseNamePath = os.path.join(linerPath, CaseName)
+    if not os.path.exists(os.path.join(CaseNamePath, 'Raw Data')):
+        os.makedirs(os.path.join(CaseNamePath, 'Raw Data'))
+
+    OutputFile = os.path.join(CaseNamePath, 'Raw Data',
+                              str(caseNum) + '_' + CaseName + '_Results.txt')
+
+    line = raw_data_header(CupGeomFile, HeadRad, CupOrient, LipAngle,
+                           AntMaxDynSep, AntSpringF, LatMaxDynSep, LatSpringF,
+                           meshSize, runTime, ActivityFile)
+    if writer is None:
+        write_raw_data(Contact_df, OutputFile, line)
+    else:
+        writer.submit(write_raw_data, Contact_df, OutputFile, line)
+    timer.stop('output', started)
+
+    return [ContactForceTimeList], Contact_df, CaseNamePath
+
+
+def contact_path(CupData, LatMaxDynSep, AntMaxDynSep, ContactIts, HeadRad,
+                 StartID, counters=None):
+    """
+    Find the contact point at each separation position.
+
+    The contact points only depend on the liner geometry, mismatch, head
+    radius and number of iterations, not on the spring stiffness or load
+    profile, so the same path can be used for cases that only differ in
+    those.
+
+    Parameters
+    ----------
+    CupData : list
+        Liner geometry, a list holding the reduced cup data from
+        RemoveCupPoints_AxisymPointCloud.
+    LatMaxDynSep : float
+        Lateral mismatch (mm).
+    AntMaxDynSep : float
+        Anterior mismatch (mm).
+    ContactIts : int
+        Number of separation positions to evaluate forces at.
+    HeadRad : float
+        Radius of the head (mm).
+    StartID : int
+        ID of the first point to search from for contact.
+    counters : dict, optional
+        If given, counts of the work done by the search are added to it:
+        'positions' (head positions), 'neighbours_evaluated' (points tested
+        against the head), 'climb_rounds' (hill-climb rounds),
+        'footprint_escapes' (steps towards the head from points outside its
+        footprint), 'random_restarts' and 'id_lookups' (bisect lookups into
+        the point IDs). The default is None.
+
+    Returns
+    -------
+    ContactList : list
+        Headers followed by one row per contact point.
+
     """
     # Setting inital location of head
     LatInc = LatMaxDynSep / ContactIts
@@ -136,12 +248,6 @@ def ContactCalculator_AxisymPointCloud_IVT(CupData, LatMaxDynSep, AntMaxDynSep,
     LatMM = (LatMaxDynSep - IncCount * LatInc)
     AntMM = (AntMaxDynSep - IncCount * AntInc)
 
-    hour = datetime.datetime.now().hour
-    mins = datetime.datetime.now().minute
-    sec = datetime.datetime.now().second
-    time = str(hour) + ':' + str(mins) + ':' + str(sec)
-    print('Done setting the initial head location' + ': ' + time)
-
     if AntMaxDynSep < 0:
         AntMMCheck = AntMM * (-1)
         AntCheckInc = AntInc * (-1)
@@ -153,6 +259,13 @@ def ContactCalculator_AxisymPointCloud_IVT(CupData, LatMaxDynSep, AntMaxDynSep,
     OldPIDSortedCupData = sorted(CupData, key=lambda x: x[1])
     JustPointsIDs = [row[1] for row in OldPIDSortedCupData]
     OldCP = StartID
+    # Work done by the search, added up once per round or in the rarely
+    # taken branches so the loop over the neighbours is not slowed down
+    Evaluated = 0
+    Rounds = 0
+    Escapes = 0
+    Restarts = 0
+    Lookups = 0
     while (LatMM >= 0) and (AntMMCheck >= 0):
         hc = ((AntMaxDynSep - (IncCount * AntInc)), -100, (LatMaxDynSep
                                                            - (IncCount
@@ -165,10 +278,12 @@ def ContactCalculator_AxisymPointCloud_IVT(CupData, LatMaxDynSep, AntMaxDynSep,
         BestPoint = 0
         vertdbest = 999999
         i = bisect.bisect_left(JustPointsIDs, OldCP)
+        Lookups += 1
         point = CupData[i]
         Nbrs = point[10]
         while improved == 'Y':
             improved = 'N'
+            Rounds += 1
             TestList = []
             for line in Nbrs:
                 TestList.append(line)
@@ -179,6 +294,8 @@ def ContactCalculator_AxisymPointCloud_IVT(CupData, LatMaxDynSep, AntMaxDynSep,
                     if i not in TestList:
                         TestList.append(i)
             BestNeighbours = []
+            Evaluated += len(TestList)
+            Lookups += len(Nbrs) + len(TestList)
             for line in TestList:
                 index = bisect.bisect_left(JustPointsIDs, line)
                 PointID = CupData[index][1]
@@ -214,11 +331,14 @@ def ContactCalculator_AxisymPointCloud_IVT(CupData, LatMaxDynSep, AntMaxDynSep,
                     LocationBest = Location
                     EdgeBest = Edge
                     index = bisect.bisect_left(JustPointsIDs, BestPoint)
+                    Lookups += 1
                     BestNeighbours = CupData[index][10]
                     improved = 'Y'
                 elif overH == 'N':
                     if BestNeighbours == []:
                         Neighbours = CupData[index][10]
+                        Escapes += 1
+                        Lookups += len(Neighbours)
                         distBest = HeadRad * 2
                         for nbr in Neighbours:
                             index2 = bisect.bisect_left(JustPointsIDs, nbr)
@@ -231,6 +351,7 @@ def ContactCalculator_AxisymPointCloud_IVT(CupData, LatMaxDynSep, AntMaxDynSep,
                                 distBest = dist
                         improved = 'Y'
                     else:
+                        Restarts += 1
                         rge = len(CupData)
                         BestNeighbours = CupData[random.randint(
                             0, rge - 1)][10]
@@ -254,6 +375,42 @@ def ContactCalculator_AxisymPointCloud_IVT(CupData, LatMaxDynSep, AntMaxDynSep,
         LatMM = (LatMaxDynSep - (IncCount * LatInc))
         AntMM = (AntMaxDynSep - (IncCount * AntInc))
 
+    if counters is not None:
+        for name, count in (('positions', len(ContactList) - 1),
+                            ('neighbours_evaluated', Evaluated),
+                            ('climb_rounds', Rounds),
+                            ('footprint_escapes', Escapes),
+                            ('random_restarts', Restarts),
+                            ('id_lookups', Lookups)):
+            counters[name] = counters.get(name, 0) + count
+    return ContactList
+
+
+def contact_forces(ContactList, LatMaxDynSep, AntMaxDynSep, LatSpringF,
+                   AntSpringF):
+    """
+    Calculate the force at each contact point from the spring stiffnesses.
+
+    Parameters
+    ----------
+    ContactList : list
+        Contact points from contact_path.
+    LatMaxDynSep : float
+        Lateral mismatch (mm).
+    AntMaxDynSep : float
+        Anterior mismatch (mm).
+    LatSpringF : float
+        Lateral spring stiffness (N/mm).
+    AntSpringF : float
+        Anterior spring stiffness (N/mm).
+
+    Returns
+    -------
+    ContactForceList : list
+        Headers followed by each contact point with its axial and resultant
+        force.
+
+    """
     ContactForceList = []
     Headers = ('Contact Point ID', 'Old Point ID', 'Nx', 'Ny', 'Nz', 'SNx',
                'SNy', 'SNz', 'Anterior Mismatch', 'Lateral Mismatch',
@@ -288,6 +445,228 @@ def ContactCalculator_AxisymPointCloud_IVT(CupData, LatMaxDynSep, AntMaxDynSep,
             ContactForceList.append((CPID, OPID, Nx, Ny, Nz, SNx, SNy, SNz, AM,
                                      LM, Location, Edge, AF, RF))
 
+    return ContactForceList
+
+
+def result_frame(ContactForceTimeList):
+    """
+    Build the results frame of a case from its contact points.
+
+    Parameters
+    ----------
+    ContactForceTimeList : list
+        Header row followed by one row per contact point, with its force and
+        time, as returned by TimePoints_IdealisedTwoPeak_AxisymPointCloud.
+
+    Returns
+    -------
+    DataFrame
+        One row per contact point, with the number of times its point is
+        contacted (point_count) and its Location padded with 'NA' to the
+        largest number of regions of any contact point.
+
+    """
+    Headers = ('Contact Point ID', 'Old Point ID', 'Nx', 'Ny', 'Nz', 'SNx',
+               'SNy', 'SNz', 'Anterior Mismatch', 'Lateral Mismatch',
+               'Location', 'Edge?', 'Axial Force (N)', 'ResultantForce',
+               'Time (s)')
+    rows = [line for line in ContactForceTimeList
+            if line[0] != 'Contact Point ID']
+    Contact_df = pd.DataFrame.from_records(rows, columns=Headers)
+
+    # Regions as lists of the same length, copied rather than padded in
+    # place as the lists are shared with the cup data
+    Locations = [[Loc] if type(Loc) == str else Loc
+                 for Loc in Contact_df['Location']]
+    maxNumRegions = max((len(Loc) for Loc in Locations), default=0)
+    Contact_df['Location'] = [Loc + ['NA'] * (maxNumRegions - len(Loc))
+                              for Loc in Locations]
+
+    # Number of times each point is contacted, for sizing and colouring the
+    # points in the plots
+    Contact_df.insert(2, 'point_count', Contact_df.groupby(
+        'Old Point ID')['Old Point ID'].transform('size'), True)
+    return Contact_df
+
+
+# Columns of the results frame holding the contact point in the head frame
+HEAD_FRAME_COLUMNS = ['AdjX', 'AdjY', 'AdjZ']
+
+
+def head_rotations(AA, FE, IE):
+    """
+    Build the rotation matrices of the head at a set of times.
+
+    The head is rotated by I/E about the superoinferior (y) axis, then by
+    Ab/Ad about the anteroposterior (x) axis, then by F/E about the
+    mediolateral (z) axis, i.e. R = Rz(FE) Rx(AA) Ry(IE).
+
+    Parameters
+    ----------
+    AA : ndarray
+        Ab/Ad rotation at each time (radians).
+    FE : ndarray
+        F/E rotation at each time (radians).
+    IE : ndarray
+        I/E rotation at each time (radians).
+
+    Returns
+    -------
+    ndarray
+        One 3x3 rotation matrix per time, shape (n, 3, 3), taking vectors in
+        the head frame to the cup frame.
+
+    """
+    n = len(AA)
+    zero = numpy.zeros(n)
+    one = numpy.ones(n)
+    sinA, cosA = numpy.sin(AA), numpy.cos(AA)
+    sinF, cosF = numpy.sin(FE), numpy.cos(FE)
+    sinI, cosI = numpy.sin(IE), numpy.cos(IE)
+    Rx = numpy.stack([one, zero, zero,
+                      zero, cosA, -sinA,
+                      zero, sinA, cosA], axis=1).reshape(n, 3, 3)
+    Ry = numpy.stack([cosI, zero, sinI,
+                      zero, one, zero,
+                      -sinI, zero, cosI], axis=1).reshape(n, 3, 3)
+    Rz = numpy.stack([cosF, -sinF, zero,
+                      sinF, cosF, zero,
+                      zero, zero, one], axis=1).reshape(n, 3, 3)
+    return Rz @ Rx @ Ry
+
+
+def head_offsets(Contact_df, HeadRad):
+    """
+    Return the position of each contact point relative to the head centre.
+
+    The head centre is found from the mismatch and the head radius, as in
+    contact_path: it is offset by the anterior and lateral mismatch and sits
+    so that the point is on the head surface.
+
+    Parameters
+    ----------
+    Contact_df : DataFrame
+        Results frame of the case, see result_frame.
+    HeadRad : float
+        Radius of the head (mm).
+
+    Returns
+    -------
+    ndarray
+        Offset of each contact point from the head centre in the cup frame,
+        shape (n, 3).
+
+    """
+    dx = (Contact_df['Nx'].to_numpy(float)
+          - Contact_df['Anterior Mismatch'].to_numpy(float))
+    dz = (Contact_df['Nz'].to_numpy(float)
+          - Contact_df['Lateral Mismatch'].to_numpy(float))
+    # Points are within the head's footprint, clipped for rounding
+    dy = numpy.sqrt(numpy.maximum(HeadRad ** 2 - dx ** 2 - dz ** 2, 0))
+    return numpy.stack([dx, dy, dz], axis=1)
+
+
+def head_frame(Contact_df, HeadRad, AAFun, FEFun, IEFun):
+    """
+    Transform the contact points of a case to the head frame of reference.
+
+    The position of each point relative to the head centre (see
+    head_offsets) is rotated back by the head orientation at the point's
+    time. All of the points are transformed at once.
+
+    Parameters
+    ----------
+    Contact_df : DataFrame
+        Results frame of the case, see result_frame.
+    HeadRad : float
+        Radius of the head (mm).
+    AAFun : interp1d?
+        Function describing Ab/Ad rotation through time.
+    FEFun : interp1d?
+        Function describing F/E rotation through time.
+    IEFun : interp1d?
+        Function describing I/E rotation through time.
+
+    Returns
+    -------
+    ndarray
+        AdjX, AdjY and AdjZ of each contact point, shape (n, 3).
+
+    """
+    Offsets = head_offsets(Contact_df, HeadRad)
+    Time = Contact_df['Time (s)'].to_numpy(float)
+    Rotations = head_rotations(AAFun(Time), FEFun(Time), IEFun(Time))
+    # Inverse rotation of each offset, R^T v
+    return numpy.einsum('nji,nj->ni', Rotations, Offsets)
+
+
+def solve_contact(CupData, LatMaxDynSep, AntMaxDynSep, LatSpringF, AntSpringF,
+                  ContactIts, HeadRad, LoadSections, ActivityTData, StartID,
+                  ContactPath=None, timer=TM.NO_TIMER, counters=None):
+    """
+    Solve for contact points, forces, and times without writing any files.
+
+    This is the calculation part of ContactCalculator_AxisymPointCloud_IVT,
+    which calls it and then writes the results to the Raw Data folder.
+
+    Parameters
+    ----------
+    CupData : list
+        Liner geometry, a list holding the reduced cup data from
+        RemoveCupPoints_AxisymPointCloud.
+    LatMaxDynSep : float
+        Lateral mismatch (mm).
+    AntMaxDynSep : float
+        Anterior mismatch (mm).
+    LatSpringF : float
+        Lateral spring stiffness (N/mm).
+    AntSpringF : float
+        Anterior spring stiffness (N/mm).
+    ContactIts : int
+        Number of separation positions to evaluate forces at.
+    HeadRad : float
+        Radius of the head (mm).
+    LoadSections : list
+        Functions for each section of the load profile.
+    ActivityTData : list
+        Times of the load profile.
+    StartID : int
+        ID of the first point to search from for contact.
+    ContactPath : list, optional
+        Contact points from contact_path for the same geometry, mismatch,
+        head radius and iterations, e.g. from an earlier case that only
+        differed in spring stiffness or load profile. The default is None,
+        in which case the contact points are searched for.
+    timer : PyEL_Timing.Timer, optional
+        Records the time spent in the contact search, the force and time
+        calculation, and building the results frame. The default is
+        TM.NO_TIMER, which records nothing.
+    counters : dict, optional
+        Counts of the work done by the contact search, see contact_path. The
+        default is None.
+
+    Returns
+    -------
+    ContactForceTimeList : list
+        Contains each contact location and associated force and time, and
+        the edge loading type.
+    df : DataFrame
+        Contains same data as ContactForceTimeList but in DataFrame format
+
+    """
+    if ContactPath is None:
+        with timer.span('contact search'):
+            ContactList = contact_path(CupData, LatMaxDynSep, AntMaxDynSep,
+                                       ContactIts, HeadRad, StartID,
+                                       counters)
+    else:
+        ContactList = ContactPath
+    CPointID = len(ContactList)
+    started = timer.start()
+
+    ContactForceList = contact_forces(ContactList, LatMaxDynSep,
+                                      AntMaxDynSep, LatSpringF, AntSpringF)
+
     # Calculating the time for each contact point
     ContactForceTimeList = TimePoints_IdealisedTwoPeak_AxisymPointCloud(
         LoadSections, ContactForceList)
@@ -331,91 +710,52 @@ def ContactCalculator_AxisymPointCloud_IVT(CupData, LatMaxDynSep, AntMaxDynSep,
                                                 SNy, SNz, AM, LM, Loc, Edge,
                                                 AF, RF, T))
                 i = i + 1
+    timer.stop('force and time', started)
 
-    TidiedCFTL = {'Contact Point ID': [], 'Old Point ID': [], 'Nx': [],
-                  'Ny': [], 'Nz': [], 'SNx': [], 'SNy': [], 'SNz': [],
-                  'Anterior Mismatch': [], 'Lateral Mismatch': [],
-                  'Location': [], 'Edge?': [], 'Axial Force (N)': [],
-                  'ResultantForce': [], 'Time (s)': []}
+    started = timer.start()
+    Contact_df = result_frame(ContactForceTimeList[0])
+    timer.stop('results frame', started)
+    return ContactForceTimeList, Contact_df
 
-    maxNumRegions = 0
-    for line in ContactForceTimeList[0]:
-        if line[0] == 'Contact Point ID':
-            pass
-        else:
-            Loc = line[10]
-            if type(Loc) == str:
-                Loc = [Loc]
-            numRegions = len(Loc)
-            if numRegions > maxNumRegions:
-                maxNumRegions = numRegions
-    for line in ContactForceTimeList[0]:
-        if line[0] == 'Contact Point ID':
-            pass
-        else:
-            Loc = line[10]
-            if type(Loc) == str:
-                Loc = [Loc]
-            while len(Loc) < maxNumRegions:
-                Loc.append('NA')
-            TidiedCFTL['Contact Point ID'].append(line[0])
-            TidiedCFTL['Old Point ID'].append(line[1])
-            TidiedCFTL['Nx'].append(line[2])
-            TidiedCFTL['Ny'].append(line[3])
-            TidiedCFTL['Nz'].append(line[4])
-            TidiedCFTL['SNx'].append(line[5])
-            TidiedCFTL['SNy'].append(line[6])
-            TidiedCFTL['SNz'].append(line[7])
-            TidiedCFTL['Anterior Mismatch'].append(line[8])
-            TidiedCFTL['Lateral Mismatch'].append(line[9])
-            TidiedCFTL['Location'].append(Loc)
-            TidiedCFTL['Edge?'].append(line[11])
-            TidiedCFTL['Axial Force (N)'].append(line[12])
-            TidiedCFTL['ResultantForce'].append(line[13])
-            TidiedCFTL['Time (s)'].append(line[14])
-
-    # For creating traces of contact points with relative size/colour
-    PointCount = {}
-    for item in TidiedCFTL['Old Point ID']:
-        if item in PointCount:
-            pass
-        else:
-            PointCount.update({item: (TidiedCFTL['Old Point ID'].count(item))})
-
-    # Conversion to DataFrame for Plotly plotting
-    Contact_df = pd.DataFrame(TidiedCFTL)
-
-    # Adding point_count to DataFrame
-    length = [0] * len(Contact_df['Nx'])
-    Contact_df.insert(2, "point_count", length, True)
-    for key, value in PointCount.items():
-        filt = Contact_df['Old Point ID'] == key
-        Contact_df.loc[filt, 'point_count'] = value
-
-    time = datetime.datetime.now()
-    runTime = time - startTime
-    runTime = runTime.total_seconds()
-
-    # Manages if this is a copy of another file
-    if 'copy_num' in misc_dict:
-        CaseName = CaseName + '(' + str(misc_dict['copy_num']) + ')'
 
-    # Insertion of raw data into correct location
-    if linerPath[-4] == '.':
-        linerPath = linerPath[:-4]
-    if not os.path.exists(linerPath + '\\' + CaseName):
-        os.makedirs(linerPath + '\\' + CaseName)
-    if not os.path.exists(linerPath + '\\' + CaseName + '\\Raw Data'):
-        os.makedirs(linerPath + '\\' + CaseName + '\\Raw Data')
+def raw_data_header(CupGeomFile, HeadRad, CupOrient, LipAngle, AntMaxDynSep,
+                    AntSpringF, LatMaxDynSep, LatSpringF, meshSize, runTime,
+                    ActivityFile):
+    """
+    Create the first line of a raw data file, describing the case.
 
-    CaseNamePath = linerPath + '\\' + CaseName
+    Parameters
+    ----------
+    CupGeomFile : string
+        File path to the point cloud.
+    HeadRad : float
+        Radius of the head (mm).
+    CupOrient : list
+        Rotation angles describing the cup orientation (radians).
+    LipAngle : float
+        Rotation angle describing lip orientation (radians).
+    AntMaxDynSep : float
+        Anterior mismatch (mm).
+    AntSpringF : float
+        Anterior spring stiffness (N/mm).
+    LatMaxDynSep : float
+        Lateral mismatch (mm).
+    LatSpringF : float
+        Lateral spring stiffness (N/mm).
+    meshSize : float
+        Approximate point spacing of the point cloud (mm).
+    runTime : float
+        Time taken to solve the case (s).
+    ActivityFile : string
+        file path to the load profile.
 
-    OutputFile = (CaseNamePath + '\\Raw Data\\'
-                  + str(caseNum) + '_' + CaseName + '_Results.txt')
+    Returns
+    -------
+    str
+        Header line, without the line ending.
 
-    # Writes file with headers only
-    output = open(OutputFile, 'w')
-    line = ('Axisym Geom, PointCloud = ' + str(CupGeomFile) + ', HeadRad = '
+    """
+    return ('Axisym Geom, PointCloud = ' + str(CupGeomFile) + ', HeadRad = '
             + str(HeadRad) + ', I/V/T = ' + str(math.degrees(CupOrient[0]))
             + '/' + str(math.degrees(CupOrient[1])) + '/'
             + str(math.degrees(CupOrient[2])) + ', Lip Angle = '
@@ -424,14 +764,30 @@ def ContactCalculator_AxisymPointCloud_IVT(CupData, LatMaxDynSep, AntMaxDynSep,
             + str(LatMaxDynSep) + '/' + str(LatSpringF) + ', CupMeshSize = '
             + str(meshSize) + ', runtime = ' + str(runTime) + 's'
             + ', ActivityFile = ' + str(ActivityFile))
-    output.write(str(line) + '\n')
+
+
+def write_raw_data(Contact_df, OutputFile, header):
+    """
+    Write a raw data file: one line describing the case, then the results.
+
+    Parameters
+    ----------
+    Contact_df : DataFrame
+        Contact points, forces and times for the case.
+    OutputFile : str
+        File path to write to.
+    header : str
+        Description of the case, from raw_data_header.
+
+    """
+    # Writes file with headers only
+    output = open(OutputFile, 'w')
+    output.write(str(header) + '\n')
     output.close()
 
     # Appends data into .csv fle created above (efficiency measure)
     Contact_df.to_csv(OutputFile, mode='a', index=False)
 
-    return [ContactForceTimeList], Contact_df, CaseNamePath
-
 
 def CupGeom_AxisymPointCloud(geomFile, HeadRad):
     """
@@ -513,7 +869,8 @@ def CupRotation_IVTseq_AxisymPointCloud(sin_Lip, cos_Lip, sin_Inc, cos_Inc,
                                         CupData, LipAngle_degrees,
                                         CupIncAngle_degrees,
                                         CupAVersionAngle_degrees,
-                                        CupOVersionAngle_degrees):
+                                        CupOVersionAngle_degrees,
+                                        verbose=True):
     """
     Rotates cup data around the AP, SI, and ML axes.
 
@@ -549,6 +906,8 @@ def CupRotation_IVTseq_AxisymPointCloud(sin_Lip, cos_Lip, sin_Inc, cos_Inc,
         Version angle in degrees.
     CupOVersionAngle_degrees : float
         Tilt angle in degrees.
+    verbose : bool, optional
+        Print progress messages. The default is True.
 
     Returns
     -------
@@ -634,11 +993,8 @@ def CupRotation_IVTseq_AxisymPointCloud(sin_Lip, cos_Lip, sin_Inc, cos_Inc,
             CupDataRotated.append([NodeID, Nx3, Ny3, Nz3, SNx3, SNy3, SNz3,
                                    Location, Edge, Neighbours])
             justIDs.append(NodeID)
-    hour = datetime.datetime.now().hour
-    mins = datetime.datetime.now().minute
-    sec = datetime.datetime.now().second
-    time = str(hour) + ':' + str(mins) + ':' + str(sec)
-    print('Done rotating the cup into its final position' + ': ' + time)
+    if verbose:
+        TM.progress('Done rotating the cup into its final position')
     for l in CupDataRotated:
         Edge = l[8]
         if Edge == 'Y':
@@ -667,10 +1023,14 @@ def Inputs_JobList(JobFile):
     """
     Read an input job list to set up the range of cases to be analysed.
 
+    The runner reads cases one at a time with PyEL_JobList.iter_job_file;
+    this gathers them all into lists for callers that want every value of a
+    variable at once.
+
     Parameters
     ----------
     JobFile : string
-        File path to the job list.
+        File path to the job list or job spec.
 
     Returns
     -------
@@ -679,70 +1039,16 @@ def Inputs_JobList(JobFile):
         across all cases.
 
     """
-    CupIncAngleList = []
-    CupAVersionAngleList = []
-    CupOVersionAngleList = []
-    HeadRadList = []
-    LatMaxDynSepList = []
-    AntMaxDynSepList = []
-    LatSpringFList = []
-    AntSpringFList = []
-    ActivityFileList = []
-    CupLipAngleList = []
-
-    with open(JobFile, 'rt') as csvfile:
-        fileread = csv.reader(csvfile, dialect=csv.excel)
-        FirstLine = 1
-        for row in fileread:
-            if FirstLine == 1:
-                h1 = row[0]
-                FirstLine = 0
-            elif (row[0] != '') and (h1 == 'case_num'):
-                if os.path.isdir(row[8]):
-                    for filename in os.listdir(row[8]):
-                        CupIncAngleList.append(float(row[1]))
-                        CupAVersionAngleList.append(float(row[2]))
-                        CupOVersionAngleList.append(float(row[3]))
-                        if (row[4][0] == 'dflt'):
-                            HeadRadList.append('d')
-                        else:
-                            HeadRadList.append(float(row[4]))
-                        LatMaxDynSepList.append(float(row[5]))
-                        AntMaxDynSepList.append(float(row[6]))
-                        LatSpringFList.append(float(row[7]))
-                        AntSpringFList.append(float(row[8]))
-                        ActivityFileList.append(row[9] + '\\' + filename)
-                        CupLipAngleList.append(float(row[10]))
-                else:
-                    CupIncAngleList.append(float(row[1]))
-                    CupAVersionAngleList.append(float(row[2]))
-                    CupOVersionAngleList.append(float(row[3]))
-                    if (row[4][0] == 'd') or (row[4][0] == 'D'):
-                        HeadRadList.append('d')
-                    else:
-                        HeadRadList.append(float(row[4]))
-                    LatMaxDynSepList.append(float(row[5]))
-                    AntMaxDynSepList.append(float(row[6]))
-                    LatSpringFList.append(float(row[7]))
-                    AntSpringFList.append(float(row[8]))
-                    ActivityFileList.append(row[9])
-                    CupLipAngleList.append(float(row[10]))
-    if max(CupAVersionAngleList) != 0:
-        print('Warning: non-zeo anteversion angles recorded. These'
-              ' will not be used in this PyEL release')
-    if max(CupOVersionAngleList) != 0:
-        print('Warning: non-zeo operative version angles recorded. These'
-              ' will not be used in this PyEL release')
-    if max(AntMaxDynSepList) != 0:
-        print('Warning: non-zeo anterior mismatches recorded. These'
-              ' will not be used in this PyEL release')
-    if max(CupLipAngleList) != 0:
-        print('Warning: non-zeo lip angles recorded. These'
-              ' will not be used in this PyEL release')
-
-    return [CupIncAngleList, CupAVersionAngleList, CupOVersionAngleList,
-            HeadRadList, LatMaxDynSepList, AntMaxDynSepList, LatSpringFList,
-            AntSpringFList, ActivityFileList, CupLipAngleList]
+    variables = ('sim_inc', 'ver_ang', 'tilt_ang', 'head_rad', 'lat_mm',
+                 'ant_mm', 'lat_spr', 'ant_spr', 'load_file', 'lip_ang')
+    CaseData = [[] for name in variables]
+    warned = set()
+    for case in JL.iter_job_file(JobFile):
+        JL.warn_unused(case, warned)
+        for i, name in enumerate(variables):
+            CaseData[i].append(case[name])
+
+    return CaseData
 
 
 def Load_IdealisedTwoPeak(ActivityData):
@@ -764,6 +1070,8 @@ def Load_IdealisedTwoPeak(ActivityData):
         List of interpolation functions, one function per load section.
 
     """
+    from scipy.interpolate import interp1d
+
     # Defining the start and end of each load section.
     i = 1
     minLoad1 = ActivityData[1][0]
@@ -880,7 +1188,7 @@ def Load_IdealisedTwoPeak(ActivityData):
     return [Section1Fun, Section2Fun, Section3Fun, Section4Fun, LoadSections]
 
 
-def ReadActivity(ActivityFile):
+def ReadActivity(ActivityFile, interactive=True):
     """
     Read the provided load activity file and formats the data for the solver.
 
@@ -888,6 +1196,10 @@ def ReadActivity(ActivityFile):
     ----------
     ActivityFile : string
         File path to the load profile.
+    interactive : bool, optional
+        If True, a file dialog is opened to choose another file when the
+        provided one is not in the required format. If False a ValueError is
+        raised instead, for runs without a display. The default is True.
 
     Returns
     -------
@@ -911,7 +1223,9 @@ def ReadActivity(ActivityFile):
                     print('Error, Activity profile data file provided does \
                         not have correct header information')
                     Continue = 0
-                    # from PyEL_Functions import ReadActivity_Fail
+                    if not interactive:
+                        raise ValueError(ActivityFile + ' does not have the '
+                                         'PyEL activity file header')
                     ActivityData = ReadActivity_Fail()
             if rowcount == 2:
                 if Continue == 1:
@@ -920,7 +1234,10 @@ def ReadActivity(ActivityFile):
                         print('Error, Activity profile data file provided \
                               does not have correct column title information')
                         Continue = 0
-                        # from PyEL_Functions import ReadActivity_Fail
+                        if not interactive:
+                            raise ValueError(ActivityFile + ' does not have '
+                                             'the PyEL activity file column '
+                                             'titles')
                         ActivityData = ReadActivity_Fail()
             if rowcount > 2:
                 if Continue == 1:
@@ -948,6 +1265,8 @@ def ReadActivity_Fail():
         Force and rotation data with time for the load profile.
 
     """
+    import tkinter.filedialog
+
     ActTData = []
     ActFData = []
     ActAAData = []
@@ -989,7 +1308,7 @@ def ReadActivity_Fail():
 def RemoveCupPoints_AxisymPointCloud(CupData, LatMaxDynSep, AntMaxDynSep,
                                      CupIncAngle, CupAVersionAngle,
                                      CupOVersionAngle, CupFilletRad,
-                                     CupMeshSize):
+                                     CupMeshSize, verbose=True):
     """
     Remove unnecessary cup points from the cup data.
 
@@ -1014,10 +1333,10 @@ def RemoveCupPoints_AxisymPointCloud(CupData, LatMaxDynSep, AntMaxDynSep,
         Liner tilt rotation angle in radians.
     CupFilletRad : float
         Assumed to be 2mm in current version.
-    StripeWearEstimator : string
-        'Y' or 'N' identifying whether stripe wear region is requested.
     CupMeshSize : float
         Approximate point spacing of the liner point cloud.
+    verbose : bool, optional
+        Print progress messages. The default is True.
 
     Returns
     -------
@@ -1117,7 +1436,8 @@ def RemoveCupPoints_AxisymPointCloud(CupData, LatMaxDynSep, AntMaxDynSep,
         Cutoff = TargetPointy - 3 - (2 * CupFilletRad)
     else:
         Cutoff = 0
-        print(True)
+        if verbose:
+            print(True)
     for point in CupData:
         if point[0] == 'NodeID':
             pass
@@ -1383,6 +1703,8 @@ def create_fig_subplots(num_jobs, per_page, CaseName, caseNum):
     :rtype: TYPE
 
     """
+    from plotly.subplots import make_subplots
+
     sub_titles = []
     fig_tot = numpy.ceil(num_jobs / per_page)
     for x in range(per_page):
@@ -1400,160 +1722,85 @@ def create_fig_subplots(num_jobs, per_page, CaseName, caseNum):
     return fig, fig_tot, rows, cols
 
 
-def create_models(df, CupData_df, caseNum, graph_info, fig, CaseName, rows,
-                  cols, row, col, fig_no, fig_tot, num_jobs, path):
+def case_summary(Contact_df, CupIncAngle_degrees, OutputFile):
     """
-    Summary.
+    Summarise the results of a case for the analysis summary.
 
-    Creation of 3D models of liner geometries. Overlaid is the edge boundary
-    and the contact point location with associated force.
+    Called as each case finishes, so the summary of a run does not need to
+    read the raw data files back.
 
     Parameters
     ----------
-    df : DataFrame
-        Details of contact points: location; force etc..
-    CupData_df : DataFrame
-        Liner geometry information for 3D mesh plot.
-    caseNum : int
-        Case number for naming of model.
-    graph_info : dict
-        Information from Graph Control UI on what parameters are to be plotted,
-        and how many models per file.
-    specs : list
-        List of list of dictionaries, equivalent to 2D array. Used to calibrate
-        each cell created for the model file to allow multiple 3D plots.
-    sub_titles : list
-        Contains list of titles for each subplot.
-    fig : plotly.graph_object
-        Figure where each model is plotted.
-    CaseName : str
-        Name of the case being run, used for organisation and naming files.
-    rows : int
-        Max number of rows for fig.
-    cols : int
-        Max number of columns for fig.
-    row : int
-        Current row. Designates which cell the model will placed in.
-    col : int
-        Current column. Designates which cell the model will placed in.
-    fig_no : int
-        Counter for figures, used to name model files if more than one is
-        created.
-    fig_tot : int
-        Number of files to be created.
-    num_jobs : int
-        Number of cases in job file. Used to check plotting within bounds of
-        rows and columns.
+    Contact_df : DataFrame
+        Contact points, forces and times for the case, as written to its raw
+        data file (before rotating back to 0\u00B0 inclination).
+    CupIncAngle_degrees : float
+        Inclination angle of the case in degrees.
+    OutputFile : str
+        Raw data file written for the case.
 
     Returns
     -------
-    row : int
-        Current row. Designates which cell the model will placed in. Updated.
-    col : int
-        Current column. Designates which cell the model will placed in.
-        Updated.
-    fig_no : int
-        Counter for figures, used to name model files if more than one is
-        created. Updated.
-    Geometry-Force 3D Mesh : .html file
-        .html file of plotly interactive plot of geometry with contact points
-        overlaid with associated force, for each case.
-
-    NOTE: code for using point_count for force trace plot remains, replaces
-    arbitrary size=2
+    dict
+        One row of the analysis summary: the raw data file, the maximum
+        lateral separation, the peak axial force while edge loading ('N/A'
+        if there is none), the contact point at the maximum separation with
+        and without the inclination, and whether there is edge loading.
+
     """
-    # Projecting mesh and contact points onto 3D model
-    # Reducing meshing to every tenth point
-    Red_Cup_df = CupData_df.iloc[::30, :]
-    trace1 = go.Mesh3d(x=Red_Cup_df['Nx'],
-                       y=Red_Cup_df['Nz'],
-                       z=Red_Cup_df['Ny'],
-                       opacity=0.8,
-                       hoverinfo='none',
-                       color='rgb(253,193,199)')
-
-    # Calibrating for force trace
-    df = df.drop_duplicates(subset='Old Point ID', keep='first', inplace=False)
-    if caseNum == 0:
-        colorbar = dict(thickness=10, tickmode="auto", nticks=5, x=1.2)
+    LatSep = Contact_df['Lateral Mismatch'].to_numpy()
+    first = int(LatSep.argmax())
+    Nx = float(Contact_df['Nx'].iat[first])
+    Ny = float(Contact_df['Ny'].iat[first])
+    Nz = float(Contact_df['Nz'].iat[first])
+    Inc = -math.radians(float(CupIncAngle_degrees))
+    RotNz = Nz * math.cos(Inc) - Ny * math.sin(Inc)
+    RotNy = Nz * math.sin(Inc) + Ny * math.cos(Inc)
+
+    edge = numpy.array(['EL_' in str(Loc) for Loc in Contact_df['Location']],
+                       dtype=bool)
+    if edge.any():
+        EdgeLoading = 'Yes'
+        PeakForce = float(Contact_df['Axial Force (N)'].to_numpy()[edge].max())
     else:
-        colorbar = None
-
-    if graph_info['graph_force'] == 'Axial':
-        force = df['Axial Force (N)']
-        force_name = 'Axial Force (N)'
-    elif graph_info['graph_force'] == 'Resultant':
-        force = df['ResultantForce']
-        force_name = 'Resultant Force (N)'
-
-    trace2 = go.Scatter3d(x=df['Nx'],
-                          y=df['Nz'],
-                          z=df['Ny'],
-                          mode='markers',
-                          marker=dict(size=2,
-                                      color=force,
-                                      colorscale='Viridis',
-                                      colorbar=colorbar,
-                                      opacity=1),
-                          name='Case' + str(caseNum),
-                          text=force,
-                          hovertemplate=force_name + ": %{text:.0f}",
-                          showlegend=False)
-
-    # Determining where the boundaries are for visual display
-    filt = CupData_df['boundary_location'] == 'Yes'
-    boundaries = CupData_df.loc[filt]
-
-    trace3 = go.Scatter3d(x=boundaries['Nx'],
-                          y=boundaries['Nz'],
-                          z=boundaries['Ny'],
-                          mode='markers',
-                          marker=dict(
-                              size=0.4,
-                              color='black',
-                              symbol='square',
-                              opacity=0.6),
-                          name='Edge Boundary',
-                          text='Edge Boundary',
-                          showlegend=False)
-
-    # Check for which cell to use to plot 3D model
-    if col <= cols and row <= rows:
-        fig.add_trace(trace1, row=row, col=col)
-        fig.add_trace(trace2, row=row, col=col)
-        fig.add_trace(trace3, row=row, col=col)
-        col += 1
-    elif col > cols and row <= rows:
-        row += 1
-        col = 1
-        fig.add_trace(trace1, row=row, col=col)
-        fig.add_trace(trace2, row=row, col=col)
-        fig.add_trace(trace3, row=row, col=col)
-        col += 1
-
-    # Adds traces to the same plot or creates new figure and plots traces
-    # there.
-    if col > cols and row == rows or caseNum + 1 == num_jobs or (
-            caseNum + 2) / fig_no / graph_info['per_page'] > 1:
-        fig.update_layout(title='Contact Path with ' + force_name,
-                          autosize=True, margin=dict(l=65, r=50, b=65, t=70))
-        for i in range(num_jobs):
-            fig.update_xaxes(showgrid=False)
-            fig.update_yaxes(showgrid=False)
-            fig.update_scenes(camera_eye=dict(x=0, y=2.5, z=0))
-        plot(fig, filename=path + 'Geometry-Force ' + CaseName + str(fig_no)
-             + '.html', auto_open=False)
-        if fig_no < fig_tot:
-            fig.data = []
-            row = 1
-            col = 1
-            fig_no += 1
-
-    return row, col, fig_no
+        EdgeLoading = 'No'
+        PeakForce = 'N/A'
+    return {'File': os.path.basename(OutputFile),
+            'Max Lateral Separation': float(LatSep[first]),
+            'Peak Axial Force': PeakForce,
+            'Contact Points with Inc': (Nx, Ny, Nz),
+            'Edge Loading?': EdgeLoading,
+            'Rotated Contact Points 0\u00B0': (Nx, RotNy, RotNz)}
+
+
+def read_case_summary(OutputFile):
+    """
+    Summarise a case from its raw data file, see case_summary.
+
+    Parameters
+    ----------
+    OutputFile : str
+        Raw data file of the case.
+
+    Returns
+    -------
+    dict
+        One row of the analysis summary.
+
+    """
+    with open(OutputFile, 'r') as file:
+        header = file.readline()
+    # Inclination from the 'I/V/T = inc/ver/tilt' field of the header
+    CupIncAngle_degrees = float(re.search(r'I/V/T = ([^/]+)/',
+                                          header).group(1))
+    return case_summary(pd.read_csv(OutputFile, skiprows=1,
+                                    float_precision='round_trip'),
+                        CupIncAngle_degrees, OutputFile)
 
 
 def summarise_results(CaseNamePath, JobFile, CupGeomFile, CaseName,
-                      graph_info):
+                      graph_info, interactive=True, Summary=None,
+                      chart=True, include_plotlyjs=True):
     """
     Summary.
 
@@ -1573,6 +1820,19 @@ def summarise_results(CaseNamePath, JobFile, CupGeomFile, CaseName,
     graph_info : dict
         Information from Graph Control UI on what parameters are to be plotted,
         and how many models per file.
+    interactive : bool, optional
+        If True, problems are reported in a message box and the bar chart is
+        opened in the browser. The default is True.
+    Summary : dict, optional
+        Output of case_summary for each case, keyed by case number, as
+        collected by the runner while the cases were run. The default is
+        None, in which case each case is summarised from its raw data file.
+    chart : bool, optional
+        If False, only the summary .csv file is written. The default is True.
+    include_plotlyjs : bool or str, optional
+        How the bar chart includes plotly.js, see plotly.offline.plot:
+        'directory' uses plotly.min.js in the Charts folder. The default is
+        True, a copy in the file.
 
     Returns
     -------
@@ -1580,90 +1840,49 @@ def summarise_results(CaseNamePath, JobFile, CupGeomFile, CaseName,
         .html file of bar chart for maximum lateral separation of all cases.
 
     """
-    path = (os.getcwd()[:-11] + '\\output\\'
-            + os.path.basename(CupGeomFile[:-4]) + '\\' + CaseName
-            + '\\Raw Data')
+    import plotly.express as px
+    from plotly.offline import plot
 
-    Summary = [{}]
-    maxLatSep = {'max_lat_sep': []}
-    j = 0
-
-    df = pd.read_csv(JobFile)
+    df = JL.job_frame(JobFile)
     df.set_index('case_num')
     df['load_file'] = df['load_file'].apply(lambda x: os.path.basename(x))
     df['lat_mm'] = df['lat_mm'].apply(lambda x: str(x))
     df['lat_spr'] = df['lat_spr'].apply(lambda x: str(x))
 
-    files = os.listdir(path)
-    stop_index = len(CaseName)
-    sorted_files = sorted(files, key=lambda x: int(re.sub(
-        r'\D', '', x.strip())[: stop_index]))
-    for filename in sorted_files:
-        with open(path + '\\' + filename, 'r', newline='') as results:
-            res = csv.reader(results, delimiter=',')
-
-            Summary[j]['File'] = filename
-            i = 0
-
-            for row in res:
-                if i == 0:
-                    Inc = -math.radians(float(row[3][9:13]))
-                elif i == 1:
-                    pass
-                elif i == 2:
-                    Summary[j].update({'Max Lateral Separation': float(
-                        row[10])})
-                    Summary[j].update({'Peak Axial Force': float(row[14])})
-                    Summary[j].update({'Contact Points with Inc': (
-                        float(row[3]), float(row[4]), float(row[5]))})
-                else:
-                    if float(row[10]) > Summary[j]['Max Lateral Separation']:
-                        Summary[j]['Max Lateral Separation'] = float(row[10])
-                        Summary[j]['Contact Points with Inc'] = (
-                            float(row[3]), float(row[4]), float(row[5]))
-                    if 'EL_' in row[11]:
-                        Summary[j]['Edge Loading?'] = 'Yes'
-                        if float(row[14]) > Summary[j]['Peak Axial Force']:
-                            Summary[j]['Peak Axial Force'] = float(row[14])
-
-                    else:
-                        continue
-                i += 1
-
-            RotNz = Summary[j]['Contact Points with Inc'][2] * math.cos(Inc) \
-                - Summary[j]['Contact Points with Inc'][1] * math.sin(Inc)
-            RotNy = Summary[j]['Contact Points with Inc'][2] * math.sin(Inc) \
-                + Summary[j]['Contact Points with Inc'][1] * math.cos(Inc)
-
-            Summary[j]['Rotated Contact Points 0\u00B0'] = (
-                float(row[3]), RotNy, RotNz)
-
-            if 'Edge Loading?' not in Summary[j]:
-                Summary[j]['Edge Loading?'] = 'No'
-                Summary[j]['Peak Axial Force'] = 'N/A'
-
-            maxLatSep['max_lat_sep'].append(Summary[j][
-                'Max Lateral Separation'])
-            j += 1
-            Summary.append({})
-
-    try:
-        df['max_lat_sep'] = maxLatSep['max_lat_sep']
-    except ValueError:
-        messagebox.showerror('Check Raw Data Folder', 'If the current settings'
-                             ' file is an overwrite of a previous file, check'
-                             ' to see if the total cases is equal to the '
-                             'number of raw data files. If this is not the '
-                             'case, delete the extra files. \nThis occurs '
-                             'because the raw data is placed in the same '
-                             'location as the old files.')
-
-    with open(path[:-9] + '\\Analysis Summary ' + CaseName
-              + '.csv', 'w', newline='') as csvfile:
-        fieldnames = list(Summary[0])
+    if Summary is None:
+        Summary = {}
+        for caseNum in range(len(df)):
+            OutputFile = os.path.join(CaseNamePath, 'Raw Data',
+                                      str(caseNum) + '_' + CaseName
+                                      + '_Results.txt')
+            if os.path.exists(OutputFile):
+                Summary[caseNum] = read_case_summary(OutputFile)
+
+    missing = [caseNum for caseNum in range(len(df))
+               if caseNum not in Summary]
+    if missing:
+        message = ('No results for ' + str(len(missing)) + ' of the '
+                   + str(len(df)) + ' cases (case ' + str(missing[0])
+                   + ' is the first), they are left out of the summary.')
+        if interactive:
+            from tkinter import messagebox
+            messagebox.showerror('Missing Results', message)
+        else:
+            print('Missing Results: ' + message)
+    df['max_lat_sep'] = [Summary[caseNum]['Max Lateral Separation']
+                         if caseNum in Summary else numpy.nan
+                         for caseNum in range(len(df))]
+
+    with open(os.path.join(CaseNamePath, 'Analysis Summary ' + CaseName
+                           + '.csv'), 'w', newline='') as csvfile:
+        fieldnames = ['File', 'Max Lateral Separation', 'Peak Axial Force',
+                      'Contact Points with Inc', 'Edge Loading?',
+                      'Rotated Contact Points 0\u00B0']
         writer = csv.DictWriter(csvfile, fieldnames, dialect='excel')
         writer.writeheader()
-        writer.writerows(Summary)
+        writer.writerows(Summary[caseNum] for caseNum in sorted(Summary))
+    if not chart:
+        return
 
     params = []
     if graph_info['params'] != ['dflt_bar_chart']:
@@ -1718,8 +1937,10 @@ def summarise_results(CaseNamePath, JobFile, CupGeomFile, CaseName,
         fig.update_xaxes(type='category')
         i += 1
 
-    plot(fig, filename=path[:-9] + '\\Charts\\'
-         + 'Max Lateral Separation ' + CaseName + '.html')
+    plot(fig, filename=os.path.join(CaseNamePath, 'Charts',
+                                    'Max Lateral Separation ' + CaseName
+                                    + '.html'), auto_open=interactive,
+         include_plotlyjs=include_plotlyjs)
 
 
 if __name__ == '__main__':
@@ -19,6 +19,7 @@ import glob
 import os
 import shutil
 import PyEL_1Spring_MainFile as _1Spr
+import PyEL_JobList as JL
 
 
 class UI:
@@ -630,8 +631,9 @@ class ExitUI():
     """
     Summary.
 
-    Activated on "OK" button being clicked. Creates a list of dictionaries,
-    each one a case to be analysed, and exports them as an excel file.
+    Activated on "OK" button being clicked. Creates the grid of cases to be
+    analysed and exports it as an excel file (or a job spec for very large
+    grids).
 
     """
 
@@ -643,7 +645,6 @@ class ExitUI():
         :rtype: TYPE
 
         """
-        self.JobDict = [{}]
         self.gen_joblist()
         self.param_list()
         self.end_window()
@@ -652,13 +653,15 @@ class ExitUI():
         """
         Summary.
 
-        Takes global variable VarDict and iterates through each list to form
-        a list of dictionaries in the correct priority for parameters.
+        Takes global variable VarDict and collects the list of values for
+        each parameter, the axes of the job grid. The cases themselves are
+        generated from these one at a time, in the correct priority for
+        parameters, as the job list is written.
 
         Returns
         -------
-        JobDict: List of dictionaries.
-            Each dictionary contains a unique casse to be analysed.
+        JobAxes: dict
+            List of values for each job list parameter.
 
         """
         VarDict['AntMM'] = [0]
@@ -666,60 +669,43 @@ class ExitUI():
         VarDict['Ver'] = [0]
         VarDict['Tilt'] = [0]
         VarDict['LipAng'] = [0]
-        self.NumJobs = (len(VarDict['LatMM']) * len(VarDict['AntMM'])
-                        * len(VarDict['Loads']) * len(VarDict['Geoms'])
-                        * len(VarDict['AntSpr']) * len(VarDict['LatSpr'])
-                        * len(VarDict['Inc']) * len(VarDict['Ver'])
-                        * len(VarDict['Tilt']) * len(VarDict['HeadRad'])
-                        * len(VarDict['LipAng']))
+        self.JobAxes = {'sim_inc': VarDict['Inc'],
+                        'ver_ang': VarDict['Ver'],
+                        'tilt_ang': VarDict['Tilt'],
+                        'head_rad': VarDict['HeadRad'],
+                        'lat_mm': VarDict['LatMM'],
+                        'ant_mm': VarDict['AntMM'],
+                        'lat_spr': VarDict['LatSpr'],
+                        'ant_spr': VarDict['AntSpr'],
+                        'lip_ang': VarDict['LipAng'],
+                        'load_file': VarDict['Loads']}
+        self.NumJobs = JL.num_cases(self.JobAxes)
+
+        # Very large grids are saved as a job spec rather than a csv
+        if self.NumJobs > JL.MAX_CSV_CASES:
+            self.JobExt = '.json'
+        else:
+            self.JobExt = '.csv'
 
         print("Number of Cases --> " + str(self.NumJobs) + "\n")
 
-        i = 0
-
-        for inc in VarDict["Inc"]:
-            for ver in VarDict["Ver"]:
-                for tilt in VarDict["Tilt"]:
-                    for head in VarDict["HeadRad"]:
-                        for latMM in VarDict["LatMM"]:
-                            for antMM in VarDict["AntMM"]:
-                                for latSpr in VarDict["LatSpr"]:
-                                    for antSpr in VarDict["AntSpr"]:
-                                        for lip in VarDict["LipAng"]:
-                                            for load in VarDict["Loads"]:
-                                                self.JobDict[i][
-                                                    'case_num'] = i
-                                                self.JobDict[i][
-                                                    'sim_inc'] = inc
-                                                self.JobDict[i][
-                                                    'ver_ang'] = ver
-                                                self.JobDict[i][
-                                                    'tilt_ang'] = tilt
-                                                self.JobDict[i][
-                                                    'head_rad'] = head
-                                                self.JobDict[i][
-                                                    'lat_mm'] = latMM
-                                                self.JobDict[i][
-                                                    'ant_mm'] = antMM
-                                                self.JobDict[i][
-                                                    'lat_spr'] = latSpr
-                                                self.JobDict[i][
-                                                    'ant_spr'] = antSpr
-                                                self.JobDict[i][
-                                                    'load_file'] = load
-                                                self.JobDict[i][
-                                                    'lip_ang'] = lip
-                                                self.JobDict[0][
-                                                    'num_jobs'] = self.NumJobs
-                                                self.JobDict[0][
-                                                    'model'] = VarDict['Model']
-                                                i += 1
-                                                if i + 1 > self.NumJobs:
-                                                    continue
-                                                else:
-                                                    self.JobDict.append({})
-        if self.JobDict[-1] == {}:
-            self.JobDict.remove(self.JobDict[-1])
+    def write_joblist(self, path):
+        """
+        Summary.
+
+        Writes the job list as a csv file, or as a job spec for very large
+        grids, without holding all of the cases in memory.
+
+        Parameters
+        ----------
+        path : str
+            File path to write to.
+
+        """
+        if self.JobExt == '.json':
+            JL.write_job_spec(path, self.JobAxes, VarDict['Model'])
+        else:
+            JL.write_job_csv(path, self.JobAxes, VarDict['Model'])
 
     def param_list(self):
         """
@@ -752,8 +738,7 @@ class ExitUI():
         inDir = mainDir + '\\config\\From_UI'
 
         for f in os.listdir(inDir):
-            ext = f[-4:]
-            fname = f[:-4]
+            fname, ext = os.path.splitext(f)
             if os.path.exists(archDir + '\\' + fname + '01' + ext) is False:
                 shutil.move(inDir + '\\' + f,
                             archDir + '\\' + fname + '01' + ext)
@@ -772,10 +757,12 @@ class ExitUI():
                 shutil.move(inDir + '\\' + f,
                             archDir + '\\' + fname
                             + str(appendText) + ext)
-                jbFname = 'Joblist_' + f[9:]
-                shutil.move(inDir + '\\' + jbFname,
-                            archDir + '\\' + jbFname[:-4]
-                            + str(appendText) + ext)
+                for jbExt in ('.csv', '.json'):
+                    jbFname = 'Joblist_' + fname[9:]
+                    if os.path.exists(inDir + '\\' + jbFname + jbExt):
+                        shutil.move(inDir + '\\' + jbFname + jbExt,
+                                    archDir + '\\' + jbFname
+                                    + str(appendText) + jbExt)
 
         settings_file = 'Settings_' + VarDict['Case Name']
         job_file = 'Joblist_' + VarDict['Case Name']
@@ -843,7 +830,7 @@ class ExitUI():
 
         """
         self.MainParams.append(['JobFile',
-                                path + '\\' + job_file + '.csv'])
+                                path + '\\' + job_file + self.JobExt])
 
         mainDir = os.getcwd()[:-11]
         configPath = mainDir + '\\config\\From_UI\\'
@@ -857,13 +844,7 @@ class ExitUI():
             writer = csv.writer(csvfile, dialect='excel')
             writer.writerows(self.MainParams)
 
-        with open(settDir + '\\' + job_file + '.csv', 'w',
-                  newline='') as joblist:
-            fieldnames = list(self.JobDict[0])
-            writer = csv.DictWriter(joblist, fieldnames=fieldnames,
-                                    dialect='excel')
-            writer.writeheader()
-            writer.writerows(self.JobDict)
+        self.write_joblist(settDir + '\\' + job_file + self.JobExt)
 
         # Write a second copy grouping Main file parameters into generic
         # location for loop
@@ -873,13 +854,7 @@ class ExitUI():
             writer = csv.writer(csvfile, dialect='excel')
             writer.writerows(self.MainParams)
 
-        with open(configPath + '\\' + job_file + '.csv', 'w',
-                  newline='') as joblist:
-            fieldnames = list(self.JobDict[0])
-            writer = csv.DictWriter(joblist, fieldnames=fieldnames,
-                                    dialect='excel')
-            writer.writeheader()
-            writer.writerows(self.JobDict)
+        self.write_joblist(configPath + '\\' + job_file + self.JobExt)
 
     def end_window(self):
         """
@@ -914,12 +889,15 @@ class ExitUI():
 
             _1Spr.run_analysis_2D(VarDict['Case Name'],
                                   inFilesDir + '\\Joblist_'
-                                  + VarDict['Case Name'] + '.csv',
+                                  + VarDict['Case Name'] + self.JobExt,
                                   VarDict['Geoms'][0],
                                   CupMeshSize,
                                   VarDict['Points'],
                                   linerPath,
-                                  'Yes')
+                                  'Yes',
+                                  # Plot worker processes would re-run
+                                  # this script, so plots are drawn here
+                                  plot_workers=0)
         else:
             window.destroy()
 
@@ -0,0 +1,337 @@
+"""
+Job list generation and reading.
+
+A sweep is the Cartesian product of a list of values for each job list
+parameter. Rather than building every case in memory, cases are generated
+lazily with itertools.product and read back one row at a time, so very large
+parameter grids can be set up and run as a stream.
+
+Job lists can be stored in two ways:
+
+* A csv job list, one row per case, as written by the UI.
+* A job spec, a small json file holding only the list of values for each
+  parameter (the axes of the grid). A million case grid takes a few hundred
+  bytes instead of a gigabyte of csv.
+
+Both can be given as the JobFile of a settings file.
+
+Version 1.0 (19/10/26)
+"""
+
+
+import csv
+import itertools
+import json
+import math
+import os
+
+
+# Job list parameters, in the order they are varied (the first changes
+# slowest, the last fastest), matching the nesting used by the UI.
+JOB_AXES = ('sim_inc', 'ver_ang', 'tilt_ang', 'head_rad', 'lat_mm', 'ant_mm',
+            'lat_spr', 'ant_spr', 'lip_ang', 'load_file')
+
+# Column order of csv job lists
+JOB_COLUMNS = ('case_num', 'sim_inc', 'ver_ang', 'tilt_ang', 'head_rad',
+               'lat_mm', 'ant_mm', 'lat_spr', 'ant_spr', 'load_file',
+               'lip_ang', 'num_jobs', 'model')
+
+SPEC_FORMAT = 'PyEL job spec'
+
+# Grids with more cases than this are saved by the UI as a job spec
+MAX_CSV_CASES = 100000
+
+# Parameters that are read but not used in this release
+UNUSED_PARAMS = {'ver_ang': 'anteversion angles',
+                 'tilt_ang': 'operative version angles',
+                 'ant_mm': 'anterior mismatches',
+                 'lip_ang': 'lip angles'}
+
+
+def num_cases(axes):
+    """
+    Return the number of cases in a grid without generating them.
+
+    Parameters
+    ----------
+    axes : dict
+        List of values for each parameter in JOB_AXES.
+
+    Returns
+    -------
+    int
+        Product of the number of values of every parameter.
+
+    """
+    return math.prod(len(axes[name]) for name in JOB_AXES)
+
+
+def iter_cases(axes):
+    """
+    Generate the cases of a grid one at a time.
+
+    Parameters
+    ----------
+    axes : dict
+        List of values for each parameter in JOB_AXES.
+
+    Yields
+    ------
+    dict
+        One case, with case_num and a value for every parameter, in the same
+        order as the UI job lists.
+
+    """
+    values = [axes[name] for name in JOB_AXES]
+    for case_num, row in enumerate(itertools.product(*values)):
+        case = dict(zip(JOB_AXES, row))
+        case['case_num'] = case_num
+        yield case
+
+
+def format_case(case):
+    """
+    Convert the values of a case read from file to the types used in a run.
+
+    Parameters
+    ----------
+    case : dict
+        Case parameters, as strings or numbers.
+
+    Returns
+    -------
+    dict
+        Case with numeric parameters as floats, case_num as an int, and a
+        default head radius ('dflt', 'd' etc.) as 'd'.
+
+    """
+    case = dict(case)
+    for name in JOB_AXES:
+        if name == 'load_file':
+            continue
+        value = case[name]
+        if name == 'head_rad' and str(value)[:1] in ('d', 'D'):
+            case[name] = 'd'
+        else:
+            case[name] = float(value)
+    case['case_num'] = int(case['case_num'])
+    return case
+
+
+def write_job_spec(path, axes, model='2D'):
+    """
+    Write a job spec file holding the axes of a grid.
+
+    Parameters
+    ----------
+    path : str
+        File path to write to, conventionally ending .json.
+    axes : dict
+        List of values for each parameter in JOB_AXES.
+    model : str, optional
+        Model the cases are for. The default is '2D'.
+
+    """
+    spec = {'format': SPEC_FORMAT, 'version': 1, 'model': model,
+            'num_jobs': num_cases(axes),
+            'axes': {name: list(axes[name]) for name in JOB_AXES}}
+    with open(path, 'w') as file:
+        json.dump(spec, file, indent=1)
+
+
+def read_job_spec(path):
+    """
+    Read the axes from a job spec file.
+
+    Parameters
+    ----------
+    path : str
+        File path of the job spec.
+
+    Returns
+    -------
+    dict
+        List of values for each parameter in JOB_AXES.
+
+    """
+    with open(path, 'r') as file:
+        spec = json.load(file)
+    if spec.get('format') != SPEC_FORMAT:
+        raise ValueError(path + ' is not a PyEL job spec')
+    return spec['axes']
+
+
+def is_job_spec(JobFile):
+    """Return True if the job file is a job spec rather than a csv list."""
+    return os.path.splitext(JobFile)[1].lower() == '.json'
+
+
+def write_job_csv(path, axes, model='2D'):
+    """
+    Write a csv job list for a grid, one case at a time.
+
+    The file has the same layout as the UI job lists: num_jobs and model are
+    only given on the first row.
+
+    Parameters
+    ----------
+    path : str
+        File path to write to.
+    axes : dict
+        List of values for each parameter in JOB_AXES.
+    model : str, optional
+        Model the cases are for. The default is '2D'.
+
+    """
+    with open(path, 'w', newline='') as joblist:
+        writer = csv.DictWriter(joblist, fieldnames=JOB_COLUMNS,
+                                dialect='excel')
+        writer.writeheader()
+        for case in iter_cases(axes):
+            if case['case_num'] == 0:
+                case['num_jobs'] = num_cases(axes)
+                case['model'] = model
+            writer.writerow(case)
+
+
+def write_job_cases(path, cases, model='2D'):
+    """
+    Write a csv job list of given cases, e.g. cases picked from a grid.
+
+    Parameters
+    ----------
+    path : str
+        File path to write to.
+    cases : list
+        Cases with a value for every parameter in JOB_AXES. They are
+        numbered from 0 in the order given.
+    model : str, optional
+        Model the cases are for. The default is '2D'.
+
+    """
+    with open(path, 'w', newline='') as joblist:
+        writer = csv.DictWriter(joblist, fieldnames=JOB_COLUMNS,
+                                dialect='excel', extrasaction='ignore')
+        writer.writeheader()
+        for case_num, case in enumerate(cases):
+            case = dict(case, case_num=case_num)
+            if case_num == 0:
+                case['num_jobs'] = len(cases)
+                case['model'] = model
+            writer.writerow(case)
+
+
+def _iter_job_csv(JobFile):
+    """
+    Read the cases of a csv job list one row at a time.
+
+    If the load_file of a row is a directory, the row is repeated for every
+    file in it.
+
+    """
+    case_num = 0
+    with open(JobFile, 'rt', newline='') as csvfile:
+        for row in csv.DictReader(csvfile, dialect=csv.excel):
+            if not row.get('case_num'):
+                continue
+            case = {name: row[name] for name in JOB_AXES}
+            if os.path.isdir(case['load_file']):
+                loads = [os.path.join(case['load_file'], filename)
+                         for filename in os.listdir(case['load_file'])]
+            else:
+                loads = [case['load_file']]
+            for load in loads:
+                case['load_file'] = load
+                case['case_num'] = case_num
+                case_num += 1
+                yield format_case(case)
+
+
+def iter_job_file(JobFile):
+    """
+    Read the cases of a job list or job spec one at a time.
+
+    Parameters
+    ----------
+    JobFile : str
+        File path of a csv job list or a json job spec.
+
+    Yields
+    ------
+    dict
+        One case, see format_case. Cases are numbered from 0 in file order.
+
+    """
+    if is_job_spec(JobFile):
+        for case in iter_cases(read_job_spec(JobFile)):
+            yield format_case(case)
+    else:
+        yield from _iter_job_csv(JobFile)
+
+
+def count_job_file(JobFile):
+    """
+    Return the number of cases in a job list or job spec.
+
+    Job specs are counted from their axes; csv job lists are read through
+    once without keeping the rows.
+
+    Parameters
+    ----------
+    JobFile : str
+        File path of a csv job list or a json job spec.
+
+    Returns
+    -------
+    int
+        Number of cases.
+
+    """
+    if is_job_spec(JobFile):
+        return num_cases(read_job_spec(JobFile))
+    count = 0
+    for case in _iter_job_csv(JobFile):
+        count += 1
+    return count
+
+
+def job_frame(JobFile):
+    """
+    Return the job list as a DataFrame, one row per case.
+
+    Parameters
+    ----------
+    JobFile : str
+        File path of a csv job list or a json job spec.
+
+    Returns
+    -------
+    DataFrame
+        Job list parameters, as read by pandas from a csv job list.
+
+    """
+    import pandas as pd
+
+    if is_job_spec(JobFile):
+        return pd.DataFrame(iter_cases(read_job_spec(JobFile)),
+                            columns=JOB_COLUMNS[:-2])
+    return pd.read_csv(JobFile)
+
+
+def warn_unused(case, warned):
+    """
+    Print a warning the first time a parameter unused in this release is set.
+
+    Parameters
+    ----------
+    case : dict
+        Case parameters.
+    warned : set
+        Parameters already warned about, updated in place.
+
+    """
+    for name, description in UNUSED_PARAMS.items():
+        if case[name] != 0 and name not in warned:
+            warned.add(name)
+            print('Warning: non-zero ' + description + ' recorded. These'
+                  ' will not be used in this PyEL release')
@@ -0,0 +1,316 @@
+"""
+In-memory interface to the PyEL model.
+
+Solves single cases and returns their results as a DataFrame without creating
+folders, writing files or printing progress, for optimisation loops and
+notebooks that call the model many times. Saving results is left to a
+separate sink, e.g.
+
+    import PyEL_Library as ELL
+
+    geometry = ELL.load_geometry(CupGeomFile, 0.5)
+    case = {'sim_inc': 55, 'lat_mm': 4, 'lat_spr': 100,
+            'load_file': ActivityFile}
+    result = ELL.solve_case(geometry, case)
+
+    sink = ELL.RawDataSink(CaseNamePath, CaseName)
+    sink.write(0, result)
+
+Cases are dictionaries using the column names of the job list (sim_inc,
+lat_mm, lat_spr, load_file and optionally head_rad), plus contact_its for
+the number of contact iterations.
+
+Version 1.0 (19/10/26)
+"""
+
+
+import functools
+import math
+import os
+import time
+
+import PyEL_Functions as ELF
+
+
+# Fillet radius assumed by RemoveCupPoints_AxisymPointCloud in this release
+CUP_FILLET_RAD = 2
+
+# Contact iterations used if a case does not give contact_its (UI default)
+DEFAULT_CONTACT_ITS = 2000
+
+
+def load_geometry(CupGeomFile, CupMeshSize, HeadRad='d'):
+    """
+    Read a liner point cloud for use with solve_case.
+
+    Parameters
+    ----------
+    CupGeomFile : str
+        File path to the point cloud geometry file.
+    CupMeshSize : float
+        Approximate point spacing of the point cloud (mm).
+    HeadRad : float or 'd', optional
+        Radius of the head, if 'd' read the default radius from the geometry
+        file. The default is 'd'.
+
+    Returns
+    -------
+    dict
+        The unrotated cup data ('CupData'), head radius ('HeadRad'), and the
+        file path and mesh size it was created from.
+
+    """
+    CupData = ELF.CupGeom_AxisymPointCloud(CupGeomFile, HeadRad)
+    return {'CupData': CupData[0], 'HeadRad': CupData[1],
+            'CupGeomFile': CupGeomFile, 'CupMeshSize': CupMeshSize}
+
+
+@functools.lru_cache(maxsize=32)
+def load_activity(ActivityFile):
+    """
+    Read a load profile and split it into load sections.
+
+    Results are cached, so repeated cases with the same profile only read the
+    file once. Files that are not in the PyEL activity format raise a
+    ValueError rather than opening a dialog.
+
+    Parameters
+    ----------
+    ActivityFile : str
+        File path to the load profile.
+
+    Returns
+    -------
+    tuple
+        (ActivityData, LoadSections) as returned by ReadActivity and
+        Load_IdealisedTwoPeak.
+
+    """
+    ActivityData = ELF.ReadActivity(ActivityFile, interactive=False)
+    return ActivityData, ELF.Load_IdealisedTwoPeak(ActivityData)
+
+
+def case_head_radius(geometry, case):
+    """
+    Return the head radius to use for a case.
+
+    Parameters
+    ----------
+    geometry : dict
+        Output of load_geometry.
+    case : dict
+        Case parameters.
+
+    Returns
+    -------
+    float
+        head_rad from the case, or the geometry's head radius if the case
+        does not give one or gives the default ('dflt'/'d').
+
+    """
+    HeadRad = case.get('head_rad', 'd')
+    if isinstance(HeadRad, str) and HeadRad[:1] in ('d', 'D'):
+        return geometry['HeadRad']
+    return float(HeadRad)
+
+
+def rotate_geometry(geometry, CupIncAngle_degrees):
+    """
+    Rotate the liner to a simulator inclination.
+
+    Parameters
+    ----------
+    geometry : dict
+        Output of load_geometry.
+    CupIncAngle_degrees : float
+        Inclination angle in degrees.
+
+    Returns
+    -------
+    list
+        list[0] = rotated cup geometry, list[1] = rotated edge points only.
+
+    """
+    CupIncAngle = math.radians(CupIncAngle_degrees)
+    return ELF.CupRotation_IVTseq_AxisymPointCloud(
+        0, 1, math.sin(CupIncAngle), math.cos(CupIncAngle), 0, 1, 0, 1,
+        geometry['CupData'], 0, CupIncAngle_degrees, 0, 0, verbose=False)
+
+
+def cull_geometry(geometry, RotatedCupData, CupIncAngle_degrees,
+                  LatMaxDynSep):
+    """
+    Remove the points of a rotated liner that cannot be contacted.
+
+    Parameters
+    ----------
+    geometry : dict
+        Output of load_geometry.
+    RotatedCupData : list
+        Output of rotate_geometry.
+    CupIncAngle_degrees : float
+        Inclination angle in degrees.
+    LatMaxDynSep : float
+        Lateral mismatch (mm).
+
+    Returns
+    -------
+    list
+        list[0] = reduced size cup data, list[1] = point ID of the point on
+        the edge to start the contact search from.
+
+    """
+    return ELF.RemoveCupPoints_AxisymPointCloud(
+        RotatedCupData, LatMaxDynSep, 0, math.radians(CupIncAngle_degrees),
+        0, 0, CUP_FILLET_RAD, geometry['CupMeshSize'], verbose=False)
+
+
+def solve_case(geometry, case, counters=False):
+    """
+    Solve a single case and return its results.
+
+    Nothing is written to disk or printed.
+
+    Parameters
+    ----------
+    geometry : dict
+        Output of load_geometry.
+    case : dict
+        Case parameters using the job list column names: sim_inc (degrees),
+        lat_mm (mm), lat_spr (N/mm), load_file, and optionally head_rad (mm)
+        and contact_its.
+    counters : bool, optional
+        If True, count the work done by the contact search, see
+        PyEL_Functions.contact_path. The default is False.
+
+    Returns
+    -------
+    DataFrame
+        The result frame, with the same columns as the Raw Data files. Its
+        attrs hold the case, the head radius, cup orientation (radians),
+        edge loading type, the solve time in seconds ('runtime') and, if
+        requested, the contact search counts ('counters').
+
+    """
+    from scipy.interpolate import interp1d
+
+    startTime = time.perf_counter()
+    CupIncAngle_degrees = float(case['sim_inc'])
+    LatMaxDynSep = float(case['lat_mm'])
+    LatSpringF = float(case['lat_spr'])
+    ContactIts = int(case.get('contact_its', DEFAULT_CONTACT_ITS))
+    HeadRad = case_head_radius(geometry, case)
+    ActivityData, LoadSections = load_activity(case['load_file'])
+
+    CupData = rotate_geometry(geometry, CupIncAngle_degrees)
+    CupData = cull_geometry(geometry, CupData, CupIncAngle_degrees,
+                            LatMaxDynSep)
+    StartID = CupData[1]
+
+    caseCounters = {} if counters else None
+    ContactForceTimeList, result = ELF.solve_contact(
+        [CupData[0]], LatMaxDynSep, 0, LatSpringF, 0, ContactIts, HeadRad,
+        LoadSections, ActivityData[0], StartID, counters=caseCounters)
+    result[ELF.HEAD_FRAME_COLUMNS] = ELF.head_frame(
+        result, HeadRad, interp1d(ActivityData[0], ActivityData[2]),
+        interp1d(ActivityData[0], ActivityData[3]),
+        interp1d(ActivityData[0], ActivityData[4]))
+
+    result.attrs.update({
+        'case': dict(case),
+        'CupGeomFile': geometry['CupGeomFile'],
+        'CupMeshSize': geometry['CupMeshSize'],
+        'HeadRad': HeadRad,
+        'CupOrient': [math.radians(CupIncAngle_degrees), 0, 0],
+        'ELType': ContactForceTimeList[1],
+        'runtime': time.perf_counter() - startTime})
+    if counters:
+        result.attrs['counters'] = caseCounters
+    return result
+
+
+def solve_cases(geometry, cases, sink=None):
+    """
+    Solve a sequence of cases, optionally saving each result as it finishes.
+
+    Parameters
+    ----------
+    geometry : dict
+        Output of load_geometry.
+    cases : iterable
+        Case dictionaries, see solve_case.
+    sink : object, optional
+        Anything with a write(caseNum, result) method, e.g. RawDataSink. The
+        default is None, in which case nothing is saved.
+
+    Yields
+    ------
+    tuple
+        (caseNum, result) for each case, numbered from 0 in the order given.
+
+    """
+    for caseNum, case in enumerate(cases):
+        result = solve_case(geometry, case)
+        if sink is not None:
+            sink.write(caseNum, result)
+        yield caseNum, result
+
+
+class RawDataSink():
+    """
+    Writes results to the Raw Data folder in the format used by the runner.
+
+    Each result is written to <caseNum>_<CaseName>_Results.txt: a line
+    describing the case followed by the results as csv, so the files can be
+    summarised by summarise_results as normal.
+
+    """
+
+    def __init__(self, CaseNamePath, CaseName):
+        """
+        Create the Raw Data folder if needed.
+
+        Parameters
+        ----------
+        CaseNamePath : str
+            Location for putting raw data and charts.
+        CaseName : str
+            Name of the case being run, used for naming files.
+
+        """
+        self.CaseNamePath = CaseNamePath
+        self.CaseName = CaseName
+        if not os.path.exists(os.path.join(CaseNamePath, 'Raw Data')):
+            os.makedirs(os.path.join(CaseNamePath, 'Raw Data'))
+
+    def write(self, caseNum, result):
+        """
+        Write the raw data file for a case.
+
+        Parameters
+        ----------
+        caseNum : int
+            Index of the case in the job list.
+        result : DataFrame
+            Output of solve_case.
+
+        Returns
+        -------
+        str
+            File path written to.
+
+        """
+        info = result.attrs
+        case = info['case']
+        OutputFile = os.path.join(self.CaseNamePath, 'Raw Data',
+                                  str(caseNum) + '_' + self.CaseName
+                                  + '_Results.txt')
+        header = ELF.raw_data_header(
+            info['CupGeomFile'], info['HeadRad'], info['CupOrient'], 0, 0, 0,
+            float(case['lat_mm']), float(case['lat_spr']),
+            info['CupMeshSize'], info['runtime'], case['load_file'])
+        ELF.write_raw_data(result, OutputFile, header)
+        return OutputFile
+
+    def close(self):
+        """Finish writing. Nothing is buffered, so there is nothing to do."""
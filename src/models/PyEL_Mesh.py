@@ -0,0 +1,242 @@
+"""
+Triangulated liner surface for plotting.
+
+The point cloud geometry files give the neighbours of every point. Three
+points that are all neighbours of each other are a triangle of the liner
+surface, so the surface can be drawn with these triangles instead of
+leaving plotly to triangulate the points in the browser, which is slow and
+joins points across the opening of the cup.
+
+Large liners are decimated to a budget of triangles by clustering the points
+on a grid and keeping the triangles whose corners are in three different
+cells, with the grid size chosen to fit the budget. The triangulation of a
+liner is saved to a .npz file, and reused while the geometry file and budget
+are unchanged, e.g.
+
+    mesh = liner_mesh(CupData_df, CupGeomFile,
+                      os.path.join(linerPath, MESH_NAME))
+    go.Mesh3d(x=mesh['points'][:, 0], ..., i=mesh['faces'][:, 0], ...)
+
+Version 1.0 (19/10/26)
+"""
+
+
+import itertools
+import os
+
+import numpy
+import pandas as pd
+
+
+# Largest number of triangles drawn for a liner
+DEFAULT_TRIANGLES = 20000
+
+# Name of the saved triangulation in the output folder of a liner
+MESH_NAME = 'Liner Mesh.npz'
+
+# Bisections of the grid size when decimating
+_DECIMATE_STEPS = 12
+
+
+def neighbour_edges(CupData_df):
+    """
+    Return the edges joining each point of the liner to its neighbours.
+
+    Neighbour lists do not have to agree: an edge is kept if either end
+    lists the other. Neighbours that are not points of the liner are left
+    out.
+
+    Parameters
+    ----------
+    CupData_df : DataFrame
+        Liner geometry, with the NodeID and Neighbours of each point.
+
+    Returns
+    -------
+    ndarray
+        Sorted, unique edges as (first row, second row) of CupData_df, with
+        the first row the lower.
+
+    """
+    counts = CupData_df['Neighbours'].map(len).to_numpy()
+    NodeIDs = pd.Index(CupData_df['NodeID'].to_numpy())
+    neighbours = numpy.fromiter(
+        itertools.chain.from_iterable(CupData_df['Neighbours']),
+        dtype=float, count=counts.sum()).astype(numpy.int64)
+    ends = NodeIDs.get_indexer(neighbours)
+    starts = numpy.repeat(numpy.arange(len(CupData_df)), counts)
+    keep = (ends >= 0) & (ends != starts)
+    edges = numpy.sort(numpy.stack([starts[keep], ends[keep]], axis=1),
+                       axis=1)
+    return numpy.unique(edges, axis=0)
+
+
+def triangulate(CupData_df):
+    """
+    Find the triangles of the liner surface from its neighbour lists.
+
+    Parameters
+    ----------
+    CupData_df : DataFrame
+        Liner geometry, with the NodeID and Neighbours of each point.
+
+    Returns
+    -------
+    ndarray
+        Rows of CupData_df at the corners of each triangle, one triangle per
+        row, each triangle once.
+
+    """
+    numPoints = len(CupData_df)
+    edges = neighbour_edges(CupData_df)
+    keys = edges[:, 0] * numPoints + edges[:, 1]
+    # Neighbours of each point from both ends of its edges, padded with -1
+    starts = numpy.concatenate([edges[:, 0], edges[:, 1]])
+    ends = numpy.concatenate([edges[:, 1], edges[:, 0]])
+    order = numpy.argsort(starts, kind='stable')
+    starts = starts[order]
+    ends = ends[order]
+    degree = numpy.bincount(starts, minlength=numPoints)
+    first = numpy.cumsum(degree) - degree
+    neighbours = numpy.full((numPoints, max(degree.max(), 2)), -1)
+    neighbours[starts, numpy.arange(len(starts)) - first[starts]] = ends
+
+    # A pair of neighbours of a point, both after it, that are neighbours of
+    # each other
+    points = numpy.arange(numPoints)
+    triangles = []
+    for a, b in itertools.combinations(range(neighbours.shape[1]), 2):
+        j = neighbours[:, a]
+        k = neighbours[:, b]
+        after = (j > points) & (k > points)
+        i, j, k = points[after], j[after], k[after]
+        j, k = numpy.minimum(j, k), numpy.maximum(j, k)
+        pair = j * numPoints + k
+        found = numpy.searchsorted(keys, pair)
+        found[found == len(keys)] = 0
+        joined = keys[found] == pair
+        triangles.append(numpy.stack([i[joined], j[joined], k[joined]],
+                                     axis=1))
+    return numpy.concatenate(triangles)
+
+
+def _cluster(points, faces, size):
+    """Merge the points in each cell of a grid, see decimate."""
+    cells = numpy.floor((points - points.min(axis=0)) / size).astype(
+        numpy.int64)
+    shape = cells.max(axis=0) + 1
+    cells = (cells[:, 0] * shape[1] + cells[:, 1]) * shape[2] + cells[:, 2]
+    cells, cluster = numpy.unique(cells, return_inverse=True)
+    faces = cluster[faces]
+    faces = faces[(faces[:, 0] != faces[:, 1])
+                  & (faces[:, 1] != faces[:, 2])
+                  & (faces[:, 0] != faces[:, 2])]
+    corners = numpy.sort(faces, axis=1)
+    numCells = len(cells)
+    keys = (corners[:, 0] * numCells + corners[:, 1]) * numCells \
+        + corners[:, 2]
+    faces = faces[numpy.sort(numpy.unique(keys, return_index=True)[1])]
+    counts = numpy.bincount(cluster, minlength=numCells)
+    centres = numpy.stack([numpy.bincount(cluster, points[:, axis],
+                                          minlength=numCells)
+                           for axis in range(3)], axis=1)
+    centres /= numpy.maximum(counts, 1)[:, None]
+    used, faces = numpy.unique(faces, return_inverse=True)
+    return centres[used], faces.reshape(-1, 3)
+
+
+def decimate(points, faces, triangles=DEFAULT_TRIANGLES):
+    """
+    Reduce a triangulation to a budget of triangles.
+
+    Points in the same cell of a grid are merged into one at their mean
+    position, and triangles with two corners in the same cell are dropped.
+    The grid is the finest found, by bisection, that leaves no more than the
+    budget.
+
+    Parameters
+    ----------
+    points : ndarray
+        Position of each point, one per row.
+    faces : ndarray
+        Rows of points at the corners of each triangle.
+    triangles : int, optional
+        Largest number of triangles to keep. The default is
+        DEFAULT_TRIANGLES.
+
+    Returns
+    -------
+    tuple
+        (points, faces) of the reduced triangulation, the inputs if they are
+        within the budget.
+
+    """
+    if len(faces) <= triangles:
+        return points, faces
+    sides = points[faces[:, [1, 2, 0]]] - points[faces]
+    fine = 0.0
+    coarse = float(numpy.median(numpy.linalg.norm(sides, axis=2)))
+    reduced = _cluster(points, faces, coarse)
+    while len(reduced[1]) > triangles:
+        fine = coarse
+        coarse *= 2
+        reduced = _cluster(points, faces, coarse)
+    for step in range(_DECIMATE_STEPS):
+        size = (fine + coarse) / 2
+        trial = _cluster(points, faces, size)
+        if len(trial[1]) > triangles:
+            fine = size
+        else:
+            coarse = size
+            reduced = trial
+    return reduced
+
+
+def _source(CupGeomFile, triangles):
+    """Describe the geometry file a triangulation was made from."""
+    if CupGeomFile is None or not os.path.exists(CupGeomFile):
+        return None
+    stat = os.stat(CupGeomFile)
+    return numpy.array([os.path.abspath(CupGeomFile), str(stat.st_size),
+                        str(stat.st_mtime_ns), str(triangles)])
+
+
+def liner_mesh(CupData_df, CupGeomFile=None, cacheFile=None,
+               triangles=DEFAULT_TRIANGLES):
+    """
+    Return the triangulated surface of a liner, reduced to a budget.
+
+    Parameters
+    ----------
+    CupData_df : DataFrame
+        Liner geometry, unrotated, with the NodeID, position and Neighbours
+        of each point.
+    CupGeomFile : str, optional
+        File the geometry was read from. The default is None.
+    cacheFile : str, optional
+        .npz file the triangulation is saved to. If it was saved from the
+        same geometry file (by path, size and modification time) with the
+        same budget, it is read instead of triangulating the liner again.
+        The default is None, no file.
+    triangles : int, optional
+        Largest number of triangles. The default is DEFAULT_TRIANGLES.
+
+    Returns
+    -------
+    dict
+        'points', the Nx, Ny and Nz of each point of the mesh, and 'faces',
+        the rows of points at the corners of each triangle.
+
+    """
+    source = _source(CupGeomFile, triangles)
+    if cacheFile is not None and source is not None and os.path.exists(
+            cacheFile):
+        with numpy.load(cacheFile) as saved:
+            if numpy.array_equal(saved['source'], source):
+                return {'points': saved['points'], 'faces': saved['faces']}
+    points, faces = decimate(CupData_df[['Nx', 'Ny', 'Nz']].to_numpy(float),
+                             triangulate(CupData_df), triangles)
+    faces = faces.astype(numpy.int32)
+    if cacheFile is not None and source is not None:
+        numpy.savez(cacheFile, points=points, faces=faces, source=source)
+    return {'points': points, 'faces': faces}
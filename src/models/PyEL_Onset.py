@@ -0,0 +1,349 @@
+"""
+Critical mismatch of edge loading, found by bisection.
+
+Sweeping lat_mm on a fine grid to find where a configuration (liner,
+inclination, head, spring and load profile) starts to edge load solves
+every point of the grid. Edge loading only grows with the mismatch, so this
+brackets the mismatch between the smallest and largest of the job list and
+bisects on it instead, for
+
+* onset, the smallest mismatch at which the contact reaches an EL_
+  location
+* peak, the smallest mismatch at which the axial force while edge loading
+  reaches the peak load of the profile (or a given force), i.e. the edge is
+  still loaded at the peak of the cycle
+
+to a tolerance, which takes about log2(range / tolerance) solves rather than
+one per grid point, e.g. from the src/models folder
+
+    python -m pyel onset Liner.txt Joblist_Example.csv --tolerance 0.05
+
+Solves of a configuration share its rotated and culled liner (the culling
+only depends on the direction of the mismatch, not its size), and the
+contact search of each is started from the contact point found at the
+nearest larger mismatch already solved rather than from the rim.
+
+Version 1.0 (19/10/26)
+"""
+
+
+import csv
+
+import PyEL_Functions as ELF
+import PyEL_JobList as JL
+import PyEL_Library as ELL
+
+
+# Mismatch the critical mismatches are found to (mm)
+DEFAULT_TOLERANCE = 0.05
+
+# Critical mismatches found for each configuration
+TARGETS = ('onset', 'peak')
+
+# Job list parameters that make up a configuration; cases of a configuration
+# only differ in lat_mm
+CONFIG_PARAMS = ('sim_inc', 'head_rad', 'lat_spr', 'load_file')
+
+# Columns of the results table
+ONSET_COLUMNS = (CONFIG_PARAMS
+                 + ('lat_min', 'lat_max', 'sweep_points', 'onset_mm',
+                    'onset_below_mm', 'peak_force_n', 'peak_mm',
+                    'peak_below_mm', 'solves'))
+
+
+class MismatchSolver():
+    """
+    Solve one configuration at any lateral mismatch, keeping the results.
+
+    Parameters
+    ----------
+    geometry : dict
+        Output of PyEL_Library.load_geometry.
+    case : dict
+        Case parameters of the configuration, see PyEL_Library.solve_case;
+        lat_mm is the largest mismatch that will be solved, which the liner
+        is culled for.
+    """
+
+    def __init__(self, geometry, case):
+        self.case = dict(case)
+        self.IncDegrees = float(case['sim_inc'])
+        self.LatSpringF = float(case['lat_spr'])
+        self.ContactIts = int(case.get('contact_its',
+                                       ELL.DEFAULT_CONTACT_ITS))
+        self.HeadRad = ELL.case_head_radius(geometry, case)
+        self.ActivityData, self.LoadSections = ELL.load_activity(
+            case['load_file'])
+        CupData = ELL.rotate_geometry(geometry, self.IncDegrees)
+        self.CupData, self.StartID = ELL.cull_geometry(
+            geometry, CupData, self.IncDegrees, float(case['lat_mm']))
+        self.paths = {}
+        self.summaries = {}
+
+    def start_id(self, LatMaxDynSep):
+        """
+        Return the point to start the contact search from at a mismatch.
+
+        This is the contact point of the nearest larger mismatch solved at
+        the separation closest to LatMaxDynSep, or the rim point the liner
+        was culled with if none has been solved.
+
+        """
+        larger = [LatMM for LatMM in self.paths if LatMM >= LatMaxDynSep]
+        if not larger:
+            return self.StartID
+        ContactList = self.paths[min(larger)][1:]
+        if not ContactList:
+            return self.StartID
+        # Lateral separation of each contact point is its 10th value
+        row = min(ContactList, key=lambda row: abs(row[9] - LatMaxDynSep))
+        return row[1]
+
+    def solve(self, LatMaxDynSep):
+        """
+        Solve the configuration at a lateral mismatch.
+
+        Parameters
+        ----------
+        LatMaxDynSep : float
+            Lateral mismatch (mm).
+
+        Returns
+        -------
+        dict
+            Summary of the case, see PyEL_Functions.case_summary.
+
+        """
+        LatMaxDynSep = float(LatMaxDynSep)
+        if LatMaxDynSep not in self.summaries:
+            ContactPath = ELF.contact_path(
+                [self.CupData], LatMaxDynSep, 0, self.ContactIts,
+                self.HeadRad, self.start_id(LatMaxDynSep))
+            Contact_df = ELF.solve_contact(
+                [self.CupData], LatMaxDynSep, 0, self.LatSpringF, 0,
+                self.ContactIts, self.HeadRad, self.LoadSections,
+                self.ActivityData[0], None, ContactPath)[1]
+            self.paths[LatMaxDynSep] = ContactPath
+            self.summaries[LatMaxDynSep] = ELF.case_summary(
+                Contact_df, self.IncDegrees, '')
+        return self.summaries[LatMaxDynSep]
+
+
+def edge_loaded(summary):
+    """Return whether a case summary has edge loading."""
+    return summary['Edge Loading?'] == 'Yes'
+
+
+def critical_mismatch(solver, test, LatMin, LatMax,
+                      tolerance=DEFAULT_TOLERANCE):
+    """
+    Bisect for the smallest mismatch at which a test of the summary passes.
+
+    The test is taken to fail below and pass above one mismatch. The bracket
+    starts from any mismatches the solver has already solved.
+
+    Parameters
+    ----------
+    solver : MismatchSolver
+        Solver of the configuration.
+    test : function
+        Takes a case summary and returns True or False.
+    LatMin : float
+        Smallest mismatch to look at (mm).
+    LatMax : float
+        Largest mismatch to look at (mm).
+    tolerance : float, optional
+        Largest gap left between the mismatches either side of the critical
+        one (mm). The default is DEFAULT_TOLERANCE.
+
+    Returns
+    -------
+    tuple
+        (smallest mismatch solved at which the test passes, largest mismatch
+        solved below it at which it fails). None if the test fails at LatMax
+        or passes at LatMin respectively.
+
+    """
+    for LatMM in (LatMax, LatMin):
+        solver.solve(LatMM)
+    solved = {LatMM: test(summary)
+              for LatMM, summary in solver.summaries.items()
+              if LatMin <= LatMM <= LatMax}
+    above = min((LatMM for LatMM, passed in solved.items() if passed),
+                default=None)
+    if above is None:
+        return None, None
+    below = max((LatMM for LatMM, passed in solved.items()
+                 if not passed and LatMM < above), default=None)
+    if below is None:
+        return above, None
+    while above - below > tolerance:
+        LatMM = (below + above) / 2
+        if test(solver.solve(LatMM)):
+            above = LatMM
+        else:
+            below = LatMM
+    return above, below
+
+
+def configurations(JobFile):
+    """
+    Group the cases of a job list by configuration.
+
+    Parameters
+    ----------
+    JobFile : str
+        File path of a csv job list or a json job spec.
+
+    Returns
+    -------
+    list
+        For each configuration, in job list order: its first case and the
+        lateral mismatches of its cases.
+
+    """
+    configs = {}
+    for case in JL.iter_job_file(JobFile):
+        key = tuple(case[name] for name in CONFIG_PARAMS)
+        if key not in configs:
+            configs[key] = (case, set())
+        configs[key][1].add(float(case['lat_mm']))
+    return [(case, sorted(LatMMs)) for case, LatMMs in configs.values()]
+
+
+def find_onset(geometry, case, LatMin, LatMax, tolerance=DEFAULT_TOLERANCE,
+               force=None):
+    """
+    Find the critical mismatches of a configuration.
+
+    Parameters
+    ----------
+    geometry : dict
+        Output of PyEL_Library.load_geometry.
+    case : dict
+        Case parameters of the configuration, see PyEL_Library.solve_case;
+        lat_mm is not used.
+    LatMin : float
+        Smallest mismatch to look at (mm).
+    LatMax : float
+        Largest mismatch to look at (mm).
+    tolerance : float, optional
+        Mismatch to find the critical mismatches to (mm). The default is
+        DEFAULT_TOLERANCE.
+    force : float, optional
+        Axial force while edge loading for the peak crossing (N). The
+        default is None, the peak load of the profile.
+
+    Returns
+    -------
+    dict
+        'onset_mm' and 'peak_mm', the smallest mismatch solved with edge
+        loading and with the peak force reached, 'onset_below_mm' and
+        'peak_below_mm', the largest solved below them without, the
+        'peak_force_n' and the number of 'solves'. Mismatches are None when
+        outside the bracket.
+
+    """
+    solver = MismatchSolver(geometry, dict(case, lat_mm=LatMax))
+    if force is None:
+        force = max(solver.ActivityData[1])
+
+    def peak_loaded(summary):
+        return (edge_loaded(summary)
+                and summary['Peak Axial Force'] >= force)
+
+    result = {'peak_force_n': force}
+    for target, test in zip(TARGETS, (edge_loaded, peak_loaded)):
+        above, below = critical_mismatch(solver, test, LatMin, LatMax,
+                                         tolerance)
+        result[target + '_mm'] = above
+        result[target + '_below_mm'] = below
+    result['solves'] = len(solver.summaries)
+    return result
+
+
+def onset_table(geometry, JobFile, tolerance=DEFAULT_TOLERANCE, force=None,
+                ContactIts=ELL.DEFAULT_CONTACT_ITS):
+    """
+    Find the critical mismatches of every configuration of a job list.
+
+    Each configuration is bracketed by the smallest and largest lat_mm of
+    its cases.
+
+    Parameters
+    ----------
+    geometry : dict
+        Output of PyEL_Library.load_geometry.
+    JobFile : str
+        File path of a csv job list or a json job spec.
+    tolerance : float, optional
+        Mismatch to find the critical mismatches to (mm). The default is
+        DEFAULT_TOLERANCE.
+    force : float, optional
+        Axial force for the peak crossing (N). The default is None, the
+        peak load of each profile.
+    ContactIts : int, optional
+        Number of separation positions per solve. The default is
+        PyEL_Library.DEFAULT_CONTACT_ITS.
+
+    Returns
+    -------
+    list
+        One row per configuration, with the columns of ONSET_COLUMNS.
+
+    """
+    rows = []
+    for case, LatMMs in configurations(JobFile):
+        row = {name: case[name] for name in CONFIG_PARAMS}
+        row.update({'lat_min': LatMMs[0], 'lat_max': LatMMs[-1],
+                    'sweep_points': len(LatMMs)})
+        row.update(find_onset(geometry, dict(case, contact_its=ContactIts),
+                              LatMMs[0], LatMMs[-1], tolerance, force))
+        rows.append(row)
+    return rows
+
+
+def write_onset(rows, path):
+    """Save the output of onset_table as csv."""
+    with open(path, 'w', newline='') as csvfile:
+        writer = csv.DictWriter(csvfile, ONSET_COLUMNS, dialect='excel')
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def report(rows):
+    """
+    Describe the critical mismatches of each configuration.
+
+    Parameters
+    ----------
+    rows : list
+        Output of onset_table.
+
+    Returns
+    -------
+    str
+        One line per configuration and the solves saved against sweeping.
+
+    """
+    def mismatch(above, below):
+        if above is None:
+            return 'none'
+        if below is None:
+            return '<=' + format(above, '.3f')
+        return format(below, '.3f') + '-' + format(above, '.3f')
+
+    lines = ['{:>6} {:>6} {:>7} {:>13} {:>13} {:>13} {:>6}'.format(
+        'inc', 'head', 'lat spr', 'lat range', 'onset', 'peak', 'solves')]
+    for row in rows:
+        lines.append('{:>6} {:>6} {:>7} {:>13} {:>13} {:>13} {:>6}'.format(
+            row['sim_inc'], row['head_rad'], row['lat_spr'],
+            format(row['lat_min'], '.3g') + '-'
+            + format(row['lat_max'], '.3g'),
+            mismatch(row['onset_mm'], row['onset_below_mm']),
+            mismatch(row['peak_mm'], row['peak_below_mm']), row['solves']))
+    lines.append(str(sum(row['solves'] for row in rows)) + ' solves for '
+                 + str(len(rows)) + ' configurations ('
+                 + str(sum(row['sweep_points'] for row in rows))
+                 + ' cases in the job list)')
+    return '\n'.join(lines)
@@ -0,0 +1,427 @@
+"""
+Sweep planning for reuse of intermediate results between cases.
+
+Most of the work for a case goes into three stages, each of which only
+depends on a few of the job list parameters (the liner geometry is the same
+for a whole run):
+
+* rotated geometry - the liner rotated to the simulator inclination (sim_inc)
+* culled geometry - the rotated liner with the points that cannot be
+  contacted removed (sim_inc and the direction of lat_mm; the culling only
+  depends on which way the head is displaced, not how far)
+* contact path - the contact point at each separation position (sim_inc,
+  lat_mm, head_rad)
+
+The spring stiffness and load profile only change the forces and times, so
+cases that share a contact path can skip all three stages. The job list
+order puts the load file innermost but is otherwise fixed, so the planner
+scores a few candidate orders by how many times each stage would be
+computed, given the caches that fit in a memory budget, and picks the
+cheapest. Cases keep their case_num, so results are saved and summarised as
+if they had been run in job list order.
+
+Version 1.0 (19/10/26)
+"""
+
+
+import collections
+import itertools
+import sys
+
+import PyEL_JobList as JL
+
+
+# Default memory available for cached stages (MB)
+DEFAULT_MEMORY_MB = 512
+
+# Cached stages, from the one that saves most work to the one that saves
+# least, with the parameters that each depends on. The parameters of each
+# stage are a prefix of the parameters of the one before.
+STAGE_KEYS = collections.OrderedDict([
+    ('path', ('sim_inc', 'lat_mm', 'head_rad')),
+    ('culled', ('sim_inc', 'lat_mm')),
+    ('rotated', ('sim_inc',))])
+
+STAGE_NAMES = {'path': 'contact paths',
+               'culled': 'culled geometry',
+               'rotated': 'rotated geometry'}
+
+# Rough memory used by one row of a contact path (bytes)
+PATH_ROW_BYTES = 400
+
+# Rough number of points looked at per separation position by the contact
+# search, used to compare the cost of the stages in point operations
+PATH_POINTS_PER_IT = 60
+
+
+def mismatch_direction(LatMM):
+    """Return the sign of a lateral mismatch, -1, 0 or 1."""
+    LatMM = float(LatMM)
+    return (LatMM > 0) - (LatMM < 0)
+
+
+def _path_stage_key(key, stage):
+    """Return the key of a stage from the contact path key of a case."""
+    key = key[:len(STAGE_KEYS[stage])]
+    if stage == 'culled':
+        # The culling only uses the direction of the mismatch
+        return (key[0], mismatch_direction(key[1]))
+    return key
+
+
+def stage_key(case, stage):
+    """
+    Return the key that a stage's result is cached under for a case.
+
+    Parameters
+    ----------
+    case : dict
+        Case parameters.
+    stage : str
+        'path', 'culled' or 'rotated'.
+
+    Returns
+    -------
+    tuple
+        Values of the parameters the stage depends on, with lat_mm replaced
+        by its direction for the culled geometry.
+
+    """
+    key = tuple(case[name] for name in STAGE_KEYS['path'])
+    return _path_stage_key(key, stage)
+
+
+def estimate_point_bytes(CupData, samples=100):
+    """
+    Estimate the memory used per point by a copy of the cup data.
+
+    Parameters
+    ----------
+    CupData : list
+        Cup data as read by CupGeom_AxisymPointCloud.
+    samples : int, optional
+        Number of points to measure. The default is 100.
+
+    Returns
+    -------
+    float
+        Average size of a point, including its values and neighbour list
+        (bytes).
+
+    """
+    step = max(1, len(CupData) // samples)
+    rows = CupData[::step]
+    total = 0
+    for row in rows:
+        total += sys.getsizeof(row)
+        for value in row:
+            total += sys.getsizeof(value)
+    return total / max(1, len(rows))
+
+
+class StageCache():
+    """
+    Least recently used cache for the results of one stage.
+
+    A capacity of 0 turns the cache off.
+
+    """
+
+    def __init__(self, capacity):
+        """
+        Create an empty cache.
+
+        Parameters
+        ----------
+        capacity : int
+            Number of results to keep.
+
+        """
+        self.capacity = capacity
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Return the cached result for key, or None if it is not cached."""
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        """Cache a result, dropping the least recently used if full."""
+        if self.capacity == 0:
+            return
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+
+class SweepPlan():
+    """
+    Order to run the cases of a job list in, and the caches to use.
+
+    Attributes
+    ----------
+    order : tuple or None
+        Parameters to sort the cases by, outermost first, or None to run the
+        cases in job list order.
+    capacities : dict
+        Number of results to cache for each stage.
+    stage_bytes : dict
+        Estimated memory used by one result of each stage (bytes).
+    computed : dict
+        Number of times each stage is expected to be computed.
+    file_computed : dict
+        Number of times each stage would be computed in job list order.
+    num_cases : int
+        Number of cases in the job list.
+
+    """
+
+    def __init__(self, order, capacities, stage_bytes, computed,
+                 file_computed, num_cases):
+        self.order = order
+        self.capacities = capacities
+        self.stage_bytes = stage_bytes
+        self.computed = computed
+        self.file_computed = file_computed
+        self.num_cases = num_cases
+
+    def caches(self):
+        """Return an empty StageCache for each stage."""
+        return {stage: StageCache(self.capacities[stage])
+                for stage in STAGE_KEYS}
+
+    def report(self):
+        """
+        Describe the plan and the expected reuse.
+
+        Returns
+        -------
+        str
+            Lines for printing before the run starts.
+
+        """
+        if self.order is None:
+            lines = ['Sweep plan: ' + str(self.num_cases) + ' cases, run in '
+                     'job list order']
+        else:
+            lines = ['Sweep plan: ' + str(self.num_cases) + ' cases, run in '
+                     'order of ' + ', '.join(self.order)]
+        cached = 0
+        for stage in STAGE_KEYS:
+            line = ('    ' + STAGE_NAMES[stage] + ': computed '
+                    + str(self.computed[stage]) + ' times')
+            if self.computed[stage] != self.file_computed[stage]:
+                line += (' (' + str(self.file_computed[stage])
+                         + ' in job list order)')
+            if self.capacities[stage] == 0:
+                line += ', not cached'
+            cached += self.capacities[stage] * self.stage_bytes[stage]
+            lines.append(line)
+        lines.append('    memory for cached results: about '
+                     + str(round(cached / 1e6, 1)) + ' MB')
+        return '\n'.join(lines)
+
+
+def _access(caches, capacities, key, computed):
+    """
+    Simulate the stage lookups for one case.
+
+    Stages are looked up from the contact path down; a stage is only needed
+    if the one after it was not cached.
+
+    """
+    for stage in STAGE_KEYS:
+        cache = caches[stage]
+        stageKey = _path_stage_key(key, stage)
+        if stageKey in cache:
+            cache.move_to_end(stageKey)
+            return
+        computed[stage] += 1
+        if capacities[stage] > 0:
+            cache[stageKey] = None
+            while len(cache) > capacities[stage]:
+                cache.popitem(last=False)
+
+
+def simulate(groups, capacities):
+    """
+    Count how many times each stage is computed for a sequence of cases.
+
+    Parameters
+    ----------
+    groups : iterable
+        (key, count) pairs, where key is the contact path key of a run of
+        count consecutive cases.
+    capacities : dict
+        Number of results cached for each stage.
+
+    Returns
+    -------
+    dict
+        Number of times each stage is computed.
+
+    """
+    caches = {stage: collections.OrderedDict() for stage in STAGE_KEYS}
+    computed = dict.fromkeys(STAGE_KEYS, 0)
+    for key, count in groups:
+        _access(caches, capacities, key, computed)
+        if count > 1:
+            # Every repeat of a key straight after itself does the same work
+            before = dict(computed)
+            _access(caches, capacities, key, computed)
+            for stage in STAGE_KEYS:
+                computed[stage] += ((computed[stage] - before[stage])
+                                    * (count - 2))
+    return computed
+
+
+def _scan(cases):
+    """
+    Read through the cases once, keeping only what is needed for planning.
+
+    Returns the contact path keys as (key, count) runs in job list order,
+    and the position of each parameter value in the order it first appears.
+
+    """
+    runs = []
+    ranks = {name: {} for name in STAGE_KEYS['path']}
+    for case in cases:
+        key = stage_key(case, 'path')
+        for name, value in zip(STAGE_KEYS['path'], key):
+            ranks[name].setdefault(value, len(ranks[name]))
+        if runs and runs[-1][0] == key:
+            runs[-1][1] += 1
+        else:
+            runs.append([key, 1])
+    return runs, ranks
+
+
+def _sort_key(order, ranks):
+    """Return a function giving the sort position of a contact path key."""
+    names = STAGE_KEYS['path']
+    positions = [names.index(name) for name in order]
+
+    def position(key):
+        return tuple(ranks[names[i]][key[i]] for i in positions)
+
+    return position
+
+
+def plan_sweep(JobFile, CupData, ContactIts, memory_mb=DEFAULT_MEMORY_MB):
+    """
+    Choose the order to run the cases of a job list in.
+
+    Stages are given a cache slot, from the contact path down, while they
+    fit in the memory budget. Each candidate order (job list order, and the
+    cases sorted by every ordering of the parameters the stages depend on) is
+    then scored by the number of points processed by the stages it has to
+    compute, and the cheapest is used. Ties keep the job list order.
+
+    Parameters
+    ----------
+    JobFile : str
+        File path of a csv job list or a json job spec.
+    CupData : list
+        Unrotated cup data as read by CupGeom_AxisymPointCloud.
+    ContactIts : int
+        Number of separation positions to evaluate forces at.
+    memory_mb : float, optional
+        Memory available for cached results (MB). The default is
+        DEFAULT_MEMORY_MB.
+
+    Returns
+    -------
+    SweepPlan
+        The chosen order, caches and expected reuse.
+
+    """
+    geometryBytes = estimate_point_bytes(CupData) * len(CupData)
+    # Culling keeps a part of the liner, so the rotated size is an upper bound
+    stage_bytes = {'path': (ContactIts + 1) * PATH_ROW_BYTES,
+                   'culled': geometryBytes,
+                   'rotated': geometryBytes}
+    stage_cost = {'path': ContactIts * PATH_POINTS_PER_IT,
+                  'culled': len(CupData),
+                  'rotated': len(CupData)}
+
+    capacities = {}
+    budget = memory_mb * 1e6
+    for stage in STAGE_KEYS:
+        capacities[stage] = 1 if stage_bytes[stage] <= budget else 0
+        budget -= capacities[stage] * stage_bytes[stage]
+
+    runs, ranks = _scan(JL.iter_job_file(JobFile))
+    num_cases = sum(count for key, count in runs)
+    counts = collections.Counter()
+    for key, count in runs:
+        counts[key] += count
+
+    def cost(computed):
+        return sum(computed[stage] * stage_cost[stage]
+                   for stage in STAGE_KEYS)
+
+    file_computed = simulate(runs, capacities)
+    best = (cost(file_computed), None, file_computed)
+    for order in itertools.permutations(STAGE_KEYS['path']):
+        groups = sorted(counts.items(),
+                        key=lambda item: _sort_key(order, ranks)(item[0]))
+        computed = simulate(groups, capacities)
+        if cost(computed) < best[0]:
+            best = (cost(computed), order, computed)
+
+    return SweepPlan(best[1], capacities, stage_bytes, best[2], file_computed,
+                     num_cases)
+
+
+def iter_planned(JobFile, plan):
+    """
+    Read the cases of a job list in the order chosen by a plan.
+
+    Job specs are generated directly in the new order. Csv job lists are
+    read into memory and sorted; grids big enough for this to matter are
+    saved as job specs by the UI.
+
+    Parameters
+    ----------
+    JobFile : str
+        File path of a csv job list or a json job spec.
+    plan : SweepPlan
+        Output of plan_sweep for the job list.
+
+    Yields
+    ------
+    dict
+        One case, see PyEL_JobList.format_case, with its job list case_num.
+
+    """
+    if plan.order is None:
+        yield from JL.iter_job_file(JobFile)
+    elif JL.is_job_spec(JobFile):
+        axes = JL.read_job_spec(JobFile)
+        names = list(plan.order) + [name for name in JL.JOB_AXES
+                                    if name not in plan.order]
+        # Case numbers count through the axes in job list order
+        strides = {}
+        stride = 1
+        for name in reversed(JL.JOB_AXES):
+            strides[name] = stride
+            stride *= len(axes[name])
+        for indices in itertools.product(*[range(len(axes[name]))
+                                           for name in names]):
+            case = {name: axes[name][i] for name, i in zip(names, indices)}
+            case['case_num'] = sum(strides[name] * i
+                                   for name, i in zip(names, indices))
+            yield JL.format_case(case)
+    else:
+        cases = list(JL.iter_job_file(JobFile))
+        ranks = _scan(cases)[1]
+        position = _sort_key(plan.order, ranks)
+        cases.sort(key=lambda case: position(stage_key(case, 'path')))
+        yield from cases
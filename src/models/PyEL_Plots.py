@@ -0,0 +1,550 @@
+"""
+Rendering of the 3D contact path plots.
+
+The Geometry-Force plots of a sweep show the contact path of each case over
+the liner, per_page cases to a file. Instead of keeping every case's results
+until the end of the sweep to plot them, each page is described by a small
+spec (the raw data files of its cases, their inclinations and graph_info) as
+soon as its last case has been saved, and drawn by a pool of worker
+processes while the runner carries on with the next cases, e.g.
+
+    renderer = PlotRenderer(plot_geometry(CupData_df), CaseName, graph_info,
+                            num_jobs, chartDir)
+    renderer.add_case(caseNum, OutputFile, CupIncAngle_degrees)
+    ...
+    renderer.close()
+
+The liner mesh and edge boundaries drawn under the contact paths are the
+same on every page, so they are written once, to Liner Geometry.js in the
+Charts folder, and each page only holds its contact paths: the page adds the
+liner to each of its plots when it is opened. The pages and the bar chart
+also share one copy of plotly.js, plotly.min.js in the Charts folder,
+instead of each embedding its own. The Charts folder has to be kept
+together for the pages to open; standalone pages, with the liner and
+plotly.js in every file, can be made instead with shared=False.
+
+Pages are laid out in job list order, so a page is drawn
+once all of its cases are done, whatever order they are run in; pages with
+missing cases are drawn with the cases there are when the renderer is
+closed.
+
+Only the cases of the pages being drawn are read back, a page at a time per
+worker, so the memory used for plotting does not grow with the sweep. If the
+workers fall behind, adding the case that completes a page waits for a page
+to finish, which in turn holds up the writer and then the runner (see
+PyEL_Writer), rather than letting pages queue up.
+
+A page that fails to draw is reported and the sweep carries on; the first
+error is raised by close, once every other page has been drawn, so a
+plotting error can never stop the results of a case from being saved.
+
+Version 1.0 (19/10/26)
+"""
+
+
+import concurrent.futures
+import json
+import math
+import multiprocessing
+import os
+
+import numpy
+import pandas as pd
+
+import PyEL_Functions as ELF
+import PyEL_Mesh as ME
+
+
+# Worker processes drawing pages while the runner carries on
+DEFAULT_PLOT_WORKERS = 2
+
+# Pages waiting for or being drawn per worker, before the next page waits
+_PAGES_PER_WORKER = 2
+
+# Column plotted for each choice of graph_info['graph_force']
+FORCE_COLUMNS = {'Axial': ('Axial Force (N)', 'Axial Force (N)'),
+                 'Resultant': ('ResultantForce', 'Resultant Force (N)')}
+
+# Shared files written to the Charts folder for the pages
+GEOMETRY_NAME = 'Liner Geometry.js'
+PLOTLYJS_NAME = 'plotly.min.js'
+
+# Run by each page when it is opened: loads the liner geometry and adds it
+# to every plot on the page that has a contact path
+_GEOMETRY_SCRIPT = '''
+var gd = document.getElementById('{plot_id}');
+var script = document.createElement('script');
+script.src = "''' + GEOMETRY_NAME + '''";
+script.onload = function () {
+    var scenes = [];
+    gd.data.forEach(function (trace) {
+        var scene = trace.scene || 'scene';
+        if (scenes.indexOf(scene) < 0) {
+            scenes.push(scene);
+        }
+    });
+    var traces = [];
+    scenes.forEach(function (scene) {
+        PyELGeometry.forEach(function (trace) {
+            traces.push(Object.assign({scene: scene}, trace));
+        });
+    });
+    Plotly.addTraces(gd, traces);
+};
+document.head.appendChild(script);
+'''
+
+# Liner geometry of the worker process, set when it starts
+_GEOMETRY = None
+
+
+def cup_frame(MasterCupData):
+    """
+    Convert liner geometry to a DataFrame for plotting.
+
+    Parameters
+    ----------
+    MasterCupData : list
+        Unrotated cup data, from PyEL_Functions.CupGeom_AxisymPointCloud.
+
+    Returns
+    -------
+    DataFrame
+        One row per point, with named columns.
+
+    """
+    return pd.DataFrame(MasterCupData).rename(
+        columns={0: 'NodeID', 1: 'Nx', 2: 'Ny', 3: 'Nz', 4: 'SNx', 5: 'SNy',
+                 6: 'SNz', 7: 'Location', 8: 'Edge?', 9: 'Neighbours',
+                 10: 'boundary_location'})
+
+
+def plot_geometry(CupData_df, CupGeomFile=None, cacheFile=None,
+                  triangles=ME.DEFAULT_TRIANGLES):
+    """
+    Return the parts of the liner drawn under the contact paths.
+
+    Parameters
+    ----------
+    CupData_df : DataFrame
+        Liner geometry, unrotated.
+    CupGeomFile : str, optional
+        File the geometry was read from. The default is None.
+    cacheFile : str, optional
+        File the triangulation of the liner is saved to and reused from, see
+        PyEL_Mesh.liner_mesh. The default is None.
+    triangles : int, optional
+        Largest number of triangles drawn for the liner. The default is
+        ME.DEFAULT_TRIANGLES.
+
+    Returns
+    -------
+    dict
+        'mesh': output of PyEL_Mesh.liner_mesh, and 'boundaries': DataFrame
+        of the Nx, Ny and Nz of the points on the edge boundaries.
+
+    """
+    filt = CupData_df['boundary_location'] == 'Yes'
+    return {'mesh': ME.liner_mesh(CupData_df, CupGeomFile, cacheFile,
+                                  triangles),
+            'boundaries': CupData_df.loc[filt, ['Nx', 'Ny', 'Nz']]
+            .reset_index(drop=True)}
+
+
+def page_spec(CaseName, page, cases, graph_info, num_jobs, chartDir,
+              shared=True):
+    """
+    Describe a page of plots.
+
+    Parameters
+    ----------
+    CaseName : str
+        Name of the case being run, used for the subplot titles and file name.
+    page : int
+        Number of the page, from 0.
+    cases : list
+        (case number, raw data file, inclination in degrees) of each case on
+        the page.
+    graph_info : dict
+        Information from Graph Control UI on what is to be plotted.
+    num_jobs : int
+        Number of cases in the job list.
+    chartDir : str
+        Location of the Charts folder the page is written to.
+    shared : bool, optional
+        If True, the page uses the liner geometry and plotly.js written by
+        write_shared_files, otherwise it has its own copies. The default is
+        True.
+
+    Returns
+    -------
+    dict
+        Everything render_page needs to draw the page, apart from the liner.
+
+    """
+    return {'case_name': CaseName,
+            'page': page,
+            'cases': sorted(cases),
+            'graph_force': graph_info['graph_force'],
+            'per_page': graph_info['per_page'],
+            'num_jobs': num_jobs,
+            'shared': shared,
+            'file': os.path.join(chartDir, 'Geometry-Force ' + CaseName
+                                 + str(page + 1) + '.html')}
+
+
+def read_case_path(OutputFile, CupIncAngle_degrees, force_column):
+    """
+    Read the contact path of a case, rotated back to 0° inclination.
+
+    Parameters
+    ----------
+    OutputFile : str
+        Raw data file of the case.
+    CupIncAngle_degrees : float
+        Inclination of the case in degrees.
+    force_column : str
+        Force column to read with the path.
+
+    Returns
+    -------
+    DataFrame
+        Position and force of each contact point, first visit only.
+
+    """
+    df = pd.read_csv(OutputFile, skiprows=1,
+                     usecols=['Old Point ID', 'Nx', 'Ny', 'Nz', force_column])
+    return case_path(df, CupIncAngle_degrees)
+
+
+def case_path(Contact_df, CupIncAngle_degrees):
+    """
+    Return the contact path of a case, rotated back to 0° inclination.
+
+    Parameters
+    ----------
+    Contact_df : DataFrame
+        Results of the case, as written to its raw data file.
+    CupIncAngle_degrees : float
+        Inclination of the case in degrees.
+
+    Returns
+    -------
+    DataFrame
+        Rows of Contact_df for the first visit to each contact point, with
+        Ny and Nz rotated.
+
+    """
+    df = Contact_df.drop_duplicates(subset='Old Point ID', keep='first')
+    df['Nz'], df['Ny'] = ELF.Rotate_2D(
+        df['Nz'], df['Ny'], math.radians(CupIncAngle_degrees),
+        direction=-1)
+    return df
+
+
+def geometry_traces(geometry):
+    """
+    Create the traces of the liner: its mesh and edge boundaries.
+
+    Parameters
+    ----------
+    geometry : dict
+        Output of plot_geometry.
+
+    Returns
+    -------
+    list
+        plotly traces.
+
+    """
+    import plotly.graph_objects as go
+
+    # Positions to 0.1 um, to keep the files small
+    points = numpy.round(geometry['mesh']['points'], 4)
+    faces = geometry['mesh']['faces']
+    boundaries = geometry['boundaries']
+    return [go.Mesh3d(x=points[:, 0].tolist(),
+                      y=points[:, 2].tolist(),
+                      z=points[:, 1].tolist(),
+                      i=faces[:, 0].tolist(),
+                      j=faces[:, 1].tolist(),
+                      k=faces[:, 2].tolist(),
+                      opacity=0.8,
+                      hoverinfo='none',
+                      color='rgb(253,193,199)'),
+            go.Scatter3d(x=boundaries['Nx'].tolist(),
+                         y=boundaries['Nz'].tolist(),
+                         z=boundaries['Ny'].tolist(),
+                         mode='markers',
+                         marker=dict(
+                             size=0.4,
+                             color='black',
+                             symbol='square',
+                             opacity=0.6),
+                         name='Edge Boundary',
+                         text='Edge Boundary',
+                         showlegend=False)]
+
+
+def path_trace(df, caseNum, force, colorbar=False):
+    """
+    Create the trace of the contact path of a case, coloured by force.
+
+    Parameters
+    ----------
+    df : DataFrame
+        Output of read_case_path.
+    caseNum : int
+        Case number, used to name the path.
+    force : tuple
+        (column, label) of the force plotted, see FORCE_COLUMNS.
+    colorbar : bool, optional
+        If True, the force colour bar is shown. The default is False.
+
+    Returns
+    -------
+    plotly trace
+
+    """
+    import plotly.graph_objects as go
+
+    if colorbar:
+        colorbar = dict(thickness=10, tickmode="auto", nticks=5, x=1.2)
+    else:
+        colorbar = None
+    column, label = force
+    return go.Scatter3d(x=df['Nx'],
+                        y=df['Nz'],
+                        z=df['Ny'],
+                        mode='markers',
+                        marker=dict(size=2,
+                                    color=df[column],
+                                    colorscale='Viridis',
+                                    colorbar=colorbar,
+                                    opacity=1),
+                        name='Case' + str(caseNum),
+                        text=df[column],
+                        hovertemplate=label + ": %{text:.0f}",
+                        showlegend=False)
+
+
+def write_shared_files(geometry, chartDir):
+    """
+    Write the liner geometry and plotly.js shared by the pages.
+
+    plotly.js is only written if the Charts folder does not have it yet.
+
+    Parameters
+    ----------
+    geometry : dict
+        Output of plot_geometry. If None, no liner is drawn.
+    chartDir : str
+        Location of the Charts folder.
+
+    """
+    from plotly.offline import get_plotlyjs
+
+    traces = []
+    if geometry is not None:
+        traces = [trace.to_plotly_json()
+                  for trace in geometry_traces(geometry)]
+    with open(os.path.join(chartDir, GEOMETRY_NAME), 'w') as file:
+        file.write('var PyELGeometry = ' + json.dumps(traces) + ';\n')
+    bundle = os.path.join(chartDir, PLOTLYJS_NAME)
+    if not os.path.exists(bundle):
+        with open(bundle, 'w', encoding='utf-8') as file:
+            file.write(get_plotlyjs())
+
+
+def render_page(spec, geometry):
+    """
+    Draw a page of plots and write it to its html file.
+
+    Parameters
+    ----------
+    spec : dict
+        Output of page_spec.
+    geometry : dict
+        Output of plot_geometry, not needed for shared pages.
+
+    Returns
+    -------
+    str
+        File the page was written to.
+
+    """
+    per_page = spec['per_page']
+    first = spec['page'] * per_page
+    fig, fig_tot, rows, cols = ELF.create_fig_subplots(
+        spec['num_jobs'], per_page, spec['case_name'], caseNum=first)
+    force = FORCE_COLUMNS[spec['graph_force']]
+    for caseNum, OutputFile, CupIncAngle_degrees in spec['cases']:
+        df = read_case_path(OutputFile, CupIncAngle_degrees, force[0])
+        row, col = divmod(caseNum - first, cols)
+        traces = [path_trace(df, caseNum, force,
+                             colorbar=caseNum == spec['cases'][0][0])]
+        if not spec['shared']:
+            mesh, boundaries = geometry_traces(geometry)
+            traces = [mesh] + traces + [boundaries]
+        for trace in traces:
+            fig.add_trace(trace, row=row + 1, col=col + 1)
+    fig.update_layout(title='Contact Path with ' + force[1],
+                      autosize=True, margin=dict(l=65, r=50, b=65, t=70))
+    fig.update_xaxes(showgrid=False)
+    fig.update_yaxes(showgrid=False)
+    fig.update_scenes(camera_eye=dict(x=0, y=2.5, z=0))
+    if spec['shared']:
+        fig.write_html(spec['file'], include_plotlyjs='directory',
+                       post_script=_GEOMETRY_SCRIPT)
+    else:
+        fig.write_html(spec['file'], include_plotlyjs=True)
+    return spec['file']
+
+
+def _start_worker(geometry):
+    """Keep the liner geometry for the pages drawn by a worker process."""
+    global _GEOMETRY
+    _GEOMETRY = geometry
+
+
+def _render_page(spec):
+    """Draw a page in a worker process."""
+    return render_page(spec, _GEOMETRY)
+
+
+class PlotRenderer():
+    """
+    Draws the pages of plots of a sweep as their cases finish, see the module
+    docstring.
+
+    A renderer with no workers draws each page straight away in the calling
+    process instead.
+
+    """
+
+    def __init__(self, geometry, CaseName, graph_info, num_jobs, chartDir,
+                 workers=DEFAULT_PLOT_WORKERS, shared=True):
+        """
+        Start the pool of worker processes.
+
+        Parameters
+        ----------
+        geometry : dict
+            Output of plot_geometry.
+        CaseName : str
+            Name of the case being run.
+        graph_info : dict
+            Information from Graph Control UI on what is to be plotted.
+        num_jobs : int
+            Number of cases in the job list.
+        chartDir : str
+            Location of the Charts folder the pages are written to.
+        workers : int, optional
+            Number of worker processes. If 0 pages are drawn in this process.
+            The default is DEFAULT_PLOT_WORKERS.
+        shared : bool, optional
+            If True, the pages share one copy of the liner geometry and
+            plotly.js, written here. The default is True.
+
+        """
+        self.geometry = geometry
+        self.CaseName = CaseName
+        self.graph_info = graph_info
+        self.num_jobs = num_jobs
+        self.chartDir = chartDir
+        self.per_page = graph_info['per_page']
+        self.shared = shared
+        self.pages = {}
+        # Page being drawn by each future, and the errors of failed pages
+        self.futures = {}
+        self.errors = []
+        self.pool = None
+        self.max_pages = workers * _PAGES_PER_WORKER
+        if shared:
+            write_shared_files(geometry, chartDir)
+            # Pages only need the geometry when it is not shared
+            geometry = None
+        if workers > 0:
+            # Workers are started fresh rather than forked, as the runner
+            # has other threads running (see PyEL_Writer)
+            self.pool = concurrent.futures.ProcessPoolExecutor(
+                workers, mp_context=multiprocessing.get_context('spawn'),
+                initializer=_start_worker, initargs=(geometry,))
+
+    def _page_size(self, page):
+        """Return the number of cases on a page."""
+        return min(self.per_page, self.num_jobs - page * self.per_page)
+
+    def _submit(self, page):
+        """Draw a page, in the pool if there is one."""
+        spec = page_spec(self.CaseName, page, self.pages.pop(page),
+                         self.graph_info, self.num_jobs, self.chartDir,
+                         self.shared)
+        try:
+            if self.pool is None:
+                render_page(spec, self.geometry)
+                return
+            while len(self.futures) >= self.max_pages:
+                concurrent.futures.wait(
+                    self.futures,
+                    return_when=concurrent.futures.FIRST_COMPLETED)
+                self.check()
+            self.futures[self.pool.submit(_render_page, spec)] = page
+        except Exception as error:
+            # e.g. a broken pool, as well as a page drawn here failing
+            self._failed(page, error)
+
+    def _failed(self, page, error):
+        """Report a page that failed to draw and keep its error."""
+        print('Page ' + str(page + 1) + ' of the 3D plots could not be '
+              'drawn: ' + repr(error))
+        self.errors.append(error)
+
+    def check(self):
+        """
+        Forget the pages that have been drawn, keeping the error of any that
+        failed for close to raise.
+        """
+        for future in [future for future in self.futures if future.done()]:
+            page = self.futures.pop(future)
+            if future.exception() is not None:
+                self._failed(page, future.exception())
+
+    def add_case(self, caseNum, OutputFile, CupIncAngle_degrees):
+        """
+        Add a finished case, drawing its page if it is the last case of it.
+
+        The raw data file of the case must have been written.
+
+        Parameters
+        ----------
+        caseNum : int
+            Case number, giving the page and position on it.
+        OutputFile : str
+            Raw data file of the case.
+        CupIncAngle_degrees : float
+            Inclination of the case in degrees.
+
+        """
+        self.check()
+        page = caseNum // self.per_page
+        cases = self.pages.setdefault(page, [])
+        cases.append((caseNum, OutputFile, CupIncAngle_degrees))
+        if len(cases) == self._page_size(page):
+            self._submit(page)
+
+    def close(self):
+        """
+        Draw any pages still missing cases and wait for every page, then
+        raise the error of the first page that failed, if one did.
+        """
+        try:
+            for page in sorted(self.pages):
+                self._submit(page)
+            concurrent.futures.wait(self.futures)
+            self.check()
+        finally:
+            if self.pool is not None:
+                self.pool.shutdown()
+        if self.errors:
+            raise self.errors[0]
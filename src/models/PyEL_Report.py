@@ -0,0 +1,358 @@
+"""
+Static report viewer for large sweeps.
+
+Writes a Report folder in the case folder of a run, e.g. from the src/models
+folder
+
+    python -m pyel report <case folder>
+
+holding
+
+* index.html, the viewer: filters on the job list parameters (sim_inc,
+  lat_mm, lat_spr and load_file), the matching cases with their summary,
+  and a 3D plot of the contact path of the case selected
+* cases.js, the parameters and summary of every case
+* tracks/<case number>.js, the contact path of each case, rotated back to
+  0° inclination, with the axial force at each point
+* Liner Geometry.js and plotly.min.js, shared with the plots (see
+  PyEL_Plots)
+
+Contact paths are only loaded by the viewer when their case is selected, and
+only the selected one is kept, so the viewer opens as quickly for thousands
+of cases as for a few. They are loaded with script tags, rather than
+fetched, so the report can be opened straight from the disk without a web
+server.
+
+Each case is read and written once, a case at a time. Writing the report
+again after more cases have finished only reads the cases whose raw data
+files are newer than their tracks, or that were saved by another
+INDEX_VERSION.
+
+Version 1.0 (19/10/26)
+"""
+
+
+import html
+import json
+import os
+
+import pandas as pd
+
+import PyEL_Functions as ELF
+import PyEL_Mesh as ME
+import PyEL_Plots as PT
+import PyEL_ResultStore as RS
+
+
+REPORT_NAME = 'Report'
+
+# Saved index of the cases in the report, for writing it again
+INDEX_NAME = 'index.json'
+
+# Version of how the cases of the index are read; cases saved by another
+# version are read again
+INDEX_VERSION = 2
+
+# Job list parameters the viewer filters on, and the summary it shows
+FILTER_PARAMS = ['sim_inc', 'lat_mm', 'lat_spr', 'load_file']
+SUMMARY_FIELDS = ['max_lat_sep', 'peak_axial_force', 'edge_loading',
+                  'points']
+
+# Columns of the raw data files read for the report
+_COLUMNS = ['Old Point ID', 'Nx', 'Ny', 'Nz', 'Lateral Mismatch', 'Location',
+            'Axial Force (N)']
+
+_VIEWER = '''<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>PyEL Report CASE_HTML</title>
+<style>
+body {font-family: sans-serif; margin: 1em; display: flex; gap: 1em;}
+#side {width: 32em;}
+#filters label {display: inline-block; width: 6em;}
+#filters select {width: 16em; margin: 0.1em;}
+#list {max-height: 75vh; overflow-y: auto;}
+table {border-collapse: collapse; font-size: 0.85em;}
+td, th {padding: 0.15em 0.5em; text-align: right;}
+tr.case:hover {background: #eef; cursor: pointer;}
+tr.selected {background: #ccf;}
+#plot {flex: 1; height: 90vh;}
+</style>
+<script src="plotly.min.js"></script>
+<script src="Liner Geometry.js"></script>
+<script>
+var PyELReport = (function () {
+    var PARAMS = FILTER_PARAMS;
+    var SHOWN = 500;
+    var NAME = CASE_JSON;
+    var cases = null;
+    var wanted = null;
+
+    function setCases(data) {
+        cases = data;
+    }
+
+    function matching() {
+        var chosen = {};
+        PARAMS.forEach(function (param) {
+            chosen[param] = document.getElementById('f_' + param).value;
+        });
+        var rows = [];
+        for (var row = 0; row < cases.case.length; row++) {
+            var keep = PARAMS.every(function (param) {
+                return chosen[param] === '' ||
+                    String(cases[param][row]) === chosen[param];
+            });
+            if (keep) {
+                rows.push(row);
+            }
+        }
+        return rows;
+    }
+
+    function cell(value) {
+        if (value === null) {
+            return 'N/A';
+        }
+        if (typeof value === 'number' && !Number.isInteger(value)) {
+            return value.toFixed(3);
+        }
+        return String(value);
+    }
+
+    function update() {
+        var rows = matching();
+        var html = '<tr><th>case</th>' + PARAMS.map(function (param) {
+            return '<th>' + param + '</th>';
+        }).join('') + '<th>max lat sep</th><th>peak AF</th><th>EL</th></tr>';
+        rows.slice(0, SHOWN).forEach(function (row) {
+            var caseNum = cases.case[row];
+            html += '<tr class="case' +
+                (caseNum === wanted ? ' selected' : '') +
+                '" data-case="' + caseNum + '"><td>' + caseNum + '</td>' +
+                PARAMS.map(function (param) {
+                    return '<td>' + cell(cases[param][row]) + '</td>';
+                }).join('') +
+                '<td>' + cell(cases.max_lat_sep[row]) + '</td>' +
+                '<td>' + cell(cases.peak_axial_force[row]) + '</td>' +
+                '<td>' + (cases.edge_loading[row] ? 'Yes' : 'No') +
+                '</td></tr>';
+        });
+        document.getElementById('cases').innerHTML = html;
+        document.getElementById('count').textContent = rows.length +
+            ' of ' + cases.case.length + ' cases' +
+            (rows.length > SHOWN ? ', first ' + SHOWN + ' shown' : '');
+    }
+
+    function select(caseNum) {
+        wanted = caseNum;
+        var script = document.createElement('script');
+        script.src = 'tracks/' + caseNum + '.js';
+        script.onload = script.onerror = function () {
+            script.remove();
+        };
+        document.head.appendChild(script);
+        update();
+    }
+
+    function addTrack(caseNum, track) {
+        // Only the last case selected is drawn
+        if (caseNum !== wanted) {
+            return;
+        }
+        var traces = (window.PyELGeometry || []).slice();
+        traces.push({type: 'scatter3d', mode: 'markers',
+                     x: track.x, y: track.y, z: track.z,
+                     marker: {size: 2, color: track.force,
+                              colorscale: 'Viridis', opacity: 1,
+                              colorbar: {thickness: 10, nticks: 5,
+                                         title: {text: 'FORCE_LABEL'}}},
+                     text: track.force,
+                     hovertemplate: 'FORCE_LABEL: %{text:.0f}' +
+                         '<extra></extra>',
+                     showlegend: false});
+        Plotly.react('plot', traces, {
+            title: {text: NAME + caseNum + ': contact path with ' +
+                          'FORCE_LABEL'},
+            margin: {l: 10, r: 10, b: 10, t: 50},
+            scene: {camera: {eye: {x: 0, y: 2.5, z: 0}}}});
+    }
+
+    function start() {
+        var filters = document.getElementById('filters');
+        PARAMS.forEach(function (param) {
+            var values = Array.from(new Set(cases[param])).sort(
+                function (a, b) { return a < b ? -1 : (a > b ? 1 : 0); });
+            filters.insertAdjacentHTML('beforeend', '<div><label>' + param +
+                '</label><select id="f_' + param +
+                '"><option value="">all</option>' +
+                values.map(function (value) {
+                    return '<option>' + value + '</option>';
+                }).join('') + '</select></div>');
+            document.getElementById('f_' + param).onchange = update;
+        });
+        document.getElementById('cases').onclick = function (event) {
+            var row = event.target.closest('tr.case');
+            if (row !== null) {
+                select(Number(row.dataset.case));
+            }
+        };
+        update();
+    }
+
+    return {setCases: setCases, addTrack: addTrack, start: start};
+})();
+</script>
+</head>
+<body>
+<div id="side">
+<h3>CASE_HTML</h3>
+<div id="filters"></div>
+<p id="count"></p>
+<div id="list"><table id="cases"></table></div>
+</div>
+<div id="plot"></div>
+<script src="cases.js"></script>
+<script>PyELReport.start();</script>
+</body>
+</html>
+'''
+
+
+def _value(value):
+    """Return a job list parameter as it is shown in the viewer."""
+    # Inclinations are read back through radians, e.g. 59.99999999999999
+    value = round(float(value), 9)
+    if value.is_integer():
+        return int(value)
+    return value
+
+
+def case_report(OutputFile, graph_force='Axial'):
+    """
+    Read a case for the report.
+
+    Parameters
+    ----------
+    OutputFile : str
+        Raw data file of the case.
+    graph_force : str, optional
+        Force to colour the contact path by, see PyEL_Plots.FORCE_COLUMNS.
+        The default is 'Axial'.
+
+    Returns
+    -------
+    tuple
+        (the case's row of the index: its job list parameters and summary,
+        its track: the plot coordinates and force of each contact point)
+
+    """
+    with open(OutputFile, 'r') as file:
+        case, fields = RS.read_header(file.readline())
+    column = PT.FORCE_COLUMNS[graph_force][0]
+    df = pd.read_csv(OutputFile, skiprows=1,
+                     usecols=list(dict.fromkeys(_COLUMNS + [column])))
+    summary = ELF.case_summary(df, case['sim_inc'], OutputFile)
+    path = PT.case_path(df, case['sim_inc'])
+    row = {'sim_inc': _value(case['sim_inc']),
+           'lat_mm': _value(case['lat_mm']),
+           'lat_spr': _value(case['lat_spr']),
+           'load_file': os.path.basename(case['load_file']),
+           'max_lat_sep': summary['Max Lateral Separation'],
+           'peak_axial_force': (None if summary['Peak Axial Force'] == 'N/A'
+                                else summary['Peak Axial Force']),
+           'edge_loading': summary['Edge Loading?'] == 'Yes',
+           'points': len(path),
+           'geom_file': fields['PointCloud']}
+    # Plot coordinates as in PyEL_Plots, to 1 um and 0.1 N
+    track = {'x': path['Nx'].round(3).tolist(),
+             'y': path['Nz'].round(3).tolist(),
+             'z': path['Ny'].round(3).tolist(),
+             'force': path[column].round(1).tolist()}
+    return row, track
+
+
+def _read_index(reportDir):
+    """Return the cases already in a report, keyed by case number."""
+    path = os.path.join(reportDir, INDEX_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r') as file:
+        return {row['case']: row for row in json.load(file)}
+
+
+def write_report(CaseNamePath, CaseName, graph_force='Axial'):
+    """
+    Write the report of a run, see the module docstring.
+
+    Parameters
+    ----------
+    CaseNamePath : str
+        Location of the run's raw data and charts.
+    CaseName : str
+        Name of the case that was run.
+    graph_force : str, optional
+        Force to colour the contact paths by, see PyEL_Plots.FORCE_COLUMNS.
+        The default is 'Axial'.
+
+    Returns
+    -------
+    tuple
+        (location of the viewer, number of cases, number of cases read)
+
+    """
+    reportDir = os.path.join(CaseNamePath, REPORT_NAME)
+    trackDir = os.path.join(reportDir, 'tracks')
+    os.makedirs(trackDir, exist_ok=True)
+    previous = _read_index(reportDir)
+    rows = []
+    read = 0
+    for caseNum, OutputFile in RS.raw_data_cases(CaseNamePath, CaseName):
+        trackFile = os.path.join(trackDir, str(caseNum) + '.js')
+        row = previous.get(caseNum)
+        if (row is None or row.get('graph_force') != graph_force
+                or row.get('version', 1) != INDEX_VERSION
+                or not os.path.exists(trackFile)
+                or os.path.getmtime(trackFile)
+                < os.path.getmtime(OutputFile)):
+            row, track = case_report(OutputFile, graph_force)
+            row = dict(case=caseNum, graph_force=graph_force,
+                       version=INDEX_VERSION, **row)
+            with open(trackFile, 'w') as file:
+                file.write('PyELReport.addTrack(' + str(caseNum) + ', '
+                           + json.dumps(track, separators=(',', ':'))
+                           + ');\n')
+            read += 1
+        rows.append(row)
+    with open(os.path.join(reportDir, INDEX_NAME), 'w') as file:
+        json.dump(rows, file)
+
+    # Columns of the cases, for the viewer
+    columns = {name: [row[name] for row in rows]
+               for name in ['case'] + FILTER_PARAMS + SUMMARY_FIELDS}
+    with open(os.path.join(reportDir, 'cases.js'), 'w') as file:
+        file.write('PyELReport.setCases('
+                   + json.dumps(columns, separators=(',', ':')) + ');\n')
+
+    # Liner drawn under the contact paths, if its file can still be found
+    geometry = None
+    geomFiles = {row['geom_file'] for row in rows}
+    if len(geomFiles) == 1 and os.path.exists(min(geomFiles)):
+        CupGeomFile = min(geomFiles)
+        CupData_df = PT.cup_frame(
+            ELF.CupGeom_AxisymPointCloud(CupGeomFile, 'd')[0])
+        geometry = PT.plot_geometry(
+            CupData_df, CupGeomFile,
+            os.path.join(os.path.dirname(os.path.normpath(CaseNamePath)),
+                         ME.MESH_NAME))
+    PT.write_shared_files(geometry, reportDir)
+
+    viewer = _VIEWER.replace('FILTER_PARAMS', json.dumps(FILTER_PARAMS))
+    viewer = viewer.replace('FORCE_LABEL', PT.FORCE_COLUMNS[graph_force][1])
+    viewer = viewer.replace('CASE_JSON', json.dumps(CaseName))
+    viewer = viewer.replace('CASE_HTML', html.escape(CaseName))
+    index = os.path.join(reportDir, 'index.html')
+    with open(index, 'w', encoding='utf-8') as file:
+        file.write(viewer)
+    return index, len(rows), read
@@ -0,0 +1,605 @@
+"""
+Columnar results store for a sweep.
+
+Writes the results of every case of a sweep to one store, instead of
+reading them back from a raw data file per case, as three tables:
+
+* results - one row per contact point of every case, with typed columns,
+  the case_num of the case, and the location of the point as a code
+* cases - one row per case: its parameters, edge loading type, run time and
+  number of results rows
+* locations - the label of each location code, e.g.
+  'Bearing_Surface|EL_Fillet'
+
+Two formats are supported, each needing an optional package:
+
+* 'parquet' (pyarrow) - a folder <CaseName>_Results.parquet holding
+  results.parquet, cases.parquet and locations.parquet. Results are written
+  in row groups of about ROW_GROUP_ROWS rows as cases finish.
+* 'hdf5' (PyTables) - a file <CaseName>_Results.h5 with a table for each.
+  Results are appended as cases finish and case_num is indexed at the end.
+
+Both are read with read_results and read_cases, which only read the rows
+matching the filters given (row groups or table rows are skipped using the
+column statistics or index), e.g.
+
+    import PyEL_ResultStore as RS
+
+    cases = RS.read_cases(path, [('sim_inc', '==', 45.0)])
+    results = RS.read_results(path, [('case_num', 'in',
+                                      cases['case_num'].tolist()),
+                                     ('axial_force_n', '>', 1000.0)])
+
+The store is only complete once close has been called.
+
+Version 1.0 (19/10/26)
+"""
+
+
+import ast
+import os
+import re
+
+import numpy
+import pandas as pd
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    # Parquet stores are not available
+    pyarrow = None
+
+try:
+    import tables
+except ImportError:
+    # HDF5 stores are not available
+    tables = None
+
+
+STORE_FORMATS = ('parquet', 'hdf5')
+
+# Name of the store written for a sweep, after the case name
+STORE_SUFFIXES = {'parquet': '_Results.parquet', 'hdf5': '_Results.h5'}
+
+# Rows buffered before a Parquet row group is written
+ROW_GROUP_ROWS = 100000
+
+# Columns of a result frame kept in the results table: (result frame column,
+# store column, type). The table also has case_num, and location codes in
+# place of Location.
+RESULT_COLUMNS = [('Contact Point ID', 'contact_point_id', 'int32'),
+                  ('Old Point ID', 'old_point_id', 'int64'),
+                  ('point_count', 'point_count', 'int32'),
+                  ('Nx', 'nx', 'float64'),
+                  ('Ny', 'ny', 'float64'),
+                  ('Nz', 'nz', 'float64'),
+                  ('SNx', 'snx', 'float64'),
+                  ('SNy', 'sny', 'float64'),
+                  ('SNz', 'snz', 'float64'),
+                  ('Anterior Mismatch', 'ant_mm', 'float64'),
+                  ('Lateral Mismatch', 'lat_mm', 'float64'),
+                  ('Edge?', 'edge', 'bool'),
+                  ('Axial Force (N)', 'axial_force_n', 'float64'),
+                  ('ResultantForce', 'resultant_force_n', 'float64'),
+                  ('Time (s)', 'time_s', 'float64'),
+                  ('AdjX', 'adj_x', 'float64'),
+                  ('AdjY', 'adj_y', 'float64'),
+                  ('AdjZ', 'adj_z', 'float64')]
+
+# Columns of the cases table and their types
+CASE_COLUMNS = [('case_num', 'int32'),
+                ('sim_inc', 'float64'),
+                ('lat_mm', 'float64'),
+                ('lat_spr', 'float64'),
+                ('head_rad', 'float64'),
+                ('load_file', 'object'),
+                ('geom_file', 'object'),
+                ('mesh_size', 'float64'),
+                ('contact_its', 'float64'),
+                ('el_type', 'object'),
+                ('runtime_s', 'float64'),
+                ('num_rows', 'int32')]
+
+# Columns of the HDF5 results table that can be filtered on
+HDF_DATA_COLUMNS = ['case_num', 'old_point_id', 'location', 'edge',
+                    'axial_force_n', 'time_s']
+
+# Fields of the first line of a raw data file, see
+# PyEL_Functions.raw_data_header, in the order they are written
+HEADER_KEYS = ('PointCloud', 'HeadRad', 'I/V/T', 'Lip Angle', 'AM/AMK/LM/LMK',
+               'CupMeshSize', 'runtime', 'ActivityFile')
+
+
+def store_path(CaseNamePath, CaseName, fmt):
+    """Return the location of the store for a sweep."""
+    return os.path.join(CaseNamePath, CaseName + STORE_SUFFIXES[fmt])
+
+
+def store_format(path):
+    """Return the format of a store from its name."""
+    extension = os.path.splitext(path.rstrip('/\\'))[1]
+    for fmt, suffix in STORE_SUFFIXES.items():
+        if suffix.endswith(extension) and extension:
+            return fmt
+    raise ValueError('Not a results store: ' + path)
+
+
+def _require(fmt):
+    """Raise an ImportError if the package for a format is missing."""
+    if fmt == 'parquet' and pyarrow is None:
+        raise ImportError('Parquet results stores need pyarrow, install it '
+                          'with pip install pyarrow')
+    if fmt == 'hdf5' and tables is None:
+        raise ImportError('HDF5 results stores need PyTables, install it '
+                          'with pip install tables')
+    if fmt not in STORE_FORMATS:
+        raise ValueError('Unknown results store format ' + repr(fmt)
+                         + ', choose from ' + ', '.join(STORE_FORMATS))
+
+
+def location_label(Location):
+    """
+    Return the label of a contact point location.
+
+    Parameters
+    ----------
+    Location : list or str
+        Regions the point is in, as in a result frame, or as the string
+        written to a raw data file. 'NA' padding is dropped.
+
+    Returns
+    -------
+    str
+        The regions joined by '|'.
+
+    """
+    if isinstance(Location, str):
+        if Location.startswith('['):
+            Location = ast.literal_eval(Location)
+        else:
+            Location = [Location]
+    return '|'.join(region for region in Location if region != 'NA')
+
+
+def case_info(case, HeadRad, CupGeomFile, CupMeshSize, ContactIts=None,
+              ELType=None, runtime=None):
+    """
+    Describe a case for the cases table.
+
+    Parameters
+    ----------
+    case : dict
+        Case parameters using the job list column names.
+    HeadRad : float
+        Radius of the head used (mm).
+    CupGeomFile : str
+        File path to the point cloud geometry file.
+    CupMeshSize : float
+        Approximate point spacing of the point cloud (mm).
+    ContactIts : int, optional
+        Number of separation positions. The default is None, not known.
+    ELType : list, optional
+        Edge loading type from TimePoints_IdealisedTwoPeak_AxisymPointCloud.
+        The default is None, not known.
+    runtime : float, optional
+        Time taken to solve the case (s). The default is None, not known.
+
+    Returns
+    -------
+    dict
+        Values for the columns of the cases table, other than case_num and
+        num_rows.
+
+    """
+    return {'sim_inc': float(case['sim_inc']),
+            'lat_mm': float(case['lat_mm']),
+            'lat_spr': float(case['lat_spr']),
+            'head_rad': float(HeadRad),
+            'load_file': str(case['load_file']),
+            'geom_file': str(CupGeomFile),
+            'mesh_size': float(CupMeshSize),
+            'contact_its': numpy.nan if ContactIts is None else ContactIts,
+            'el_type': '' if ELType is None else ', '.join(ELType),
+            'runtime_s': numpy.nan if runtime is None else runtime}
+
+
+def results_frame(caseNum, df, codes):
+    """
+    Convert the result frame of a case to rows of the results table.
+
+    Parameters
+    ----------
+    caseNum : int
+        Index of the case in the job list.
+    df : DataFrame
+        Result frame, as written to a raw data file.
+    codes : dict
+        Code of each location label, new labels are added to it.
+
+    Returns
+    -------
+    DataFrame
+        Typed rows for the results table.
+
+    """
+    frame = pd.DataFrame({'case_num': numpy.full(len(df), caseNum,
+                                                 dtype='int32')})
+    for column, name, dtype in RESULT_COLUMNS:
+        if column == 'Edge?':
+            frame[name] = df[column].to_numpy() == 'Y'
+        elif column not in df:
+            # Raw data written before the head frame points were added
+            frame[name] = numpy.full(len(df), numpy.nan, dtype=dtype)
+        else:
+            frame[name] = df[column].to_numpy(dtype)
+    labels = [location_label(Location) for Location in df['Location']]
+    frame['location'] = numpy.array(
+        [codes.setdefault(label, len(codes)) for label in labels],
+        dtype='int16')
+    return frame
+
+
+def _case_frame(rows):
+    """Return the cases table for a list of case rows."""
+    frame = pd.DataFrame(rows, columns=[name for name, dtype in CASE_COLUMNS])
+    # Cases may have been run out of job list order
+    frame = frame.sort_values('case_num', kind='stable')
+    return frame.astype(dict(CASE_COLUMNS)).reset_index(drop=True)
+
+
+def _locations_frame(codes):
+    """Return the locations table for the location codes."""
+    return pd.DataFrame({'code': numpy.array(list(codes.values()),
+                                             dtype='int16'),
+                         'label': list(codes)})
+
+
+class _ResultStore():
+    """
+    Writes the results of a sweep to a store, see ParquetStore and HDFStore.
+
+    Stores can be used as the sink of PyEL_Library.solve_cases.
+
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.codes = {}
+        self.cases = []
+
+    def append(self, caseNum, df, info):
+        """
+        Add the results of a case to the store.
+
+        Parameters
+        ----------
+        caseNum : int
+            Index of the case in the job list.
+        df : DataFrame
+            Result frame of the case, as written to a raw data file.
+        info : dict
+            Output of case_info for the case.
+
+        """
+        row = dict(info)
+        row.update({'case_num': caseNum, 'num_rows': len(df)})
+        self.cases.append(row)
+        self._append_results(results_frame(caseNum, df, self.codes))
+
+    def write(self, caseNum, result):
+        """
+        Add the output of PyEL_Library.solve_case to the store.
+
+        Parameters
+        ----------
+        caseNum : int
+            Index of the case in the job list.
+        result : DataFrame
+            Output of solve_case.
+
+        Returns
+        -------
+        str
+            Location of the store.
+
+        """
+        info = result.attrs
+        self.append(caseNum, result, case_info(
+            info['case'], info['HeadRad'], info['CupGeomFile'],
+            info['CupMeshSize'], info['case'].get('contact_its'),
+            info['ELType'], info['runtime']))
+        return self.path
+
+
+class ParquetStore(_ResultStore):
+    """Writes the results of a sweep to a folder of Parquet files."""
+
+    def __init__(self, path, rowGroupRows=ROW_GROUP_ROWS):
+        """
+        Start a new store, replacing any store already at path.
+
+        Parameters
+        ----------
+        path : str
+            Folder to write the store to.
+        rowGroupRows : int, optional
+            Results rows buffered before a row group is written. The default
+            is ROW_GROUP_ROWS.
+
+        """
+        _require('parquet')
+        _ResultStore.__init__(self, path)
+        if not os.path.exists(path):
+            os.makedirs(path)
+        self.rowGroupRows = rowGroupRows
+        self.pending = []
+        self.pendingRows = 0
+        self.writer = None
+
+    def _append_results(self, frame):
+        self.pending.append(frame)
+        self.pendingRows += len(frame)
+        if self.pendingRows >= self.rowGroupRows:
+            self._flush()
+
+    def _flush(self):
+        """Write the buffered results rows as a row group."""
+        if not self.pending:
+            return
+        table = pyarrow.Table.from_pandas(pd.concat(self.pending),
+                                          preserve_index=False)
+        if self.writer is None:
+            self.writer = pyarrow.parquet.ParquetWriter(
+                os.path.join(self.path, 'results.parquet'), table.schema)
+        self.writer.write_table(table, row_group_size=self.pendingRows)
+        self.pending = []
+        self.pendingRows = 0
+
+    def close(self):
+        """Write the remaining results and the cases and locations tables."""
+        self._flush()
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+        for name, frame in (('cases', _case_frame(self.cases)),
+                            ('locations', _locations_frame(self.codes))):
+            pyarrow.parquet.write_table(
+                pyarrow.Table.from_pandas(frame, preserve_index=False),
+                os.path.join(self.path, name + '.parquet'))
+
+
+class HDFStore(_ResultStore):
+    """Writes the results of a sweep to an HDF5 file."""
+
+    def __init__(self, path):
+        """
+        Start a new store, replacing any store already at path.
+
+        Parameters
+        ----------
+        path : str
+            File to write the store to.
+
+        """
+        _require('hdf5')
+        _ResultStore.__init__(self, path)
+        self.store = pd.HDFStore(path, mode='w', complevel=5,
+                                 complib='zlib')
+
+    def _append_results(self, frame):
+        # Indexing is left until the end, so appends stay quick
+        self.store.append('results', frame, format='table', index=False,
+                          data_columns=HDF_DATA_COLUMNS)
+
+    def close(self):
+        """Index the results and write the cases and locations tables."""
+        if 'results' in self.store:
+            self.store.create_table_index('results', columns=['case_num'],
+                                          optlevel=6, kind='medium')
+        self.store.put('cases', _case_frame(self.cases), format='table',
+                       data_columns=True)
+        self.store.put('locations', _locations_frame(self.codes),
+                       format='table')
+        self.store.close()
+
+
+def open_store(fmt, CaseNamePath, CaseName):
+    """
+    Start a new store for a sweep.
+
+    Parameters
+    ----------
+    fmt : str
+        'parquet' or 'hdf5'.
+    CaseNamePath : str
+        Location for putting raw data and charts.
+    CaseName : str
+        Name of the case being run.
+
+    Returns
+    -------
+    ParquetStore or HDFStore
+        The store, at store_path(CaseNamePath, CaseName, fmt).
+
+    """
+    _require(fmt)
+    path = store_path(CaseNamePath, CaseName, fmt)
+    if fmt == 'parquet':
+        return ParquetStore(path)
+    return HDFStore(path)
+
+
+def _where(filters):
+    """Convert filters to an HDF5 where expression."""
+    terms = []
+    for name, op, value in filters:
+        if op == 'in':
+            terms.append(name + ' == ' + repr(list(value)))
+        else:
+            terms.append(name + ' ' + op + ' ' + repr(value))
+    return ' & '.join(terms) if terms else None
+
+
+def _read(path, table, filters, columns):
+    """Read the rows of a table of a store that match the filters."""
+    fmt = store_format(path)
+    _require(fmt)
+    filters = list(filters or [])
+    if fmt == 'parquet':
+        return pyarrow.parquet.read_table(
+            os.path.join(path, table + '.parquet'), columns=columns,
+            filters=filters or None).to_pandas()
+    return pd.read_hdf(path, table, where=_where(filters), columns=columns)
+
+
+def read_locations(path):
+    """
+    Read the location labels of a store.
+
+    Returns
+    -------
+    list
+        Label of each location code.
+
+    """
+    frame = _read(path, 'locations', None, None).sort_values('code')
+    return frame['label'].tolist()
+
+
+def read_results(path, filters=None, columns=None):
+    """
+    Read results rows from a store.
+
+    Parameters
+    ----------
+    path : str
+        Location of the store.
+    filters : list, optional
+        (column, op, value) conditions that rows must all meet, where op is
+        one of ==, !=, <, <=, >, >= or in. Only the rows needed are read.
+        HDF5 stores can only filter on HDF_DATA_COLUMNS. The default is
+        None, every row.
+    columns : list, optional
+        Columns to read. The default is None, every column.
+
+    Returns
+    -------
+    DataFrame
+        The matching rows, with the location codes as a categorical of
+        their labels.
+
+    """
+    frame = _read(path, 'results', filters, columns)
+    if 'location' in frame:
+        frame['location'] = pd.Categorical.from_codes(
+            frame['location'], categories=read_locations(path))
+    return frame.reset_index(drop=True)
+
+
+def read_cases(path, filters=None):
+    """
+    Read rows of the cases table of a store.
+
+    Parameters
+    ----------
+    path : str
+        Location of the store.
+    filters : list, optional
+        Conditions as for read_results. The default is None, every case.
+
+    Returns
+    -------
+    DataFrame
+        The matching cases.
+
+    """
+    return _read(path, 'cases', filters, None).reset_index(drop=True)
+
+
+def read_header(line):
+    """
+    Read the case parameters from the first line of a raw data file.
+
+    Parameters
+    ----------
+    line : str
+        First line of the file.
+
+    Returns
+    -------
+    tuple
+        (case dictionary with sim_inc, lat_mm, lat_spr and load_file, the
+        fields of HEADER_KEYS in the line)
+
+    """
+    # Each value runs up to the next known field, as file paths can have
+    # commas in them
+    parts = re.split(', (' + '|'.join(re.escape(key) for key in HEADER_KEYS)
+                     + ') = ', line.strip())
+    fields = dict(zip(parts[1::2], parts[2::2]))
+    ActivityFile = fields['ActivityFile']
+    IVT = fields['I/V/T'].split('/')
+    AMLM = fields['AM/AMK/LM/LMK'].split('/')
+    case = {'sim_inc': float(IVT[0]), 'lat_mm': float(AMLM[2]),
+            'lat_spr': float(AMLM[3]), 'load_file': ActivityFile}
+    return case, fields
+
+
+def raw_data_cases(CaseNamePath, CaseName):
+    """
+    Find the cases of a run that have a raw data file.
+
+    Parameters
+    ----------
+    CaseNamePath : str
+        Location of the run's raw data and charts.
+    CaseName : str
+        Name of the case that was run.
+
+    Returns
+    -------
+    list
+        (case number, raw data file) of each case, by case number.
+
+    """
+    RawDataPath = os.path.join(CaseNamePath, 'Raw Data')
+    suffix = '_' + CaseName + '_Results.txt'
+    caseNums = sorted(int(name[:-len(suffix)])
+                      for name in os.listdir(RawDataPath)
+                      if name.endswith(suffix)
+                      and name[:-len(suffix)].isdigit())
+    return [(caseNum, os.path.join(RawDataPath, str(caseNum) + suffix))
+            for caseNum in caseNums]
+
+
+def convert_raw_data(CaseNamePath, CaseName, fmt):
+    """
+    Write the raw data files of a finished run to a store.
+
+    Parameters
+    ----------
+    CaseNamePath : str
+        Location of the run's raw data and charts.
+    CaseName : str
+        Name of the case that was run.
+    fmt : str
+        'parquet' or 'hdf5'.
+
+    Returns
+    -------
+    tuple
+        (location of the store, number of cases written)
+
+    """
+    cases = raw_data_cases(CaseNamePath, CaseName)
+    store = open_store(fmt, CaseNamePath, CaseName)
+    for caseNum, OutputFile in cases:
+        with open(OutputFile, 'r') as file:
+            case, fields = read_header(file.readline())
+        df = pd.read_csv(OutputFile, skiprows=1)
+        store.append(caseNum, df, case_info(
+            case, fields['HeadRad'], fields['PointCloud'],
+            fields['CupMeshSize'], runtime=float(fields['runtime'][:-1])))
+    store.close()
+    return store.path, len(cases)
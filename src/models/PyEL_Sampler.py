@@ -0,0 +1,513 @@
+"""
+Adaptive sampling of a job list grid with a response surface surrogate.
+
+Running every case of a grid over inclination, mismatch, spring stiffness
+and head radius grows with the product of the number of values of each.
+This runs a sparse, space filling set of the grid's cases first, fits a
+surrogate of
+
+* max_lat_sep, the maximum lateral separation (mm)
+* peak_el_force, the peak axial force while edge loading (N, 0 without
+  edge loading)
+
+over the axes that vary (a thin plate spline radial basis function with a
+linear trend, scipy.interpolate.RBFInterpolator, on axes scaled to 0-1),
+and then adds cases in batches where the surrogate is least certain or
+changes fastest, until its error is within a tolerance or the budget of
+cases is spent, e.g. from the src/models folder
+
+    python -m pyel sample Liner.txt Joblist_Grid.json --budget 40
+
+The error of the surrogate is estimated by leaving each case out in turn
+(found for all of the cases at once from the inverse of the interpolation
+matrix, Rippa's method). Away from the cases it is taken to grow with the
+distance to the nearest case at the rate its leave-one-out error shows.
+A case is picked where this expected error plus the change the surrogate
+predicts from the nearest case is largest, both scaled by the range of the
+response.
+
+Writes, to the output folder, Sampled Cases.csv (the cases run, as a job
+list that pyel run accepts), Sampled Results.csv (their parameters and
+results) and Surrogate.csv (the surrogate's prediction and error estimate
+at every case of the grid).
+
+Version 1.0 (19/10/26)
+"""
+
+
+import os
+
+import numpy
+import pandas as pd
+
+import PyEL_Functions as ELF
+import PyEL_JobList as JL
+import PyEL_Library as ELL
+
+
+# Job list parameters the sampler can vary; the others must have a single
+# value
+SAMPLED_AXES = ('sim_inc', 'lat_mm', 'lat_spr', 'head_rad')
+
+# Results the surrogate is fitted to, and the case summary fields they come
+# from
+RESPONSES = {'max_lat_sep': 'Max Lateral Separation',
+             'peak_el_force': 'Peak Axial Force'}
+
+DEFAULT_BUDGET = 40
+
+DEFAULT_BATCH = 4
+
+# Largest leave-one-out error of each response, as a fraction of its range,
+# for the surrogate to be accepted
+DEFAULT_TOLERANCE = 0.02
+
+# Largest number of grid cases considered, picked at random from bigger
+# grids
+MAX_CANDIDATES = 200000
+
+SAMPLED_NAME = 'Sampled Cases.csv'
+RESULTS_NAME = 'Sampled Results.csv'
+SURROGATE_NAME = 'Surrogate.csv'
+
+
+def grid_axes(JobFile):
+    """
+    Return the values of each parameter of a job list.
+
+    Parameters
+    ----------
+    JobFile : str
+        File path of a csv job list or a json job spec.
+
+    Returns
+    -------
+    dict
+        Sorted, unique values of each parameter in JOB_AXES.
+
+    """
+    if JL.is_job_spec(JobFile):
+        axes = JL.read_job_spec(JobFile)
+        # One case per value of each axis, rather than every case of the
+        # grid, formatted as the cases of a run would be
+        first = dict({name: axes[name][0] for name in JL.JOB_AXES},
+                     case_num=0)
+        cases = (JL.format_case(dict(first, **{name: value}))
+                 for name in JL.JOB_AXES for value in axes[name])
+    else:
+        cases = JL.iter_job_file(JobFile)
+    values = {name: set() for name in JL.JOB_AXES}
+    for case in cases:
+        for name in JL.JOB_AXES:
+            values[name].add(case[name])
+    return {name: sorted(value, key=str) if name == 'load_file'
+            else sorted(value, key=lambda v: (isinstance(v, str), v))
+            for name, value in values.items()}
+
+
+def candidate_grid(axes, geometry, seed=0):
+    """
+    Return the cases of a grid that the sampler can pick from.
+
+    Parameters
+    ----------
+    axes : dict
+        Values of each parameter in JOB_AXES, see grid_axes.
+    geometry : dict
+        Output of PyEL_Library.load_geometry, for default head radii.
+    seed : int, optional
+        Seed for picking MAX_CANDIDATES cases from bigger grids. The
+        default is 0.
+
+    Returns
+    -------
+    tuple
+        (names of the axes that vary, values of the other parameters,
+        values of the varied axes of each case, one case per row)
+
+    """
+    fixed = {}
+    varied = {}
+    for name in JL.JOB_AXES:
+        values = axes[name]
+        if name == 'head_rad':
+            values = sorted(set(ELL.case_head_radius(geometry,
+                                                     {'head_rad': value})
+                                for value in values))
+        if len(values) == 1:
+            fixed[name] = values[0]
+        elif name in SAMPLED_AXES:
+            varied[name] = numpy.array(values, dtype=float)
+        else:
+            raise ValueError('Only ' + ', '.join(SAMPLED_AXES) + ' can be '
+                             'sampled, ' + name + ' has '
+                             + str(len(values)) + ' values')
+    names = list(varied)
+    if not names:
+        raise ValueError('The job list has only one case')
+    shape = [len(varied[name]) for name in names]
+    total = int(numpy.prod(shape))
+    if total > MAX_CANDIDATES:
+        rows = numpy.random.default_rng(seed).choice(
+            total, MAX_CANDIDATES, replace=False)
+    else:
+        rows = numpy.arange(total)
+    index = numpy.unravel_index(rows, shape)
+    points = numpy.stack([varied[name][index[axis]]
+                          for axis, name in enumerate(names)], axis=1)
+    return names, fixed, points
+
+
+def initial_design(X, size):
+    """
+    Pick a space filling set of points, each the farthest from those before.
+
+    Parameters
+    ----------
+    X : ndarray
+        Points to pick from, scaled to 0-1, one per row.
+    size : int
+        Number of points to pick.
+
+    Returns
+    -------
+    list
+        Rows of X picked, starting with the one nearest the centre.
+
+    """
+    picked = [int(numpy.argmin(numpy.linalg.norm(X - 0.5, axis=1)))]
+    distance = numpy.linalg.norm(X - X[picked[0]], axis=1)
+    while len(picked) < min(size, len(X)):
+        picked.append(int(numpy.argmax(distance)))
+        distance = numpy.minimum(
+            distance, numpy.linalg.norm(X - X[picked[-1]], axis=1))
+    return picked
+
+
+def _kernel(r):
+    """Thin plate spline, as in RBFInterpolator."""
+    return numpy.where(r > 0, r ** 2 * numpy.log(numpy.where(r > 0, r, 1)),
+                       0.0)
+
+
+def loo_errors(X, Y):
+    """
+    Return the leave-one-out errors of a thin plate spline surrogate.
+
+    The error at each point is what the surrogate fitted to the other
+    points gets wrong there, found from the inverse of the interpolation
+    matrix (Rippa's method) rather than by fitting it again.
+
+    Parameters
+    ----------
+    X : ndarray
+        Points, scaled to 0-1, one per row.
+    Y : ndarray
+        Response at each point, one column per response.
+
+    Returns
+    -------
+    ndarray
+        Prediction minus response at each point, shaped as Y.
+
+    Raises
+    ------
+    ValueError
+        If leaving a point out leaves the others on a hyperplane, where the
+        linear trend, and so the surrogate, cannot be fitted to them.
+
+    """
+    n, dims = X.shape
+    Poly = numpy.hstack([numpy.ones((n, 1)), X])
+    for i in range(n):
+        if numpy.linalg.matrix_rank(numpy.delete(Poly, i, axis=0)) <= dims:
+            raise ValueError('Leaving out point ' + str(i) + ' leaves the '
+                             'others on a hyperplane, so its leave-one-out '
+                             'error cannot be found; more points are needed')
+    A = numpy.zeros((n + dims + 1, n + dims + 1))
+    A[:n, :n] = _kernel(numpy.linalg.norm(X[:, None] - X[None], axis=2))
+    A[:n, n:] = Poly
+    A[n:, :n] = Poly.T
+    Inverse = numpy.linalg.inv(A)
+    Coeffs = Inverse[:, :n] @ Y
+    return -Coeffs[:n] / numpy.diag(Inverse)[:n, None]
+
+
+class AdaptiveSampler():
+    """
+    Pick and run the cases of a grid, see the module docstring.
+
+    Parameters
+    ----------
+    geometry : dict
+        Output of PyEL_Library.load_geometry.
+    axes : dict
+        Values of each parameter in JOB_AXES, see grid_axes.
+    ContactIts : int, optional
+        Number of separation positions per case. The default is
+        PyEL_Library.DEFAULT_CONTACT_ITS.
+    seed : int, optional
+        Seed for picking the cases of big grids. The default is 0.
+    """
+
+    def __init__(self, geometry, axes, ContactIts=ELL.DEFAULT_CONTACT_ITS,
+                 seed=0):
+        self.geometry = geometry
+        self.ContactIts = ContactIts
+        self.names, self.fixed, self.points = candidate_grid(axes, geometry,
+                                                             seed)
+        self.low = self.points.min(axis=0)
+        span = self.points.max(axis=0) - self.low
+        self.span = numpy.where(span > 0, span, 1)
+        self.X = (self.points - self.low) / self.span
+        self.sampled = []
+        self.results = []
+        self.surrogates = None
+        self.errors = None
+
+    def case(self, row):
+        """Return the case parameters of a row of the grid."""
+        case = dict(self.fixed)
+        case.update(zip(self.names, self.points[row].tolist()))
+        case['contact_its'] = self.ContactIts
+        return case
+
+    def run_cases(self, rows):
+        """Run cases of the grid and keep their results."""
+        for row in rows:
+            case = self.case(row)
+            result = ELL.solve_case(self.geometry, case)
+            summary = ELF.case_summary(result, case['sim_inc'], '')
+            self.sampled.append(row)
+            self.results.append(
+                [0.0 if summary[field] == 'N/A' else float(summary[field])
+                 for field in RESPONSES.values()])
+
+    def fit(self):
+        """
+        Fit the surrogate to the cases run so far.
+
+        Returns
+        -------
+        ndarray
+            Largest leave-one-out error of each response, as a fraction of
+            its range over the cases run.
+
+        """
+        from scipy.interpolate import RBFInterpolator
+
+        X = self.X[self.sampled]
+        Y = numpy.array(self.results)
+        self.surrogates = RBFInterpolator(X, Y, kernel='thin_plate_spline',
+                                          degree=1)
+        self.errors = loo_errors(X, Y)
+        return numpy.abs(self.errors).max(axis=0) / self._ranges()
+
+    def _ranges(self):
+        """Return the range of each response over the cases run."""
+        Y = numpy.array(self.results)
+        ranges = Y.max(axis=0) - Y.min(axis=0)
+        return numpy.where(ranges > 0, ranges, 1)
+
+    def predict(self, rows=None):
+        """
+        Return the surrogate's prediction and error estimate at grid cases.
+
+        Parameters
+        ----------
+        rows : ndarray, optional
+            Rows of the grid. The default is None, every case.
+
+        Returns
+        -------
+        tuple
+            (prediction, expected error, change from the nearest case run),
+            one column per response; the expected error is the nearest
+            case's leave-one-out error scaled by the distance to it over
+            its distance to the next nearest case.
+
+        """
+        from scipy.spatial import cKDTree
+
+        X = self.X if rows is None else self.X[rows]
+        Sampled = self.X[self.sampled]
+        tree = cKDTree(Sampled)
+        # Spacing of each case run from its nearest neighbour
+        spacing = tree.query(Sampled, k=2)[0][:, 1]
+        distance, nearest = tree.query(X)
+        prediction = self.surrogates(X)
+        scale = distance / numpy.where(spacing > 0, spacing, 1)[nearest]
+        error = numpy.abs(self.errors[nearest]) * scale[:, None]
+        change = numpy.abs(prediction
+                           - numpy.array(self.results)[nearest])
+        return prediction, error, change
+
+    def next_cases(self, batch):
+        """
+        Pick the next cases to run.
+
+        After each case is picked the scores of those near it are reduced
+        in proportion, so a batch is spread over the grid.
+
+        Parameters
+        ----------
+        batch : int
+            Number of cases to pick.
+
+        Returns
+        -------
+        list
+            Rows of the grid.
+
+        """
+        rows = numpy.setdiff1d(numpy.arange(len(self.X)), self.sampled)
+        if not len(rows):
+            return []
+        from scipy.spatial import cKDTree
+
+        prediction, error, change = self.predict(rows)
+        score = ((error + change) / self._ranges()).sum(axis=1)
+        distance = cKDTree(self.X[self.sampled]).query(self.X[rows])[0]
+        picked = []
+        for count in range(min(batch, len(rows))):
+            best = int(numpy.argmax(score))
+            if score[best] <= 0:
+                break
+            picked.append(int(rows[best]))
+            apart = numpy.linalg.norm(self.X[rows] - self.X[rows[best]],
+                                      axis=1)
+            score *= numpy.minimum(1, apart / numpy.where(distance > 0,
+                                                          distance, 1))
+            distance = numpy.minimum(distance, apart)
+        return picked
+
+    def run(self, budget=DEFAULT_BUDGET, batch=DEFAULT_BATCH,
+            tolerance=DEFAULT_TOLERANCE, initial=None, verbose=True):
+        """
+        Run cases until the surrogate is within tolerance or the budget runs
+        out.
+
+        Parameters
+        ----------
+        budget : int, optional
+            Largest number of cases to run. The default is DEFAULT_BUDGET.
+        batch : int, optional
+            Cases added between fits. The default is DEFAULT_BATCH.
+        tolerance : float, optional
+            Largest leave-one-out error of each response as a fraction of
+            its range. The default is DEFAULT_TOLERANCE.
+        initial : int, optional
+            Cases in the initial design, at least twice the number of varied
+            axes plus two (or the whole grid if it is smaller). The default
+            is None, that many cases or the batch size if it is larger.
+        verbose : bool, optional
+            Print the error after each fit. The default is True.
+
+        Returns
+        -------
+        ndarray
+            Largest leave-one-out error of each response after the last fit,
+            see fit.
+
+        Raises
+        ------
+        ValueError
+            If the budget or initial design is smaller than the smallest
+            design.
+
+        """
+        # Leaving a case out has to leave enough cases off any one plane of
+        # the grid for the linear trend, which fewer than twice the number of
+        # axes plus two often do not
+        smallest = min(2 * len(self.names) + 2, len(self.X))
+        if budget < smallest:
+            raise ValueError('A budget of at least ' + str(smallest)
+                             + ' cases is needed to vary '
+                             + ', '.join(self.names))
+        if initial is None:
+            initial = max(smallest, batch)
+        elif initial < smallest:
+            raise ValueError('An initial design of at least ' + str(smallest)
+                             + ' cases is needed to vary '
+                             + ', '.join(self.names))
+        initial = min(initial, budget, len(self.X))
+        self.run_cases(initial_design(self.X, initial))
+        while True:
+            errors = self.fit()
+            if verbose:
+                print(str(len(self.sampled)) + ' cases, leave-one-out error '
+                      + ', '.join(name + ' ' + format(error, '.1%')
+                                  for name, error in zip(RESPONSES, errors)))
+            if (errors <= tolerance).all() or len(self.sampled) >= budget:
+                return errors
+            rows = self.next_cases(min(batch, budget - len(self.sampled)))
+            if not rows:
+                return errors
+            self.run_cases(rows)
+
+    def sampled_frame(self):
+        """Return the parameters and results of the cases run."""
+        frame = pd.DataFrame(self.points[self.sampled], columns=self.names)
+        frame[list(RESPONSES)] = numpy.array(self.results)
+        return frame
+
+    def surrogate_frame(self):
+        """Return the surrogate's prediction and error at every grid case."""
+        prediction, error, change = self.predict()
+        frame = pd.DataFrame(self.points, columns=self.names)
+        for column, name in enumerate(RESPONSES):
+            frame[name] = prediction[:, column]
+            frame[name + '_error'] = error[:, column]
+        frame['sampled'] = numpy.isin(numpy.arange(len(self.points)),
+                                      self.sampled)
+        return frame
+
+    def write(self, folder):
+        """
+        Save the cases run and the surrogate.
+
+        Parameters
+        ----------
+        folder : str
+            Folder to write SAMPLED_NAME, RESULTS_NAME and SURROGATE_NAME
+            to.
+
+        Returns
+        -------
+        list
+            Files written.
+
+        """
+        os.makedirs(folder, exist_ok=True)
+        paths = [os.path.join(folder, name)
+                 for name in (SAMPLED_NAME, RESULTS_NAME, SURROGATE_NAME)]
+        cases = [dict(self.fixed, **dict(zip(self.names, self.points[row])))
+                 for row in self.sampled]
+        JL.write_job_cases(paths[0], cases)
+        self.sampled_frame().to_csv(paths[1], index=False)
+        self.surrogate_frame().to_csv(paths[2], index=False)
+        return paths
+
+    def report(self):
+        """
+        Describe the surrogate.
+
+        Returns
+        -------
+        str
+            Cases run out of the grid, and the leave-one-out error of each
+            response (root mean square and largest, in its units and as a
+            fraction of its range).
+
+        """
+        ranges = self._ranges()
+        lines = [str(len(self.sampled)) + ' of ' + str(len(self.points))
+                 + ' grid cases run, varying ' + ', '.join(self.names)]
+        for column, name in enumerate(RESPONSES):
+            errors = numpy.abs(self.errors[:, column])
+            rms = float(numpy.sqrt(numpy.mean(errors ** 2)))
+            lines.append('{}: leave-one-out error rms {:.4g} ({:.1%}), max '
+                         '{:.4g} ({:.1%})'.format(
+                             name, rms, rms / ranges[column], errors.max(),
+                             errors.max() / ranges[column]))
+        return '\n'.join(lines)
@@ -0,0 +1,295 @@
+"""
+Synthetic liner point clouds for benchmarking and scale testing.
+
+Writes axisymmetric liner geometries in the text format read by
+PyEL_Functions.CupGeom_AxisymPointCloud, so the loaders and solvers can be
+run offline on meshes of any density (about 10 thousand to 10 million
+points) without the liner geometry files.
+
+The profile follows data/external/Bearing_Surface_Geometry_Sketch.png: a
+spherical bearing surface of the inner radius, a fillet rounding the edge of
+the bearing surface down to the rim plane, then a flat chamfer (rim land)
+running outwards. The profile is swept into rings of points roughly one mesh
+size apart, and neighbouring rings are joined by a zipper triangulation; the
+neighbours of each point are the points it shares a triangle edge with.
+
+Each point is written as
+
+    (NodeID, x, y, z, SNx, SNy, SNz, [Locations], 'Edge', [Neighbours])
+
+with the pole at y = inner radius, the rim plane at y = 0 and the surface
+normals pointing towards the centre of the bearing surface. Points are
+labelled 'Bearing_Surface', 'EL_Fillet' or 'EL_Chamfer'; the ring between
+the bearing surface and the fillet has both labels and is the Edge ring.
+
+Rings are generated and written one at a time, so the memory used depends
+on the number of points in a ring rather than in the liner.
+
+Version 1.0 (19/10/26)
+"""
+
+
+import math
+
+import numpy
+
+
+# Liner dimensions of the geometry sketch (mm)
+DEFAULT_INNER_RAD = 18.25
+DEFAULT_FILLET_RAD = 2.0
+DEFAULT_CHAMFER = 1.0
+
+# Fewest points in a ring, other than the pole
+MIN_RING_POINTS = 6
+
+
+def liner_profile(InnerRad, FilletRad, Chamfer, MeshSize):
+    """
+    Return the rings of a liner profile, from the pole to the rim.
+
+    Parameters
+    ----------
+    InnerRad : float
+        Radius of the bearing surface (mm).
+    FilletRad : float
+        Radius of the fillet between the bearing surface and the rim (mm).
+    Chamfer : float
+        Width of the flat chamfer outside the fillet (mm), 0 for none.
+    MeshSize : float
+        Target spacing between points (mm).
+
+    Returns
+    -------
+    list
+        One tuple per ring: (radius, y, normal radial component, normal y
+        component, Locations, Edge).
+
+    """
+    if min(InnerRad, FilletRad, MeshSize) <= 0 or Chamfer < 0:
+        raise ValueError('Liner dimensions and mesh size must be positive')
+    # Angle of the edge of the bearing surface from the pole, placing the
+    # end of the fillet on the rim plane (y = 0)
+    EdgeAngle = math.acos(FilletRad / (InnerRad + FilletRad))
+    FilletCentreR = (InnerRad + FilletRad) * math.sin(EdgeAngle)
+    FilletCentreY = (InnerRad + FilletRad) * math.cos(EdgeAngle)
+
+    rings = []
+    numSphere = max(2, math.ceil(InnerRad * EdgeAngle / MeshSize))
+    for k in range(numSphere + 1):
+        t = EdgeAngle * k / numSphere
+        if k < numSphere:
+            rings.append((InnerRad * math.sin(t), InnerRad * math.cos(t),
+                          -math.sin(t), -math.cos(t), ['Bearing_Surface'],
+                          'N'))
+        else:
+            rings.append((InnerRad * math.sin(t), InnerRad * math.cos(t),
+                          -math.sin(t), -math.cos(t),
+                          ['Bearing_Surface', 'EL_Fillet'], 'Y'))
+
+    # The fillet normal turns from the bearing surface normal to -y
+    numFillet = max(2, math.ceil(FilletRad * EdgeAngle / MeshSize))
+    for k in range(1, numFillet + 1):
+        a = EdgeAngle * (1 - k / numFillet)
+        if k == numFillet and Chamfer > 0:
+            Location = ['EL_Fillet', 'EL_Chamfer']
+        else:
+            Location = ['EL_Fillet']
+        rings.append((FilletCentreR - FilletRad * math.sin(a),
+                      FilletCentreY - FilletRad * math.cos(a),
+                      -math.sin(a), -math.cos(a), Location, 'N'))
+
+    if Chamfer > 0:
+        numChamfer = max(1, math.ceil(Chamfer / MeshSize))
+        for k in range(1, numChamfer + 1):
+            rings.append((FilletCentreR + Chamfer * k / numChamfer, 0.0,
+                          0.0, -1.0, ['EL_Chamfer'], 'N'))
+    return rings
+
+
+def ring_counts(rings, MeshSize):
+    """
+    Return the number of points in each ring of a profile.
+
+    Parameters
+    ----------
+    rings : list
+        Output of liner_profile.
+    MeshSize : float
+        Target spacing between points (mm).
+
+    Returns
+    -------
+    ndarray
+        Points per ring, 1 for the pole.
+
+    """
+    radii = numpy.array([ring[0] for ring in rings])
+    counts = numpy.maximum(MIN_RING_POINTS,
+                           numpy.round(2 * math.pi * radii / MeshSize))
+    counts[0] = 1
+    return counts.astype(numpy.int64)
+
+
+def num_points(InnerRad=DEFAULT_INNER_RAD, FilletRad=DEFAULT_FILLET_RAD,
+               Chamfer=DEFAULT_CHAMFER, MeshSize=0.5):
+    """Return the number of points write_liner would write."""
+    rings = liner_profile(InnerRad, FilletRad, Chamfer, MeshSize)
+    return int(ring_counts(rings, MeshSize).sum())
+
+
+def mesh_size_for_points(points, InnerRad=DEFAULT_INNER_RAD,
+                         FilletRad=DEFAULT_FILLET_RAD,
+                         Chamfer=DEFAULT_CHAMFER):
+    """
+    Return the mesh size that gives roughly a number of points.
+
+    Parameters
+    ----------
+    points : int
+        Number of points wanted.
+    InnerRad, FilletRad, Chamfer : float, optional
+        Liner dimensions (mm), see liner_profile.
+
+    Returns
+    -------
+    float
+        Mesh size (mm).
+
+    """
+    # Points per unit area go as 1 / MeshSize**2, start from the spacing of
+    # the bearing surface hemisphere and correct it a few times
+    MeshSize = math.sqrt(2 * math.pi * InnerRad ** 2 / points)
+    for i in range(4):
+        MeshSize *= math.sqrt(num_points(InnerRad, FilletRad, Chamfer,
+                                         MeshSize) / points)
+    return MeshSize
+
+
+def _zipper(n, m):
+    """
+    Join two rings of n and m points with a strip of triangles.
+
+    Points of both rings are ordered by angle, starting at angle 0, and each
+    point of one ring is joined to the last point reached on the other.
+
+    Returns
+    -------
+    tuple
+        (a, b) arrays of the index in the first and second ring of each edge
+        between the rings, sorted by a then b.
+
+    """
+    angles = numpy.concatenate([numpy.arange(n) / n, numpy.arange(m) / m])
+    fromFirst = numpy.concatenate([numpy.ones(n, bool), numpy.zeros(m, bool)])
+    fromFirst = fromFirst[numpy.argsort(angles, kind='stable')]
+    a = numpy.cumsum(fromFirst) - 1
+    b = (numpy.cumsum(~fromFirst) - 1) % m
+    edges = numpy.unique(a * m + b)
+    return edges // m, edges % m
+
+
+def _ring_neighbours(k, counts, offsets, below, above):
+    """
+    Return the neighbour IDs of each point of ring k.
+
+    below and above are the _zipper edges to rings k - 1 and k + 1 (with
+    ring k second and first respectively), or None at the pole and rim.
+
+    """
+    n = counts[k]
+    j = numpy.arange(n)
+    points = []
+    neighbours = []
+    if n > 1:
+        points += [j, j]
+        neighbours += [offsets[k] + (j - 1) % n, offsets[k] + (j + 1) % n]
+    if below is not None:
+        points.append(below[1])
+        neighbours.append(offsets[k - 1] + below[0])
+    if above is not None:
+        points.append(above[0])
+        neighbours.append(offsets[k + 1] + above[1])
+    points = numpy.concatenate(points)
+    neighbours = numpy.concatenate(neighbours)
+    # Sort by point then neighbour ID, dropping repeats
+    keys = numpy.unique(points * (offsets[-1] + 1) + neighbours)
+    points = keys // (offsets[-1] + 1)
+    neighbours = keys % (offsets[-1] + 1)
+    splits = numpy.searchsorted(points, numpy.arange(1, n))
+    return numpy.split(neighbours, splits)
+
+
+def write_liner(path, InnerRad=DEFAULT_INNER_RAD, FilletRad=DEFAULT_FILLET_RAD,
+                Chamfer=DEFAULT_CHAMFER, MeshSize=0.5, HeadRad=None):
+    """
+    Write a synthetic liner point cloud.
+
+    Parameters
+    ----------
+    path : str
+        File path to write to.
+    InnerRad : float, optional
+        Radius of the bearing surface (mm). The default is
+        DEFAULT_INNER_RAD.
+    FilletRad : float, optional
+        Radius of the fillet at the edge of the bearing surface (mm). The
+        default is DEFAULT_FILLET_RAD.
+    Chamfer : float, optional
+        Width of the flat chamfer outside the fillet (mm). The default is
+        DEFAULT_CHAMFER.
+    MeshSize : float, optional
+        Target spacing between points (mm). The default is 0.5.
+    HeadRad : int, optional
+        Default head radius written in the header (mm). The loader reads two
+        digits. The default is None, the inner radius rounded down.
+
+    Returns
+    -------
+    int
+        Number of points written.
+
+    """
+    if HeadRad is None:
+        HeadRad = int(InnerRad)
+    if not 10 <= HeadRad <= 99 or HeadRad != int(HeadRad):
+        raise ValueError('The default head radius must be a whole number of '
+                         'mm with two digits')
+    rings = liner_profile(InnerRad, FilletRad, Chamfer, MeshSize)
+    counts = ring_counts(rings, MeshSize)
+    # Node IDs of ring k are offsets[k] to offsets[k + 1] - 1, from 1
+    offsets = numpy.concatenate([[1], 1 + numpy.cumsum(counts)])
+
+    with open(path, 'w') as file:
+        file.write('Default head radius = ' + str(int(HeadRad)) + '\n')
+        below = None
+        for k, (r, y, nr, ny, Location, Edge) in enumerate(rings):
+            n = counts[k]
+            if k + 1 < len(rings):
+                above = _zipper(n, counts[k + 1])
+            else:
+                above = None
+            neighbours = _ring_neighbours(k, counts, offsets, below, above)
+            below = above
+
+            phi = 2 * math.pi * numpy.arange(n) / n
+            sin_phi = numpy.sin(phi)
+            cos_phi = numpy.cos(phi)
+            x = r * sin_phi
+            z = r * cos_phi
+            SNx = nr * sin_phi
+            SNz = nr * cos_phi
+            label = ("[" + ','.join("'" + loc + "'" for loc in Location)
+                     + "], '" + Edge + "'")
+            middle = ', {:.6f}, '.format(y)
+            normalY = ', {:.6f}, '.format(ny)
+            lines = []
+            for NodeID, xi, zi, SNxi, SNzi, nbrs in zip(
+                    range(offsets[k], offsets[k + 1]), x.tolist(), z.tolist(),
+                    SNx.tolist(), SNz.tolist(), neighbours):
+                lines.append(
+                    '(' + str(NodeID) + ', ' + '{:.6f}'.format(xi) + middle
+                    + '{:.6f}'.format(zi) + ', ' + '{:.6f}'.format(SNxi)
+                    + normalY + '{:.6f}'.format(SNzi) + ', ' + label
+                    + ', [' + ', '.join(map(str, nbrs.tolist())) + '])\n')
+            file.writelines(lines)
+    return int(offsets[-1] - 1)
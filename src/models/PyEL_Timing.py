@@ -0,0 +1,422 @@
+"""
+Timing and memory use of the stages of an analysis run.
+
+A Timer records how long each stage of a run takes (loading, rotation,
+culling, contact search, force and time, output, plotting...) with
+time.perf_counter_ns, and adds the times up per case and for the whole
+sweep. The totals can be written as json or csv to see where the time goes.
+
+Stages are timed either with a span,
+
+    with timer.span('rotation'):
+        ...
+
+or, around long blocks of code, with start and stop,
+
+    started = timer.start()
+    ...
+    timer.stop('force and time', started)
+
+A disabled timer (NO_TIMER) does no timing at all, so timing calls can be left
+in the solver at no real cost.
+
+Spans are for the runner's own thread. Work done on other threads, such as
+the jobs of the background writer (see PyEL_Writer), is recorded with
+add_background under its own stage, and only in the sweep totals, since it
+is not for the case being run when it finishes. Time that the runner spends
+waiting on such a thread shows up in whichever of its stages is open.
+
+A timer created with memory=True also records, for each stage, the memory
+allocated (with tracemalloc) and the peak resident set size of the process
+so far, to size batch jobs by memory. tracemalloc slows the run down, so the
+times recorded alongside are only a rough guide. tracemalloc traces every
+thread, so the memory of a stage also counts whatever other threads, e.g.
+the writer serialising frames, allocate while it is open.
+
+The contact search can also count the work it does (see
+PyEL_Functions.contact_path); CounterLog writes these counts with the run
+time of each case, to tell a case that is slow because of its geometry from
+one stuck in random restarts.
+
+Version 1.0 (19/10/26)
+"""
+
+
+import csv
+import datetime
+import json
+import sys
+import threading
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, peak RSS is not recorded
+    resource = None
+
+
+# Name of the timing files written by the runner (.json and .csv)
+TIMING_NAME = 'Run Timing'
+
+# Name of the run metadata file written by the runner
+METADATA_NAME = 'Run Metadata.json'
+
+# Name of the contact search counter file written by the runner
+COUNTERS_NAME = 'Run Counters.csv'
+
+# Counts made by PyEL_Functions.contact_path
+COUNTER_NAMES = ('positions', 'neighbours_evaluated', 'climb_rounds',
+                 'footprint_escapes', 'random_restarts', 'id_lookups')
+
+
+def progress(message):
+    """Print a progress message with the time of day."""
+    print(message + ': ' + datetime.datetime.now().strftime('%H:%M:%S'))
+
+
+def peak_rss():
+    """
+    Return the peak resident set size of the process so far.
+
+    Returns
+    -------
+    int or None
+        Peak RSS (bytes), or None where it cannot be read.
+
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kB, macOS bytes
+    if sys.platform != 'darwin':
+        peak *= 1024
+    return peak
+
+
+def write_metadata(path, metadata):
+    """Write the run metadata to a json file."""
+    with open(path, 'w') as file:
+        json.dump(metadata, file, indent=1, default=str)
+
+
+class _Span():
+    """Context manager that times one stage."""
+
+    def __init__(self, timer, stage):
+        self.timer = timer
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = self.timer.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.timer.stop(self.stage, self.started)
+        return False
+
+
+class _NoSpan():
+    """Context manager that does nothing, used by disabled timers."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+class Timer():
+    """
+    Records the time spent in each stage, per case and for the sweep.
+
+    Times recorded while a case is set (see begin_case) are added to that
+    case as well as to the sweep totals. Times recorded between cases, e.g.
+    loading the geometry or plotting, only go to the sweep totals.
+
+    Stages timed with start and stop must be nested, as they are with spans.
+
+    """
+
+    def __init__(self, enabled=True, memory=False):
+        """
+        Create a timer with nothing recorded.
+
+        Parameters
+        ----------
+        enabled : bool, optional
+            If False nothing is timed or recorded. The default is True.
+        memory : bool, optional
+            If True the memory used by each stage is recorded too, and
+            tracemalloc is started if it is not already running. The default
+            is False.
+
+        """
+        self.enabled = enabled
+        self.memory = enabled and memory
+        # Open stages: [traced memory at start, highest peak so far]
+        self.memoryStack = []
+        # Sweep: {stage: [calls, net allocated bytes, largest peak above
+        # the start of the stage, peak RSS at the end of the stage]}
+        self.memoryStages = {}
+        self.startedTracing = self.memory and not tracemalloc.is_tracing()
+        if self.startedTracing:
+            tracemalloc.start()
+        self.caseNum = None
+        self.caseStarted = 0
+        # Held while adding to the totals, which other threads add to too
+        self.lock = threading.Lock()
+        # Per case: {caseNum: {stage: total ns}}
+        self.cases = {}
+        # Sweep: {stage: [calls, total ns, longest call ns]}
+        self.stages = {}
+
+    def span(self, stage):
+        """Return a context manager that times a stage."""
+        if not self.enabled:
+            return _NO_SPAN
+        return _Span(self, stage)
+
+    def start(self):
+        """Return a start time to pass to stop."""
+        if not self.enabled:
+            return 0
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if self.memoryStack:
+                # Keep the enclosing stage's peak before resetting it
+                outer = self.memoryStack[-1]
+                outer[1] = max(outer[1], peak)
+            tracemalloc.reset_peak()
+            self.memoryStack.append([current, current])
+        return time.perf_counter_ns()
+
+    def stop(self, stage, started):
+        """Record the time for a stage since start was called."""
+        if not self.enabled:
+            return
+        self.add(stage, time.perf_counter_ns() - started)
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            atStart, peakSoFar = self.memoryStack.pop()
+            peak = max(peak, peakSoFar)
+            if self.memoryStack:
+                outer = self.memoryStack[-1]
+                outer[1] = max(outer[1], peak)
+            totals = self.memoryStages.setdefault(stage, [0, 0, 0, None])
+            totals[0] += 1
+            totals[1] += current - atStart
+            totals[2] = max(totals[2], peak - atStart)
+            totals[3] = peak_rss()
+
+    def add(self, stage, elapsed):
+        """
+        Record time spent in a stage.
+
+        Parameters
+        ----------
+        stage : str
+            Name of the stage.
+        elapsed : int
+            Time spent (ns).
+
+        """
+        if not self.enabled:
+            return
+        with self.lock:
+            self._add_sweep(stage, elapsed)
+            if self.caseNum is not None:
+                case = self.cases[self.caseNum]
+                case[stage] = case.get(stage, 0) + elapsed
+
+    def add_background(self, stage, elapsed):
+        """
+        Record time spent in a stage on another thread.
+
+        The time only goes to the sweep totals. Can be called from any
+        thread.
+
+        Parameters
+        ----------
+        stage : str
+            Name of the stage.
+        elapsed : int
+            Time spent (ns).
+
+        """
+        if not self.enabled:
+            return
+        with self.lock:
+            self._add_sweep(stage, elapsed)
+
+    def _add_sweep(self, stage, elapsed):
+        """Add time to the sweep totals of a stage."""
+        totals = self.stages.setdefault(stage, [0, 0, 0])
+        totals[0] += 1
+        totals[1] += elapsed
+        totals[2] = max(totals[2], elapsed)
+
+    def begin_case(self, caseNum):
+        """Start recording times against a case."""
+        if not self.enabled:
+            return
+        self.caseNum = caseNum
+        self.cases.setdefault(caseNum, {})
+        self.caseStarted = time.perf_counter_ns()
+
+    def end_case(self):
+        """Record the total time for the current case and stop the case."""
+        if not self.enabled or self.caseNum is None:
+            return
+        self.add('case', time.perf_counter_ns() - self.caseStarted)
+        self.caseNum = None
+
+    def summary(self):
+        """
+        Return the recorded times in seconds.
+
+        Returns
+        -------
+        dict
+            'stages': calls, total, mean and longest time of each stage over
+            the sweep. 'cases': total time of each stage for each case.
+
+        """
+        stages = {}
+        for stage, (calls, total, longest) in self.stages.items():
+            stages[stage] = {'calls': calls,
+                             'total_s': total / 1e9,
+                             'mean_s': total / calls / 1e9,
+                             'max_s': longest / 1e9}
+        cases = {str(caseNum): {stage: elapsed / 1e9
+                                for stage, elapsed in case.items()}
+                 for caseNum, case in sorted(self.cases.items())}
+        return {'stages': stages, 'cases': cases}
+
+    def memory_summary(self):
+        """
+        Return the memory recorded for each stage.
+
+        Returns
+        -------
+        dict
+            For each stage: calls, net bytes allocated over all calls (memory
+            still held at the end of the stage), the largest peak above the
+            memory in use at the start of a call, and the peak RSS of the
+            process at the end of the last call (None if not available).
+            Empty if memory is not being recorded.
+
+        """
+        summary = {}
+        for stage, (calls, net, peak, rss) in self.memoryStages.items():
+            summary[stage] = {'calls': calls,
+                              'net_allocated_bytes': net,
+                              'peak_allocated_bytes': peak,
+                              'peak_rss_bytes': rss}
+        return summary
+
+    def close(self):
+        """Stop tracemalloc if this timer started it."""
+        if self.startedTracing:
+            tracemalloc.stop()
+            self.startedTracing = False
+
+    def report(self):
+        """
+        Describe where the time went.
+
+        Returns
+        -------
+        str
+            Total time of each stage over the sweep, longest first.
+
+        """
+        lines = ['Time per stage (s):']
+        for stage, totals in sorted(self.stages.items(),
+                                    key=lambda item: -item[1][1]):
+            lines.append('    ' + stage + ': '
+                         + str(round(totals[1] / 1e9, 3)) + ' ('
+                         + str(totals[0]) + ' calls)')
+        return '\n'.join(lines)
+
+    def write_json(self, path):
+        """Write the summary to a json file."""
+        with open(path, 'w') as file:
+            json.dump(self.summary(), file, indent=1)
+
+    def write_csv(self, path):
+        """
+        Write the times to a csv file, one row per stage of each case.
+
+        Stages timed outside of any case are given an empty case_num.
+
+        """
+        with open(path, 'w', newline='') as file:
+            writer = csv.writer(file, dialect='excel')
+            writer.writerow(['case_num', 'stage', 'seconds'])
+            for caseNum, case in sorted(self.cases.items()):
+                for stage, elapsed in case.items():
+                    writer.writerow([caseNum, stage, elapsed / 1e9])
+            for stage, (calls, total, longest) in self.stages.items():
+                if not any(stage in case for case in self.cases.values()):
+                    writer.writerow(['', stage, total / 1e9])
+
+
+# Timer used when timing is not wanted
+NO_TIMER = Timer(enabled=False)
+
+
+class CounterLog():
+    """
+    Writes the contact search counts and run time of each case to a csv file.
+
+    A row is written as each case finishes, so the file can be followed while
+    a sweep runs.
+
+    """
+
+    def __init__(self, path):
+        """
+        Start a new counter file.
+
+        Parameters
+        ----------
+        path : str
+            File path to write to.
+
+        """
+        self.path = path
+        with open(path, 'w', newline='') as file:
+            csv.writer(file, dialect='excel').writerow(
+                ('case_num', 'runtime_s', 'path_reused') + COUNTER_NAMES
+                + ('neighbours_per_position',))
+
+    def write(self, caseNum, runtime, counters):
+        """
+        Write the counts for a case and print a summary of them.
+
+        Parameters
+        ----------
+        caseNum : int
+            Index of the case in the job list.
+        runtime : float
+            Run time of the case (s).
+        counters : dict
+            Counts from contact_path. Empty if the case reused the contact
+            path of an earlier case.
+
+        """
+        counts = [counters.get(name, 0) for name in COUNTER_NAMES]
+        perPosition = (counters.get('neighbours_evaluated', 0)
+                       / max(1, counters.get('positions', 0)))
+        with open(self.path, 'a', newline='') as file:
+            csv.writer(file, dialect='excel').writerow(
+                [caseNum, runtime, not counters] + counts + [perPosition])
+        if counters:
+            print('Contact search: ' + ', '.join(
+                str(count) + ' ' + name.replace('_', ' ')
+                for name, count in zip(COUNTER_NAMES, counts)))
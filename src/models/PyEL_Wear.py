@@ -0,0 +1,385 @@
+"""
+Wear maps of the head and liner accumulated over many gait cycles.
+
+Each case of a run is one gait cycle under its conditions. Over a cycle the
+head slides over the liner at each contact point: between one contact time
+and the next, the material point of the head at the contact moves by the
+change in the head centre plus the change in the head's rotation (see
+PyEL_Functions.head_offsets and head_rotations). Its sliding distance times
+the axial force is the frictional work, which wear is taken to be
+proportional to (Archard). The work of each interval is added to a fixed
+grid over the liner, at the contact point rotated back to 0° inclination,
+and to a grid over the head, at the contact point in the head frame. Both
+grids are by angle about the centre, as in PyEL_Density.
+
+Contact times are interpolated within the rows of the load profile, so
+consecutive contact points are never more than one profile time step apart
+while the contact moves continuously. Longer intervals are gaps in the
+contact (e.g. while the separation and load are steady, or between the end
+of the contact path and heel strike) rather than one slide, and their work
+is left out: the map only counts sliding between contact points that were
+both solved.
+
+The grids of one cycle of each case are saved to Wear Cycles.npz in the
+case folder and only worked out again for cases whose raw data has changed,
+so a map for any number of cycles, e.g. from the src/models folder
+
+    python -m pyel wear <case folder> --cycles 1000000
+
+is the cycles of each case times its saved grid, one weighted bincount
+that takes no longer for a million cycles than for one. The map is saved as a
+.npz array and drawn as heatmaps in the Charts folder. With --wear-factor
+(mm³/Nm) the work is converted to wear volume.
+
+Version 1.0 (19/10/26)
+"""
+
+
+import math
+import os
+
+import numpy
+import pandas as pd
+
+import PyEL_Density as DN
+import PyEL_Functions as ELF
+import PyEL_Library as ELL
+import PyEL_ResultStore as RS
+
+
+DEFAULT_CYCLES = 1000000
+
+# Bins of azimuth and polar angle of the head and liner grids
+WEAR_BINS = (180, 90)
+
+# Angles covered by the grids (degrees)
+AZIMUTH_RANGE = (-180.0, 180.0)
+POLAR_RANGE = (0.0, 180.0)
+
+# Saved grids of one cycle of each case, in the case folder
+CYCLES_NAME = 'Wear Cycles.npz'
+
+# Version of how the grids of a cycle are worked out; saved grids of another
+# version are worked out again
+CYCLES_VERSION = 2
+
+WEAR_NAME = 'Wear '
+
+# Columns of the raw data files read for the wear
+_COLUMNS = ['Nx', 'Ny', 'Nz', 'Anterior Mismatch', 'Lateral Mismatch',
+            'Axial Force (N)', 'Time (s)']
+
+
+def _cells(Points, bins):
+    """Return the flat grid cell of each point, see PyEL_Density."""
+    azimuth, polar = DN.liner_angles(Points[:, 0], Points[:, 1],
+                                     Points[:, 2])
+    column = numpy.floor((azimuth - AZIMUTH_RANGE[0]) * bins[0]
+                         / (AZIMUTH_RANGE[1] - AZIMUTH_RANGE[0]))
+    row = numpy.floor((polar - POLAR_RANGE[0]) * bins[1]
+                      / (POLAR_RANGE[1] - POLAR_RANGE[0]))
+    column = numpy.clip(column, 0, bins[0] - 1).astype(numpy.int64)
+    row = numpy.clip(row, 0, bins[1] - 1).astype(numpy.int64)
+    return column * bins[1] + row
+
+
+def sliding(Contact_df, HeadRad, ActivityData):
+    """
+    Find how far the head slides between each contact time and the next.
+
+    Parameters
+    ----------
+    Contact_df : DataFrame
+        Results of a case, in time order, with the columns of _COLUMNS.
+    HeadRad : float
+        Radius of the head (mm).
+    ActivityData : list
+        Load and motion data of the case's load profile, see
+        PyEL_Functions.ReadActivity.
+
+    Returns
+    -------
+    tuple
+        (sliding distance of each interval (mm), position of the contact
+        point in the head frame at the start of each interval), one row per
+        interval.
+
+    """
+    Points = Contact_df[['Nx', 'Ny', 'Nz']].to_numpy(float)
+    Offsets = ELF.head_offsets(Contact_df, HeadRad)
+    Centres = Points - Offsets
+    Time = Contact_df['Time (s)'].to_numpy(float)
+    Rotations = ELF.head_rotations(
+        *[numpy.interp(Time, ActivityData[0], ActivityData[column])
+          for column in (2, 3, 4)])
+    # Material point of the head at each contact, in the head frame, and
+    # where it has moved to by the next time
+    Head = numpy.einsum('nji,nj->ni', Rotations[:-1], Offsets[:-1])
+    Moved = Centres[1:] + numpy.einsum('nij,nj->ni', Rotations[1:], Head)
+    return numpy.linalg.norm(Moved - Points[:-1], axis=1), Head
+
+
+def cycle_wear(OutputFile, bins=WEAR_BINS):
+    """
+    Find where the work of one cycle of a case is done.
+
+    Parameters
+    ----------
+    OutputFile : str
+        Raw data file of the case.
+    bins : tuple, optional
+        Number of bins of azimuth and polar angle. The default is WEAR_BINS.
+
+    Returns
+    -------
+    tuple
+        (flat liner grid cell, flat head grid cell, work (Nm)) of each
+        interval between contact times no longer than the time step of the
+        load profile, see the module docstring.
+
+    """
+    with open(OutputFile, 'r') as file:
+        case, fields = RS.read_header(file.readline())
+    df = pd.read_csv(OutputFile, skiprows=1, usecols=_COLUMNS)
+    df = df.sort_values('Time (s)', kind='stable')
+    if len(df) < 2:
+        empty = numpy.zeros(0, dtype=numpy.int64)
+        return empty, empty, numpy.zeros(0)
+    ActivityData = ELL.load_activity(case['load_file'])[0]
+    distance, Head = sliding(df, float(fields['HeadRad']), ActivityData)
+    Force = df['Axial Force (N)'].to_numpy(float)
+    work = (Force[:-1] + Force[1:]) / 2 * distance / 1000
+
+    # Intervals longer than a step of the load profile are gaps in the contact
+    step = numpy.diff(ActivityData[0]).max()
+    kept = numpy.diff(df['Time (s)'].to_numpy(float)) <= step
+
+    Nz, Ny = ELF.Rotate_2D(df['Nz'].to_numpy(float)[:-1][kept],
+                           df['Ny'].to_numpy(float)[:-1][kept],
+                           math.radians(case['sim_inc']), direction=-1)
+    Liner = numpy.stack([df['Nx'].to_numpy(float)[:-1][kept], Ny, Nz],
+                        axis=1)
+    return _cells(Liner, bins), _cells(Head[kept], bins), work[kept]
+
+
+def _sparse(row, cells, work):
+    """Add up the work of a case in each cell, dropping empty cells."""
+    cells, inverse = numpy.unique(cells, return_inverse=True)
+    total = numpy.bincount(inverse, work, minlength=len(cells))
+    keep = total != 0
+    return numpy.full(keep.sum(), row), cells[keep], total[keep]
+
+
+def cycle_grids(CaseNamePath, CaseName, bins=WEAR_BINS):
+    """
+    Return the liner and head grids of one cycle of each case of a run.
+
+    Grids are read from CYCLES_NAME for cases whose raw data files have not
+    changed since it was saved with the same bins and CYCLES_VERSION, and it
+    is saved again with any new cases. They are kept sparse, as a case only
+    wears a small part of each surface.
+
+    Parameters
+    ----------
+    CaseNamePath : str
+        Location of the run's raw data and charts.
+    CaseName : str
+        Name of the case that was run.
+    bins : tuple, optional
+        Number of bins of azimuth and polar angle. The default is WEAR_BINS.
+
+    Returns
+    -------
+    dict
+        'cases', the case numbers, 'liner' and 'head', the (row of cases,
+        flat grid cell, work (Nm)) of every cell worn in a cycle of each
+        case, and 'reused', the number of cases whose grids were read from
+        CYCLES_NAME.
+
+    """
+    cases = RS.raw_data_cases(CaseNamePath, CaseName)
+    if not cases:
+        raise FileNotFoundError('No raw data files for ' + CaseName + ' in '
+                                + CaseNamePath)
+    caseNums = numpy.array([caseNum for caseNum, OutputFile in cases])
+    mtimes = numpy.array([os.stat(OutputFile).st_mtime_ns
+                          for caseNum, OutputFile in cases])
+    empty = (numpy.zeros(0, dtype=numpy.int64),
+             numpy.zeros(0, dtype=numpy.int64), numpy.zeros(0))
+    grids = {'liner': [empty], 'head': [empty]}
+
+    cacheFile = os.path.join(CaseNamePath, CYCLES_NAME)
+    stale = numpy.ones(len(cases), dtype=bool)
+    if os.path.exists(cacheFile):
+        with numpy.load(cacheFile) as saved:
+            version = saved['version'] if 'version' in saved.files else 1
+            if tuple(saved['bins']) == tuple(bins) and \
+                    version == CYCLES_VERSION:
+                rows = pd.Index(saved['cases']).get_indexer(caseNums)
+                known = rows >= 0
+                stale[known] = saved['mtimes'][rows[known]] != mtimes[known]
+                # Saved rows renumbered to the current cases
+                renumber = numpy.full(len(saved['cases']), -1)
+                renumber[rows[known & ~stale]] = numpy.flatnonzero(
+                    known & ~stale)
+                for surface in grids:
+                    row = renumber[saved[surface + '_row']]
+                    keep = row >= 0
+                    grids[surface].append(
+                        (row[keep], saved[surface + '_cell'][keep],
+                         saved[surface + '_work'][keep]))
+
+    reused = len(cases) - int(stale.sum())
+    for row in numpy.flatnonzero(stale):
+        linerCell, headCell, work = cycle_wear(cases[row][1], bins)
+        grids['liner'].append(_sparse(row, linerCell, work))
+        grids['head'].append(_sparse(row, headCell, work))
+    for surface in grids:
+        grids[surface] = tuple(numpy.concatenate(part) for part in
+                               zip(*grids[surface]))
+    if reused < len(cases):
+        numpy.savez(cacheFile, cases=caseNums, mtimes=mtimes,
+                    bins=numpy.array(bins), version=CYCLES_VERSION,
+                    **{surface + '_' + name: array
+                       for surface in grids
+                       for name, array in zip(['row', 'cell', 'work'],
+                                              grids[surface])})
+    grids.update({'cases': caseNums, 'reused': reused})
+    return grids
+
+
+def accumulate(grids, cycles=DEFAULT_CYCLES, bins=WEAR_BINS):
+    """
+    Add up the wear of many cycles of each case.
+
+    Parameters
+    ----------
+    grids : dict
+        Output of cycle_grids.
+    cycles : float or dict, optional
+        Number of cycles of every case, or of each case keyed by case
+        number, with cases left out not counted. The default is
+        DEFAULT_CYCLES.
+    bins : tuple, optional
+        Number of bins the grids were found with. The default is WEAR_BINS.
+
+    Returns
+    -------
+    dict
+        'liner' and 'head', the work (Nm) done in each cell, indexed by
+        (azimuth, polar angle) bin, the bin edges 'azimuth' and 'polar'
+        (degrees), and the total 'cycles'.
+
+    """
+    if isinstance(cycles, dict):
+        counts = numpy.array([cycles.get(caseNum, 0)
+                              for caseNum in grids['cases'].tolist()],
+                             dtype=float)
+    else:
+        counts = numpy.full(len(grids['cases']), float(cycles))
+    wear = {}
+    for surface in ['liner', 'head']:
+        row, cell, work = grids[surface]
+        wear[surface] = numpy.bincount(
+            cell, counts[row] * work,
+            minlength=bins[0] * bins[1]).reshape(bins)
+    wear.update({'azimuth': numpy.linspace(*AZIMUTH_RANGE, bins[0] + 1),
+                 'polar': numpy.linspace(*POLAR_RANGE, bins[1] + 1),
+                 'cycles': counts.sum()})
+    return wear
+
+
+def write_wear(wear, CaseNamePath, CaseName, title, wear_factor=None):
+    """
+    Save a wear map and draw it as heatmaps of the liner and head.
+
+    Parameters
+    ----------
+    wear : dict
+        Output of accumulate.
+    CaseNamePath : str
+        Location of the run's raw data and charts.
+    CaseName : str
+        Name of the case that was run.
+    title : str
+        Title of the heatmaps.
+    wear_factor : float, optional
+        Wear factor (mm³/Nm) to convert the work to wear volume. The default
+        is None, which draws the work.
+
+    Returns
+    -------
+    tuple
+        (.npz file of the map, .html file of the heatmaps in the Charts
+        folder)
+
+    """
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
+    name = WEAR_NAME + CaseName
+    arrays = os.path.join(CaseNamePath, name + '.npz')
+    numpy.savez(arrays, liner=wear['liner'], head=wear['head'],
+                azimuth=wear['azimuth'], polar=wear['polar'],
+                cycles=wear['cycles'])
+
+    scale = 1.0 if wear_factor is None else wear_factor
+    label = 'Work (Nm)' if wear_factor is None else 'Wear (mm³)'
+    fig = make_subplots(rows=1, cols=2, subplot_titles=('Liner', 'Head'))
+    for col, surface in enumerate(['liner', 'head'], start=1):
+        # Cells with no wear are left blank
+        grid = wear[surface].T * scale
+        grid[grid == 0] = numpy.nan
+        fig.add_trace(go.Heatmap(
+            z=grid, colorscale='Viridis', coloraxis='coloraxis',
+            x=(wear['azimuth'][:-1] + wear['azimuth'][1:]) / 2,
+            y=(wear['polar'][:-1] + wear['polar'][1:]) / 2), row=1, col=col)
+        fig.update_xaxes(title_text='Azimuth from anterior (°)', row=1,
+                         col=col)
+        fig.update_yaxes(title_text='Angle from the pole (°)',
+                         autorange='reversed', row=1, col=col)
+    fig.update_layout(title=title, coloraxis=dict(
+        colorscale='Viridis', colorbar=dict(title=label)))
+    chartDir = os.path.join(CaseNamePath, 'Charts')
+    os.makedirs(chartDir, exist_ok=True)
+    heatmap = os.path.join(chartDir, name + '.html')
+    fig.write_html(heatmap, include_plotlyjs='directory')
+    return arrays, heatmap
+
+
+def wear_report(CaseNamePath, CaseName, cycles=DEFAULT_CYCLES,
+                bins=WEAR_BINS, wear_factor=None):
+    """
+    Write the wear map of a run, see the module docstring.
+
+    Parameters
+    ----------
+    CaseNamePath : str
+        Location of the run's raw data and charts.
+    CaseName : str
+        Name of the case that was run.
+    cycles : float or dict, optional
+        Number of cycles of every case, or of each case keyed by case
+        number, see accumulate. The default is DEFAULT_CYCLES.
+    bins : tuple, optional
+        Number of bins of azimuth and polar angle. The default is WEAR_BINS.
+    wear_factor : float, optional
+        Wear factor (mm³/Nm) to draw the wear volume. The default is None,
+        which draws the work.
+
+    Returns
+    -------
+    dict
+        Output of accumulate, with the number of 'cases' and of cases whose
+        grids were 'reused', and the 'arrays' and 'heatmap' files written.
+
+    """
+    grids = cycle_grids(CaseNamePath, CaseName, bins)
+    wear = accumulate(grids, cycles, bins)
+    title = ('Wear of ' + CaseName + ' over ' + format(wear['cycles'], ',.0f')
+             + ' cycles of ' + str(len(grids['cases'])) + ' cases')
+    arrays, heatmap = write_wear(wear, CaseNamePath, CaseName, title,
+                                 wear_factor)
+    wear.update({'cases': len(grids['cases']), 'reused': grids['reused'],
+                 'arrays': arrays, 'heatmap': heatmap})
+    return wear
@@ -0,0 +1,146 @@
+"""
+Background writing of case results.
+
+Saving a case's results (its raw data file, the run manifest entry and any
+results store) is handed to a writer thread, so the runner can start on the
+next case while the disk catches up, e.g.
+
+    writer = BackgroundWriter()
+    writer.submit(ELF.write_raw_data, Contact_df, OutputFile, header)
+    ...
+    writer.close()
+
+Jobs are run one at a time in the order they were submitted, so a case is
+only recorded in the manifest after its raw data file has been written.
+The queue of jobs is bounded: if the writer falls behind, submit waits for
+a space, so results cannot pile up in memory. Frames handed to the writer
+must not be changed afterwards.
+
+If a job fails, the jobs after it are dropped and the error is raised in
+the runner by the next call to submit, flush or close.
+
+Given a timer (see PyEL_Timing), the time each job takes is recorded under
+WRITER_STAGE, apart from the runner's own 'output' stage, which only covers
+handing the jobs over (and any wait for a space in the queue).
+
+Version 1.0 (19/10/26)
+"""
+
+
+import queue
+import threading
+import time
+
+import PyEL_Timing as TM
+
+
+# Jobs waiting to be written before submit waits for the writer
+DEFAULT_QUEUE_SIZE = 8
+
+# Stage the time spent running jobs is recorded under
+WRITER_STAGE = 'output (writer)'
+
+# How often an idle writer checks whether the runner has stopped (s)
+_POLL_INTERVAL = 0.2
+
+
+class BackgroundWriter():
+    """
+    Runs output jobs on a background thread, see the module docstring.
+
+    A writer with a queue size of 0 runs each job straight away on the
+    calling thread instead.
+
+    """
+
+    def __init__(self, maxsize=DEFAULT_QUEUE_SIZE, timer=TM.NO_TIMER):
+        """
+        Start the writer thread.
+
+        Parameters
+        ----------
+        maxsize : int, optional
+            Number of jobs that can wait to be written before submit waits.
+            If 0 jobs are run when they are submitted. The default is
+            DEFAULT_QUEUE_SIZE.
+        timer : PyEL_Timing.Timer, optional
+            Records the time spent running jobs under WRITER_STAGE. The
+            default is TM.NO_TIMER, which records nothing.
+
+        """
+        self.maxsize = maxsize
+        self.timer = timer
+        self.error = None
+        self.thread = None
+        if maxsize > 0:
+            self.jobs = queue.Queue(maxsize)
+            # Not a daemon thread, so jobs already submitted are still
+            # written if the runner stops with an error
+            self.thread = threading.Thread(target=self._run,
+                                           name='PyEL writer')
+            self.thread.start()
+
+    def _run(self):
+        """Run jobs until closed, or until the runner has stopped."""
+        main = threading.main_thread()
+        while True:
+            try:
+                job = self.jobs.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                if not main.is_alive():
+                    return
+                continue
+            try:
+                if job is None:
+                    return
+                if self.error is None:
+                    self._call(*job)
+            except BaseException as error:
+                self.error = error
+            finally:
+                self.jobs.task_done()
+
+    def _call(self, func, args, kwargs):
+        """Run a job, recording the time it takes."""
+        started = time.perf_counter_ns()
+        try:
+            func(*args, **kwargs)
+        finally:
+            self.timer.add_background(WRITER_STAGE,
+                                      time.perf_counter_ns() - started)
+
+    def check(self):
+        """Raise the error of a failed job, if there was one."""
+        if self.error is not None:
+            raise self.error
+
+    def submit(self, func, *args, **kwargs):
+        """
+        Queue a job, waiting for a space if the queue is full.
+
+        Parameters
+        ----------
+        func : callable
+            Function to run on the writer thread.
+        *args, **kwargs
+            Arguments to call it with.
+
+        """
+        self.check()
+        if self.thread is None:
+            self._call(func, args, kwargs)
+        else:
+            self.jobs.put((func, args, kwargs))
+
+    def flush(self):
+        """Wait for every job submitted so far to be written."""
+        if self.thread is not None:
+            self.jobs.join()
+        self.check()
+
+    def close(self):
+        """Write the remaining jobs and stop the writer thread."""
+        if self.thread is not None and self.thread.is_alive():
+            self.jobs.put(None)
+            self.thread.join()
+        self.check()
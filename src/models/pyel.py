@@ -0,0 +1,626 @@
+"""
+Command line entry point for PyEL.
+
+Runs an analysis from a settings file and job list without the UI, for batch
+machines with no display. Run from the src/models folder:
+
+    python -m pyel run Settings_Example.csv Joblist_Example.csv
+
+A synthetic liner point cloud for benchmarking can be written with
+
+    python -m pyel liner Liner_1M.txt --points 1000000
+
+and the stages of the model timed on synthetic liners with
+
+    python -m pyel bench
+
+and a faster contact search engine checked against the reference with
+
+    python -m pyel accuracy --engine indexed
+
+The mismatch at which each configuration of a job list starts to edge load
+is found by bisection, without sweeping it, with
+
+    python -m pyel onset Liner.txt Joblist_Example.csv
+
+and a grid too big to run whole sampled adaptively, with a surrogate of its
+results, with
+
+    python -m pyel sample Liner.txt Joblist_Grid.json --budget 40
+
+The raw data files of a finished run can be packed into one columnar store
+with
+
+    python -m pyel store ../../output/Liner/CaseName --format parquet
+
+and a static viewer of its contact paths, for sweeps too big to browse as
+plot files, written with
+
+    python -m pyel report ../../output/Liner/CaseName
+
+and the contact points of all of its cases binned into one heatmap with
+
+    python -m pyel density ../../output/Liner/CaseName
+
+and the wear of the head and liner over many cycles of its cases mapped with
+
+    python -m pyel wear ../../output/Liner/CaseName --cycles 1000000
+
+The job list can be left out, in which case the JobFile given in the settings
+file is used. No dialogs or browser windows are opened; a bad activity file
+stops the run with an error instead, and the run can be picked up again
+afterwards with --resume.
+
+Only the modules needed to parse the arguments are imported at start up. The
+analysis modules are imported when a command is run, and plotly and tkinter
+only when they are needed.
+
+Version 1.0 (19/10/26)
+"""
+
+
+import argparse
+import sys
+
+
+def _default(value, default):
+    """Return a command line value, or the module default if not given."""
+    return default if value is None else value
+
+
+def run(args):
+    """
+    Run the analysis for a settings file.
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        Parsed command line arguments for the run command.
+
+    """
+    import PyEL_1Spring_MainFile as _1Spr
+    import PyEL_Engines as EN
+    import PyEL_Planner as PL
+    import PyEL_Plots as PT
+    import PyEL_Writer as WR
+
+    _1Spr.run_settings(
+        args.settings, args.jobfile, mainPath=args.output,
+        resume=args.resume, interactive=False,
+        cache_memory=_default(args.cache_memory, PL.DEFAULT_MEMORY_MB),
+        timing=args.timing, counters=args.counters, memory=args.memory,
+        engine=_default(args.engine, EN.DEFAULT_ENGINE), store=args.store,
+        write_queue=_default(args.write_queue, WR.DEFAULT_QUEUE_SIZE),
+        plots=not args.no_plots,
+        plot_workers=_default(args.plot_workers, PT.DEFAULT_PLOT_WORKERS),
+        shared_plots=not args.standalone_plots)
+
+
+def liner(args):
+    """
+    Write a synthetic liner point cloud.
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        Parsed command line arguments for the liner command.
+
+    """
+    import PyEL_SyntheticLiner as SL
+
+    InnerRad = _default(args.inner_radius, SL.DEFAULT_INNER_RAD)
+    FilletRad = _default(args.fillet_radius, SL.DEFAULT_FILLET_RAD)
+    Chamfer = _default(args.chamfer, SL.DEFAULT_CHAMFER)
+    MeshSize = args.mesh_size
+    if args.points is not None:
+        MeshSize = SL.mesh_size_for_points(args.points, InnerRad, FilletRad,
+                                           Chamfer)
+    points = SL.write_liner(args.output, InnerRad, FilletRad, Chamfer,
+                            MeshSize, args.head_radius)
+    print('Wrote ' + str(points) + ' points with a mesh size of '
+          + str(round(MeshSize, 5)) + ' mm to ' + args.output)
+
+
+def bench(args):
+    """
+    Run the benchmarks and save the results.
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        Parsed command line arguments for the bench command.
+
+    """
+    import json
+    import PyEL_Benchmark as BM
+
+    results = BM.run_benchmarks(_default(args.points, BM.DEFAULT_POINTS),
+                                _default(args.repeat, BM.DEFAULT_REPEAT),
+                                args.load_file, args.output)
+    path = BM.write_results(results, args.output)
+    baseline = None
+    if args.compare is not None:
+        with open(args.compare, 'r') as file:
+            baseline = json.load(file)
+    print(BM.report(results, baseline))
+    print('Results saved to ' + path)
+
+
+def accuracy(args):
+    """
+    Check a contact search engine against the reference.
+
+    Exits with an error if any case is outside the tolerances.
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        Parsed command line arguments for the accuracy command.
+
+    """
+    import os
+    import tempfile
+    import PyEL_Accuracy as AC
+    import PyEL_Benchmark as BM
+    import PyEL_JobList as JL
+    import PyEL_Library as ELL
+    import PyEL_SyntheticLiner as SL
+
+    ContactIts = _default(args.contact_its, AC.DEFAULT_CONTACT_ITS)
+    ActivityFile = args.load_file
+    if ActivityFile is None:
+        ActivityFile = BM.default_activity_file()
+    with tempfile.TemporaryDirectory() as linerDir:
+        CupGeomFile = args.liner
+        MeshSize = args.mesh_size
+        if CupGeomFile is None:
+            CupGeomFile = os.path.join(linerDir, 'Liner.txt')
+            MeshSize = SL.mesh_size_for_points(
+                _default(args.points, AC.DEFAULT_POINTS))
+            SL.write_liner(CupGeomFile, MeshSize=MeshSize)
+        geometry = ELL.load_geometry(CupGeomFile, MeshSize)
+
+    if args.jobfile is None:
+        cases = AC.default_cases(ActivityFile, ContactIts)
+    else:
+        cases = []
+        for case in JL.iter_job_file(args.jobfile):
+            case['contact_its'] = ContactIts
+            cases.append(case)
+    results = AC.check_engine(geometry, cases, args.engine, args.seed,
+                              args.repeat)
+    print(AC.report(results, args.engine))
+    if args.json is not None:
+        AC.write_results(results, args.json)
+    if not all(result['passed'] for result in results):
+        sys.exit('Engine ' + args.engine + ' does not match the reference')
+
+
+def onset(args):
+    """
+    Find the critical mismatches of the configurations of a job list.
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        Parsed command line arguments for the onset command.
+
+    """
+    import PyEL_Library as ELL
+    import PyEL_Onset as ON
+
+    geometry = ELL.load_geometry(args.liner, args.mesh_size)
+    rows = ON.onset_table(geometry, args.jobfile,
+                          _default(args.tolerance, ON.DEFAULT_TOLERANCE),
+                          args.force,
+                          _default(args.contact_its, ELL.DEFAULT_CONTACT_ITS))
+    print(ON.report(rows))
+    if args.csv is not None:
+        ON.write_onset(rows, args.csv)
+
+
+def sample(args):
+    """
+    Sample a job list grid adaptively and fit a surrogate of its results.
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        Parsed command line arguments for the sample command.
+
+    """
+    import PyEL_Library as ELL
+    import PyEL_Sampler as SA
+
+    geometry = ELL.load_geometry(args.liner, args.mesh_size)
+    sampler = SA.AdaptiveSampler(
+        geometry, SA.grid_axes(args.jobfile),
+        _default(args.contact_its, ELL.DEFAULT_CONTACT_ITS), args.seed)
+    sampler.run(_default(args.budget, SA.DEFAULT_BUDGET),
+                _default(args.batch, SA.DEFAULT_BATCH),
+                _default(args.tolerance, SA.DEFAULT_TOLERANCE), args.initial)
+    print(sampler.report())
+    for path in sampler.write(args.output):
+        print('Saved ' + path)
+
+
+def store(args):
+    """
+    Write the raw data files of a run to a columnar store.
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        Parsed command line arguments for the store command.
+
+    """
+    import os
+    import PyEL_ResultStore as RS
+
+    CaseNamePath = os.path.normpath(args.folder)
+    CaseName = args.case_name
+    if CaseName is None:
+        CaseName = os.path.basename(CaseNamePath)
+    path, num_cases = RS.convert_raw_data(CaseNamePath, CaseName, args.format)
+    print('Wrote ' + str(num_cases) + ' cases to ' + path)
+
+
+def report(args):
+    """
+    Write the static report viewer of a run.
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        Parsed command line arguments for the report command.
+
+    """
+    import os
+    import PyEL_Report as RP
+
+    CaseNamePath = os.path.normpath(args.folder)
+    CaseName = args.case_name
+    if CaseName is None:
+        CaseName = os.path.basename(CaseNamePath)
+    index, num_cases, num_read = RP.write_report(CaseNamePath, CaseName,
+                                                 args.force)
+    print('Wrote the report of ' + str(num_cases) + ' cases (' + str(num_read)
+          + ' read from their raw data) to ' + index)
+
+
+def density(args):
+    """
+    Write the contact density heatmap of a run.
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        Parsed command line arguments for the density command.
+
+    """
+    import os
+    import PyEL_Density as DN
+
+    CaseNamePath = os.path.normpath(args.folder)
+    CaseName = args.case_name
+    if CaseName is None:
+        CaseName = os.path.basename(CaseNamePath)
+    result = DN.density_report(CaseNamePath, CaseName, args.weight,
+                               tuple(_default(args.bins, DN.DEFAULT_BINS)),
+                               args.edge_only)
+    print('Binned ' + str(result['points']) + ' contact points of '
+          + str(result['cases']) + ' cases to ' + result['heatmap'])
+
+
+def wear(args):
+    """
+    Write the wear map of a run.
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        Parsed command line arguments for the wear command.
+
+    """
+    import os
+    import PyEL_Wear as WE
+
+    CaseNamePath = os.path.normpath(args.folder)
+    CaseName = args.case_name
+    if CaseName is None:
+        CaseName = os.path.basename(CaseNamePath)
+    result = WE.wear_report(CaseNamePath, CaseName,
+                            _default(args.cycles, WE.DEFAULT_CYCLES),
+                            tuple(_default(args.bins, WE.WEAR_BINS)),
+                            args.wear_factor)
+    print('Mapped ' + format(result['cycles'], ',.0f') + ' cycles of '
+          + str(result['cases']) + ' cases (' + str(result['reused'])
+          + ' read from ' + WE.CYCLES_NAME + ') to ' + result['heatmap'])
+
+
+def build_parser():
+    """
+    Create the parser for the command line arguments.
+
+    Returns
+    -------
+    argparse.ArgumentParser
+        Parser with one sub-command per action.
+
+    """
+    parser = argparse.ArgumentParser(
+        prog='pyel', description='PyEL Edge Loading Geometric Model.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser(
+        'run', help='run the cases in a job list for a settings file')
+    run_parser.add_argument('settings', help='settings file')
+    run_parser.add_argument('jobfile', nargs='?', default=None,
+                            help='job list, defaults to the JobFile in the '
+                            'settings file')
+    run_parser.add_argument('--output', default=None,
+                            help='directory the output folder is placed in, '
+                            'defaults to the top of this repository')
+    run_parser.add_argument('--resume', action='store_true',
+                            help='skip cases completed by a previous run')
+    run_parser.add_argument('--cache-memory', type=float, default=None,
+                            metavar='MB',
+                            help='memory for reusing cup data and contact '
+                            'points between cases, 0 runs every case from '
+                            'scratch in job list order (default 512)')
+    run_parser.add_argument('--timing', action='store_true',
+                            help='record the time spent in each stage of '
+                            'each case and write it to Run Timing.json/.csv')
+    run_parser.add_argument('--counters', action='store_true',
+                            help='count the work done by the contact search '
+                            'of each case and write it to Run Counters.csv')
+    run_parser.add_argument('--memory', action='store_true',
+                            help='record the memory used by each stage in '
+                            'Run Metadata.json (slows the run down)')
+    run_parser.add_argument('--engine', default=None,
+                            help='contact search engine, see PyEL_Engines '
+                            '(default reference)')
+    run_parser.add_argument('--store', choices=['parquet', 'hdf5'],
+                            default=None,
+                            help='also write the results of every case to '
+                            'one columnar store for the run')
+    run_parser.add_argument('--write-queue', type=int, default=None,
+                            metavar='CASES',
+                            help='finished cases that can wait to be saved '
+                            'in the background, 0 saves each case before '
+                            'starting the next (default 8)')
+    run_parser.add_argument('--no-plots', action='store_true',
+                            help='do not make the Geometry-Force and bar '
+                            'chart plots')
+    run_parser.add_argument('--plot-workers', type=int, default=None,
+                            metavar='N',
+                            help='processes drawing the plots while the '
+                            'cases are run, 0 draws them after each page of '
+                            'cases in this process (default 2)')
+    run_parser.add_argument('--standalone-plots', action='store_true',
+                            help='give every plot file its own copy of the '
+                            'liner and plotly.js, instead of sharing them '
+                            'in the Charts folder')
+    run_parser.set_defaults(func=run)
+
+    liner_parser = commands.add_parser(
+        'liner', help='write a synthetic liner point cloud')
+    liner_parser.add_argument('output', help='point cloud file to write')
+    size = liner_parser.add_mutually_exclusive_group()
+    size.add_argument('--mesh-size', type=float, default=0.5, metavar='MM',
+                      help='spacing between points (default 0.5)')
+    size.add_argument('--points', type=int, default=None,
+                      help='choose the mesh size to give about this many '
+                      'points')
+    liner_parser.add_argument('--inner-radius', type=float, default=None,
+                              metavar='MM', help='bearing surface radius '
+                              '(default 18.25)')
+    liner_parser.add_argument('--fillet-radius', type=float, default=None,
+                              metavar='MM', help='radius of the fillet at the '
+                              'edge of the bearing surface (default 2)')
+    liner_parser.add_argument('--chamfer', type=float, default=None,
+                              metavar='MM', help='width of the rim chamfer '
+                              'outside the fillet (default 1)')
+    liner_parser.add_argument('--head-radius', type=int, default=None,
+                              metavar='MM', help='default head radius written '
+                              'to the file (default the inner radius rounded '
+                              'down)')
+    liner_parser.set_defaults(func=liner)
+
+    bench_parser = commands.add_parser(
+        'bench', help='time the stages of the model on synthetic liners')
+    bench_parser.add_argument('--points', type=int, nargs='+',
+                              default=None,
+                              help='sizes of liner to time (default 10000 '
+                              '40000 160000)')
+    bench_parser.add_argument('--repeat', type=int, default=None,
+                              help='times to run each stage (default 3)')
+    bench_parser.add_argument('--load-file', default=None,
+                              help='load profile, defaults to '
+                              'SmoothedISO-70NSwPL.csv')
+    bench_parser.add_argument('--compare', default=None, metavar='JSON',
+                              help='earlier results to compare with')
+    bench_parser.add_argument('--output', default=None,
+                              help='directory the output folder is placed in, '
+                              'defaults to the top of this repository')
+    bench_parser.set_defaults(func=bench)
+
+    accuracy_parser = commands.add_parser(
+        'accuracy', help='check a contact search engine against the '
+        'reference')
+    accuracy_parser.add_argument('--engine', default='indexed',
+                                 help='engine to check (default indexed)')
+    geometry = accuracy_parser.add_mutually_exclusive_group()
+    geometry.add_argument('--points', type=int, default=None,
+                          help='size of synthetic liner to check on (default '
+                          '10000)')
+    geometry.add_argument('--liner', default=None,
+                          help='liner point cloud to check on instead of a '
+                          'synthetic liner')
+    accuracy_parser.add_argument('--mesh-size', type=float, default=0.5,
+                                 metavar='MM', help='point spacing of --liner '
+                                 '(default 0.5)')
+    accuracy_parser.add_argument('--jobfile', default=None,
+                                 help='job list of cases to check, defaults '
+                                 'to inclinations 35 to 65 and lateral '
+                                 'mismatches 1 to 4 mm')
+    accuracy_parser.add_argument('--load-file', default=None,
+                                 help='load profile for the default cases, '
+                                 'defaults to SmoothedISO-70NSwPL.csv')
+    accuracy_parser.add_argument('--contact-its', type=int, default=None,
+                                 help='separation positions per case '
+                                 '(default 500)')
+    accuracy_parser.add_argument('--seed', type=int, default=0,
+                                 help='random seed for both engines '
+                                 '(default 0)')
+    accuracy_parser.add_argument('--repeat', type=int, default=1,
+                                 help='times to time each contact search '
+                                 '(default 1)')
+    accuracy_parser.add_argument('--json', default=None,
+                                 help='file to save the results to')
+    accuracy_parser.set_defaults(func=accuracy)
+
+    onset_parser = commands.add_parser(
+        'onset', help='find the lateral mismatch at which each configuration '
+        'of a job list starts to edge load')
+    onset_parser.add_argument('liner', help='liner point cloud')
+    onset_parser.add_argument('jobfile', help='job list; lat_mm is bracketed '
+                              'by its smallest and largest values')
+    onset_parser.add_argument('--mesh-size', type=float, default=0.5,
+                              metavar='MM', help='point spacing of the liner '
+                              '(default 0.5)')
+    onset_parser.add_argument('--tolerance', type=float, default=None,
+                              metavar='MM', help='mismatch to find the '
+                              'critical mismatches to (default 0.05)')
+    onset_parser.add_argument('--force', type=float, default=None,
+                              help='axial force while edge loading for the '
+                              'peak crossing (N), defaults to the peak load '
+                              'of the profile')
+    onset_parser.add_argument('--contact-its', type=int, default=None,
+                              help='separation positions per solve (default '
+                              '2000)')
+    onset_parser.add_argument('--csv', default=None,
+                              help='file to save the results to')
+    onset_parser.set_defaults(func=onset)
+
+    sample_parser = commands.add_parser(
+        'sample', help='run the cases of a job list grid adaptively and fit '
+        'a surrogate of their results')
+    sample_parser.add_argument('liner', help='liner point cloud')
+    sample_parser.add_argument('jobfile', help='job list or job spec of the '
+                               'grid to sample')
+    sample_parser.add_argument('--mesh-size', type=float, default=0.5,
+                               metavar='MM', help='point spacing of the liner '
+                               '(default 0.5)')
+    sample_parser.add_argument('--budget', type=int, default=None,
+                               help='largest number of cases to run '
+                               '(default 40)')
+    sample_parser.add_argument('--batch', type=int, default=None,
+                               help='cases added between fits of the '
+                               'surrogate (default 4)')
+    sample_parser.add_argument('--initial', type=int, default=None,
+                               help='cases in the initial design, at least '
+                               'and by default twice the number of varied '
+                               'axes plus two, and at least the batch size')
+    sample_parser.add_argument('--tolerance', type=float, default=None,
+                               help='leave-one-out error, as a fraction of '
+                               'the range of each result, to stop at '
+                               '(default 0.02)')
+    sample_parser.add_argument('--contact-its', type=int, default=None,
+                               help='separation positions per case (default '
+                               '2000)')
+    sample_parser.add_argument('--seed', type=int, default=0,
+                               help='seed for picking the cases of grids '
+                               'bigger than 200000 (default 0)')
+    sample_parser.add_argument('--output', default='.',
+                               help='folder to save the cases and surrogate '
+                               'to (default the current folder)')
+    sample_parser.set_defaults(func=sample)
+
+    store_parser = commands.add_parser(
+        'store', help='pack the raw data files of a run into a columnar '
+        'store')
+    store_parser.add_argument('folder', help='output folder of the run, '
+                              'holding its Raw Data folder')
+    store_parser.add_argument('--format', choices=['parquet', 'hdf5'],
+                              default='parquet',
+                              help='store format (default parquet)')
+    store_parser.add_argument('--case-name', default=None,
+                              help='case name of the run, defaults to the '
+                              'folder name')
+    store_parser.set_defaults(func=store)
+
+    report_parser = commands.add_parser(
+        'report', help='write a static viewer of the contact paths of a run')
+    report_parser.add_argument('folder', help='output folder of the run, '
+                               'holding its Raw Data folder')
+    report_parser.add_argument('--force', choices=['Axial', 'Resultant'],
+                               default='Axial',
+                               help='force to colour the contact paths by '
+                               '(default Axial)')
+    report_parser.add_argument('--case-name', default=None,
+                               help='case name of the run, defaults to the '
+                               'folder name')
+    report_parser.set_defaults(func=report)
+
+    density_parser = commands.add_parser(
+        'density', help='bin the contact points of every case of a run into '
+        'one heatmap over the liner')
+    density_parser.add_argument('folder', help='output folder of the run, '
+                                'holding its Raw Data folder')
+    density_parser.add_argument('--weight', choices=['count', 'axial_force'],
+                                default='count',
+                                help='weight each point by 1 or by its axial '
+                                'force (default count)')
+    density_parser.add_argument('--bins', type=int, nargs=2,
+                                default=None,
+                                metavar=('AZIMUTH', 'POLAR'),
+                                help='number of bins of azimuth and angle '
+                                'from the pole (default 180 60)')
+    density_parser.add_argument('--edge-only', action='store_true',
+                                help='only bin points on the edge of the '
+                                'liner')
+    density_parser.add_argument('--case-name', default=None,
+                                help='case name of the run, defaults to the '
+                                'folder name')
+    density_parser.set_defaults(func=density)
+
+    wear_parser = commands.add_parser(
+        'wear', help='map the wear of the head and liner over many cycles of '
+        'the cases of a run')
+    wear_parser.add_argument('folder', help='output folder of the run, '
+                             'holding its Raw Data folder')
+    wear_parser.add_argument('--cycles', type=float, default=None,
+                             help='number of cycles of each case (default '
+                             '1000000)')
+    wear_parser.add_argument('--bins', type=int, nargs=2, default=None,
+                             metavar=('AZIMUTH', 'POLAR'),
+                             help='number of bins of azimuth and angle from '
+                             'the pole (default 180 90)')
+    wear_parser.add_argument('--wear-factor', type=float, default=None,
+                             help='wear factor (mm3/Nm) to map wear volume '
+                             'rather than work')
+    wear_parser.add_argument('--case-name', default=None,
+                             help='case name of the run, defaults to the '
+                             'folder name')
+    wear_parser.set_defaults(func=wear)
+
+    return parser
+
+
+def main(argv=None):
+    """
+    Parse the command line and run the requested command.
+
+    Parameters
+    ----------
+    argv : list, optional
+        Command line arguments, defaults to sys.argv[1:].
+
+    """
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])